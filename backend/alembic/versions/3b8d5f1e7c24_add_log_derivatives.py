@@ -0,0 +1,32 @@
+"""Add thumbnail / preview paths to detection and diagnosis logs
+
+Revision ID: 3b8d5f1e7c24
+Revises: 9e4b7c2d1a63
+Create Date: 2026-10-18 01:12:44.305117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8d5f1e7c24'
+down_revision: Union[str, None] = '9e4b7c2d1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('detection_logs', sa.Column('thumbnail_path', sa.String(), nullable=True))
+    op.add_column('detection_logs', sa.Column('preview_path', sa.String(), nullable=True))
+    op.add_column('diagnosis_logs', sa.Column('thumbnail_path', sa.String(), nullable=True))
+    op.add_column('diagnosis_logs', sa.Column('preview_path', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('diagnosis_logs', 'preview_path')
+    op.drop_column('diagnosis_logs', 'thumbnail_path')
+    op.drop_column('detection_logs', 'preview_path')
+    op.drop_column('detection_logs', 'thumbnail_path')
@@ -0,0 +1,49 @@
+"""Add video jobs
+
+Revision ID: 5c1f0e2a9b7d
+Revises: 078456a8b9d3
+Create Date: 2026-10-17 09:12:41.532018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f0e2a9b7d'
+down_revision: Union[str, None] = '078456a8b9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('video_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('flock_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('input_path', sa.String(), nullable=True),
+    sa.Column('output_path', sa.String(), nullable=True),
+    sa.Column('total_frames', sa.Integer(), nullable=True),
+    sa.Column('frames_processed', sa.Integer(), nullable=True),
+    sa.Column('current_sick_count', sa.Integer(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['flock_id'], ['flocks.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_video_jobs_id'), 'video_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_video_jobs_status'), 'video_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_video_jobs_status'), table_name='video_jobs')
+    op.drop_index(op.f('ix_video_jobs_id'), table_name='video_jobs')
+    op.drop_table('video_jobs')
@@ -0,0 +1,26 @@
+"""Add analysis_only flag to video jobs
+
+Revision ID: 7d2a6c9e4f18
+Revises: 3b8d5f1e7c24
+Create Date: 2026-10-18 09:41:07.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2a6c9e4f18'
+down_revision: Union[str, None] = '3b8d5f1e7c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('video_jobs', sa.Column('analysis_only', sa.Boolean(), server_default=sa.false(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('video_jobs', 'analysis_only')
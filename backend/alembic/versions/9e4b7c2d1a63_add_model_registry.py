@@ -0,0 +1,56 @@
+"""Add model registry
+
+Revision ID: 9e4b7c2d1a63
+Revises: 5c1f0e2a9b7d
+Create Date: 2026-10-17 14:03:27.418265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7c2d1a63'
+down_revision: Union[str, None] = '5c1f0e2a9b7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('model_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=True),
+    sa.Column('version', sa.String(), nullable=True),
+    sa.Column('weights_path', sa.String(), nullable=True),
+    sa.Column('backend', sa.String(), nullable=True),
+    sa.Column('precision', sa.String(), nullable=True),
+    sa.Column('fingerprint', sa.String(), nullable=True),
+    sa.Column('class_names', sa.JSON(), nullable=True),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('activated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'version', name='uq_model_versions_kind_version')
+    )
+    op.create_index(op.f('ix_model_versions_id'), 'model_versions', ['id'], unique=False)
+    op.create_index(op.f('ix_model_versions_kind'), 'model_versions', ['kind'], unique=False)
+    op.create_index(op.f('ix_model_versions_fingerprint'), 'model_versions', ['fingerprint'], unique=False)
+    op.create_index(op.f('ix_model_versions_is_active'), 'model_versions', ['is_active'], unique=False)
+    op.add_column('detection_logs', sa.Column('model_version', sa.String(), nullable=True))
+    op.add_column('diagnosis_logs', sa.Column('model_version', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('diagnosis_logs', 'model_version')
+    op.drop_column('detection_logs', 'model_version')
+    op.drop_index(op.f('ix_model_versions_is_active'), table_name='model_versions')
+    op.drop_index(op.f('ix_model_versions_fingerprint'), table_name='model_versions')
+    op.drop_index(op.f('ix_model_versions_kind'), table_name='model_versions')
+    op.drop_index(op.f('ix_model_versions_id'), table_name='model_versions')
+    op.drop_table('model_versions')
@@ -0,0 +1,29 @@
+"""Persist the read cursor of camera sources
+
+Revision ID: a5c8e2f4d713
+Revises: f2a7d4c9b816
+Create Date: 2026-10-19 09:14:52.603418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c8e2f4d713'
+down_revision: Union[str, None] = 'f2a7d4c9b816'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'camera_sources',
+        sa.Column('read_position', sa.BigInteger(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('camera_sources', 'read_position')
@@ -0,0 +1,34 @@
+"""Index detection_logs.annotated_image_path for the lazy annotated image render
+
+Revision ID: b7d1e9a3c620
+Revises: a5c8e2f4d713
+Create Date: 2026-10-19 11:02:37.418906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d1e9a3c620'
+down_revision: Union[str, None] = 'a5c8e2f4d713'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY (PostgreSQL): bảng log vẫn nhận ghi trong lúc tạo index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_detection_logs_annotated_image_path', 'detection_logs', ['annotated_image_path'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_detection_logs_annotated_image_path', table_name='detection_logs',
+            if_exists=True, postgresql_concurrently=True
+        )
@@ -0,0 +1,56 @@
+"""Add camera sources for scheduled barn camera checks
+
+Revision ID: c4e91a7b5d30
+Revises: 7d2a6c9e4f18
+Create Date: 2026-10-18 11:26:53.907114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e91a7b5d30'
+down_revision: Union[str, None] = '7d2a6c9e4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'camera_sources',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('flock_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('kind', sa.String(), nullable=True),
+        sa.Column('source', sa.String(), nullable=True),
+        sa.Column('interval_seconds', sa.Integer(), nullable=True),
+        sa.Column('frames_per_check', sa.Integer(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('next_check_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_checked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_success_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('consecutive_failures', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('last_detection_id', sa.Integer(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['flock_id'], ['flocks.id'], ),
+        sa.ForeignKeyConstraint(['last_detection_id'], ['detection_logs.id'], ),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_camera_sources_id'), 'camera_sources', ['id'], unique=False)
+    op.create_index(op.f('ix_camera_sources_flock_id'), 'camera_sources', ['flock_id'], unique=False)
+    op.create_index(op.f('ix_camera_sources_is_active'), 'camera_sources', ['is_active'], unique=False)
+    op.create_index(op.f('ix_camera_sources_next_check_at'), 'camera_sources', ['next_check_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_camera_sources_next_check_at'), table_name='camera_sources')
+    op.drop_index(op.f('ix_camera_sources_is_active'), table_name='camera_sources')
+    op.drop_index(op.f('ix_camera_sources_flock_id'), table_name='camera_sources')
+    op.drop_index(op.f('ix_camera_sources_id'), table_name='camera_sources')
+    op.drop_table('camera_sources')
@@ -0,0 +1,58 @@
+"""Add daily rollups for the admin dashboards, backfilled from the log tables
+
+Revision ID: e8b3f6a1c5d2
+Revises: c4e91a7b5d30
+Create Date: 2026-10-18 14:02:31.264817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3f6a1c5d2'
+down_revision: Union[str, None] = 'c4e91a7b5d30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_rollups',
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('sick', sa.Integer(), nullable=False),
+        sa.Column('tokens', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('source', 'day', 'key')
+    )
+
+    # Backfill một lần; sau đó bảng được cộng dồn khi ghi log
+    # (đối soát lại bằng scripts/rebuild_stats_rollups.py)
+    day = "date(created_at)" if op.get_bind().dialect.name == "sqlite" else "CAST(created_at AS DATE)"
+    op.execute(f"""
+        INSERT INTO daily_rollups (source, day, key, count, sick, tokens)
+        SELECT 'diagnosis', {day}, COALESCE(predicted_disease, ''), COUNT(id),
+               SUM(CASE WHEN COALESCE(predicted_disease, '') NOT IN ('Healthy', '') THEN 1 ELSE 0 END), 0
+        FROM diagnosis_logs WHERE created_at IS NOT NULL
+        GROUP BY {day}, COALESCE(predicted_disease, '')
+    """)
+    op.execute(f"""
+        INSERT INTO daily_rollups (source, day, key, count, sick, tokens)
+        SELECT 'detection', {day}, '', COUNT(id), SUM(CASE WHEN sick_count > 0 THEN 1 ELSE 0 END), 0
+        FROM detection_logs WHERE created_at IS NOT NULL
+        GROUP BY {day}
+    """)
+    op.execute(f"""
+        INSERT INTO daily_rollups (source, day, key, count, sick, tokens)
+        SELECT 'usage', {day}, COALESCE(feature, ''), COUNT(id), 0, COALESCE(SUM(total_tokens), 0)
+        FROM usage_logs WHERE created_at IS NOT NULL
+        GROUP BY {day}, COALESCE(feature, '')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('daily_rollups')
@@ -0,0 +1,48 @@
+"""Add composite and partial indexes for the per-user and recent log queries
+
+Revision ID: f2a7d4c9b816
+Revises: e8b3f6a1c5d2
+Create Date: 2026-10-18 15:37:09.841253
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7d4c9b816'
+down_revision: Union[str, None] = 'e8b3f6a1c5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tên, bảng, cột, điều kiện partial index)
+INDEXES = [
+    ('ix_diagnosis_logs_user_id_created_at', 'diagnosis_logs', ['user_id', 'created_at'], None),
+    ('ix_diagnosis_logs_user_id_sick', 'diagnosis_logs', ['user_id'], "predicted_disease != 'Healthy'"),
+    ('ix_diagnosis_logs_created_at', 'diagnosis_logs', ['created_at'], None),
+    ('ix_detection_logs_user_id_created_at', 'detection_logs', ['user_id', 'created_at'], None),
+    ('ix_detection_logs_user_id_sick', 'detection_logs', ['user_id'], 'sick_count > 0'),
+    ('ix_detection_logs_created_at', 'detection_logs', ['created_at'], None),
+    ('ix_usage_logs_created_at', 'usage_logs', ['created_at'], None),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY (PostgreSQL): bảng log lớn vẫn nhận ghi trong lúc tạo index,
+    # phải chạy ngoài transaction của migration
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -1,19 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date, case
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from sqlalchemy import func
+from typing import List, Dict, Any, Literal, Optional
+from datetime import date, timedelta
 from app.core.database import get_db
-from app.core.models import DiagnosisLog, DetectionLog, User, Disease, TreatmentStep, Medicine, GeneralKnowledge, Setting, UsageLog
+from app.core.models import DiagnosisLog, DetectionLog, User, Disease, TreatmentStep, Medicine, GeneralKnowledge, Setting, ModelVersion, CameraSource, Flock, DailyRollup
 from app.api.deps import get_current_active_superuser
 from app.schema.knowledge import DiseaseCreate, DiseaseOut, DiseaseUpdate, GeneralKnowledgeCreate, GeneralKnowledgeOut, GeneralKnowledgeUpdate, SettingCreate, SettingOut
 from app.schema.user import UserCreate, UserUpdate, UserOut
+from app.schema.model_registry import ModelActivationResponse, ModelVersionCreate, ModelVersionList, ModelVersionOut
+from app.schema.camera import CameraSourceCreate, CameraSourceList, CameraSourceOut, CameraSourceUpdate
 from app.core.security import get_password_hash
 from app.services.rag_service import get_rag_service
+from app.services.annotated_images import annotated_image_url
+from app.services.camera_ingest import CameraSourceError, get_camera_ingest_service, redact_source, resolve_camera_source
+from app.services.derivatives import derivative_urls
+from app.services.model_registry import get_model_registry
+from app.services.yolo_service import YOLOService, get_yolo_service
 from langchain.schema import HumanMessage
 
 router = APIRouter()
-rag_service = get_rag_service()
 
 # --- SYSTEM SETTINGS ENDPOINTS ---
 
@@ -143,31 +149,33 @@ async def update_setting(
         
     return result
 
+def _chart_days(days: int = 7):
+    """First day and list of the last `days` days (today included) of the dashboard charts"""
+    start_date = date.today() - timedelta(days=days - 1)
+    return start_date, [start_date + timedelta(days=offset) for offset in range(days)]
+
 @router.get("/usage-stats")
 async def get_usage_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_superuser)
 ):
-    """Lấy số liệu thống kê sử dụng AI"""
-    total_logs = db.query(UsageLog).count()
-    total_tokens = db.query(func.sum(UsageLog.total_tokens)).scalar() or 0
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=6)
-    daily_usage = db.query(
-        cast(UsageLog.created_at, Date).label('date'),
-        func.count(UsageLog.id).label('count'),
-        func.sum(UsageLog.total_tokens).label('tokens')
-    ).filter(UsageLog.created_at >= start_date).group_by(cast(UsageLog.created_at, Date)).all()
+    """Lấy số liệu thống kê sử dụng AI (đọc từ daily_rollups, không quét usage_logs)"""
+    usage = db.query(DailyRollup).filter(DailyRollup.source == "usage")
+    total_logs, total_tokens = usage.with_entities(
+        func.coalesce(func.sum(DailyRollup.count), 0), func.coalesce(func.sum(DailyRollup.tokens), 0)
+    ).one()
+    start_date, days = _chart_days()
+    daily_usage = usage.with_entities(
+        DailyRollup.day, func.sum(DailyRollup.count), func.sum(DailyRollup.tokens)
+    ).filter(DailyRollup.day >= start_date).group_by(DailyRollup.day).all()
+    usage_map = {day: {'count': count, 'tokens': tokens or 0} for day, count, tokens in daily_usage}
     usage_chart = []
-    current_day = start_date
-    usage_map = {str(r.date): {'count': r.count, 'tokens': r.tokens or 0} for r in daily_usage}
-    while current_day <= end_date:
-        day_str = current_day.strftime('%Y-%m-%d')
-        display_name = current_day.strftime('%d/%m')
-        data = usage_map.get(day_str, {'count': 0, 'tokens': 0})
-        usage_chart.append({"name": display_name, "requests": data['count'], "tokens": data['tokens']})
-        current_day += timedelta(days=1)
-    feature_dist = db.query(UsageLog.feature, func.count(UsageLog.id)).group_by(UsageLog.feature).all()
+    for day in days:
+        data = usage_map.get(day, {'count': 0, 'tokens': 0})
+        usage_chart.append({"name": day.strftime('%d/%m'), "requests": data['count'], "tokens": data['tokens']})
+    feature_dist = usage.with_entities(
+        DailyRollup.key, func.sum(DailyRollup.count)
+    ).group_by(DailyRollup.key).all()
     feature_data = [{"name": f.capitalize(), "value": c} for f, c in feature_dist]
     return {
         "total_requests": total_logs,
@@ -176,6 +184,156 @@ async def get_usage_stats(
         "feature_distribution": feature_data
     }
 
+# --- MODEL REGISTRY ENDPOINTS ---
+
+def _model_version_out(version: ModelVersion, yolo_service: YOLOService) -> ModelVersionOut:
+    out = ModelVersionOut.model_validate(version)
+    out.loaded = yolo_service.model_versions.get(version.kind) == version.fingerprint
+    return out
+
+@router.get("/model-versions", response_model=ModelVersionList)
+async def list_model_versions(
+    kind: Optional[Literal["detection", "classification"]] = None,
+    db: Session = Depends(get_db),
+    yolo_service: YOLOService = Depends(get_yolo_service),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Các phiên bản model đã đăng ký và fingerprint model đang chạy trong process này"""
+    versions = get_model_registry().list_versions(db, kind)
+    return ModelVersionList(
+        active=yolo_service.model_versions,
+        versions=[_model_version_out(v, yolo_service) for v in versions]
+    )
+
+@router.post("/model-versions", response_model=ModelVersionOut)
+async def register_model_version(
+    version_in: ModelVersionCreate,
+    db: Session = Depends(get_db),
+    yolo_service: YOLOService = Depends(get_yolo_service),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Đăng ký file model (đã chép vào model_store) thành version mới, chưa kích hoạt"""
+    version = await get_model_registry().register(
+        db,
+        kind=version_in.kind,
+        weights_path=version_in.weights_path,
+        version=version_in.version,
+        metrics=version_in.metrics,
+        notes=version_in.notes,
+        user_id=current_user.id
+    )
+    return _model_version_out(version, yolo_service)
+
+@router.post("/model-versions/{version_id}/activate", response_model=ModelActivationResponse)
+async def activate_model_version(
+    version_id: int,
+    db: Session = Depends(get_db),
+    yolo_service: YOLOService = Depends(get_yolo_service),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Nạp, warm-up và thay model đang chạy không cần restart (request đang chạy dùng
+    nốt model cũ). Các worker khác tự theo trong vòng `registry_poll_seconds`.
+    Rollback = kích hoạt lại version trước.
+    """
+    version, swap = await get_model_registry().activate(db, version_id)
+    return ModelActivationResponse(
+        model=_model_version_out(version, yolo_service),
+        previous_version=swap["previous_version"],
+        load_seconds=swap["load_seconds"],
+        warmup_seconds=swap["warmup_seconds"],
+        latency_ms=swap["latency_ms"],
+        warm_clones=swap["warm_clones"]
+    )
+
+# --- CAMERA SOURCES (kiểm tra tự động camera cố định theo đàn) ---
+
+def _camera_out(camera: CameraSource) -> CameraSourceOut:
+    out = CameraSourceOut.model_validate(camera)
+    out.source = redact_source(camera.source)
+    return out
+
+def _get_camera(db: Session, camera_id: int) -> CameraSource:
+    camera = db.get(CameraSource, camera_id)
+    if camera is None:
+        raise CameraSourceError(404, "Không tìm thấy camera")
+    return camera
+
+@router.get("/cameras", response_model=CameraSourceList)
+async def list_cameras(
+    flock_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Camera đã đăng ký, trạng thái lần kiểm tra gần nhất và metrics của scheduler"""
+    query = db.query(CameraSource)
+    if flock_id is not None:
+        query = query.filter(CameraSource.flock_id == flock_id)
+    return CameraSourceList(
+        cameras=[_camera_out(camera) for camera in query.order_by(CameraSource.id).all()],
+        ingest=get_camera_ingest_service().metrics()
+    )
+
+@router.post("/cameras", response_model=CameraSourceOut)
+async def create_camera(
+    camera_in: CameraSourceCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Đăng ký camera (RTSP/HTTP, file hoặc thư mục trong camera_ingest_local_dir) cho một đàn"""
+    if db.get(Flock, camera_in.flock_id) is None:
+        raise CameraSourceError(404, "Không tìm thấy đàn")
+    kind, source = resolve_camera_source(camera_in.source)
+    camera = CameraSource(
+        flock_id=camera_in.flock_id,
+        name=camera_in.name,
+        kind=kind,
+        source=source,
+        interval_seconds=camera_in.interval_seconds,
+        frames_per_check=camera_in.frames_per_check,
+        is_active=camera_in.is_active,
+        consecutive_failures=0,
+        created_by=current_user.id
+    )
+    db.add(camera)
+    db.commit()
+    db.refresh(camera)
+    get_camera_ingest_service().wake()
+    return _camera_out(camera)
+
+@router.put("/cameras/{camera_id}", response_model=CameraSourceOut)
+async def update_camera(
+    camera_id: int,
+    camera_in: CameraSourceUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """Sửa camera; đổi nguồn hoặc bật lại thì kiểm tra ngay ở vòng kế tiếp"""
+    camera = _get_camera(db, camera_id)
+    update_data = camera_in.model_dump(exclude_unset=True)
+    if "source" in update_data:
+        camera.kind, camera.source = resolve_camera_source(update_data.pop("source"))
+        camera.next_check_at, camera.consecutive_failures, camera.last_error = None, 0, None
+        camera.read_position = 0
+    if update_data.get("is_active") and not camera.is_active:
+        camera.next_check_at = None
+    for field, value in update_data.items():
+        setattr(camera, field, value)
+    db.commit()
+    db.refresh(camera)
+    get_camera_ingest_service().wake()
+    return _camera_out(camera)
+
+@router.delete("/cameras/{camera_id}")
+async def delete_camera(
+    camera_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_superuser)
+):
+    db.delete(_get_camera(db, camera_id))
+    db.commit()
+    return {"message": "Đã xóa thành công"}
+
 # --- EXISTING STATS ENDPOINTS ---
 
 @router.get("/stats")
@@ -183,50 +341,42 @@ async def get_dashboard_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_superuser)
 ):
-    """Lấy số liệu thống kê tổng quan cho Dashboard"""
+    """Lấy số liệu thống kê tổng quan cho Dashboard (đọc từ daily_rollups)"""
     
     # 1. Basic Counts
-    total_diagnosis = db.query(DiagnosisLog).count()
-    total_detections = db.query(DetectionLog).count()
-    sick_cases = db.query(DiagnosisLog).filter(DiagnosisLog.predicted_disease != 'Healthy').count()
+    diagnosis = db.query(DailyRollup).filter(DailyRollup.source == "diagnosis")
+    total_diagnosis, sick_cases = diagnosis.with_entities(
+        func.coalesce(func.sum(DailyRollup.count), 0), func.coalesce(func.sum(DailyRollup.sick), 0)
+    ).one()
+    total_detections = db.query(func.coalesce(func.sum(DailyRollup.count), 0)).filter(
+        DailyRollup.source == "detection"
+    ).scalar()
     
     # 2. Daily Stats (Last 7 Days)
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=6)
-    
-    daily_query = db.query(
-        cast(DiagnosisLog.created_at, Date).label('date'),
-        func.count(DiagnosisLog.id).label('total'),
-        func.sum(case((DiagnosisLog.predicted_disease != 'Healthy', 1), else_=0)).label('sick')
-    ).filter(
-        DiagnosisLog.created_at >= start_date
-    ).group_by(cast(DiagnosisLog.created_at, Date)).all()
+    start_date, days = _chart_days()
+    daily_query = diagnosis.with_entities(
+        DailyRollup.day, func.sum(DailyRollup.count), func.sum(DailyRollup.sick)
+    ).filter(DailyRollup.day >= start_date).group_by(DailyRollup.day).all()
     
     # Map query result to list of days
+    data_map = {day: {'total': total, 'sick': sick or 0} for day, total, sick in daily_query}
     daily_stats = []
-    current_day = start_date
-    data_map = {str(r.date): {'total': r.total, 'sick': r.sick or 0} for r in daily_query}
-    
-    while current_day <= end_date:
-        day_str = current_day.strftime('%Y-%m-%d')
-        display_name = current_day.strftime('%d/%m') 
-        stat = data_map.get(day_str, {'total': 0, 'sick': 0})
+    for day in days:
+        stat = data_map.get(day, {'total': 0, 'sick': 0})
         daily_stats.append({
-            "name": display_name,
+            "name": day.strftime('%d/%m'),
             "visits": stat['total'],
             "sick": stat['sick']
         })
-        current_day += timedelta(days=1)
 
     # 3. Disease Distribution (Pie Chart)
-    dist_query = db.query(
-        DiagnosisLog.predicted_disease, 
-        func.count(DiagnosisLog.id)
+    dist_query = diagnosis.with_entities(
+        DailyRollup.key, func.sum(DailyRollup.count)
     ).filter(
-        DiagnosisLog.predicted_disease != 'Healthy'
+        DailyRollup.sick > 0
     ).group_by(
-        DiagnosisLog.predicted_disease
-    ).order_by(func.count(DiagnosisLog.id).desc()).limit(5).all()
+        DailyRollup.key
+    ).order_by(func.sum(DailyRollup.count).desc()).limit(5).all()
     
     healthy_count = total_diagnosis - sick_cases
     pie_data = [{"name": "Khỏe mạnh", "value": healthy_count}]
@@ -252,24 +402,32 @@ async def get_recent_logs(
     diagnosis_logs = db.query(DiagnosisLog).order_by(DiagnosisLog.created_at.desc()).limit(limit).all()
     formatted_logs = []
     for log in diagnosis_logs:
+        thumbnail_url, preview_url = derivative_urls(log, f"/uploads/{log.image_path}")
         formatted_logs.append({
             "id": log.id,
             "type": "Phân",
             "image_url": f"/uploads/{log.image_path}",
+            "thumbnail_url": thumbnail_url,
+            "preview_url": preview_url,
             "result": log.predicted_disease,
             "confidence": log.confidence,
+            "model_version": log.model_version,
             "created_at": log.created_at,
             "status": "Hoàn thành" if log.verified_result is None else "Đã xác nhận"
         })
         
     detection_logs = db.query(DetectionLog).order_by(DetectionLog.created_at.desc()).limit(limit).all()
     for log in detection_logs:
+        thumbnail_url, preview_url = derivative_urls(log, annotated_image_url(log.annotated_image_path))
         formatted_logs.append({
             "id": log.id,
             "type": "Hành vi/Sức khỏe",
-            "image_url": f"/uploads/{log.annotated_image_path}",
+            "image_url": annotated_image_url(log.annotated_image_path),
+            "thumbnail_url": thumbnail_url,
+            "preview_url": preview_url,
             "result": f"{log.sick_count} gà bệnh / {log.total_chickens} tổng",
             "confidence": 0.0,
+            "model_version": log.model_version,
             "created_at": log.created_at,
             "status": "Cần chú ý" if log.sick_count > 0 else "Bình thường"
         })
@@ -299,7 +457,7 @@ async def create_general_knowledge(
     db.add(knowledge)
     db.commit()
     db.refresh(knowledge)
-    background_tasks.add_task(rag_service.sync_general_knowledge, knowledge.id)
+    background_tasks.add_task(get_rag_service().sync_general_knowledge, knowledge.id)
     return knowledge
 
 @router.put("/knowledge/{k_id}", response_model=GeneralKnowledgeOut)
@@ -318,7 +476,7 @@ async def update_general_knowledge(
     knowledge.sync_status = "PENDING"
     db.commit()
     db.refresh(knowledge)
-    background_tasks.add_task(rag_service.sync_general_knowledge, knowledge.id)
+    background_tasks.add_task(get_rag_service().sync_general_knowledge, knowledge.id)
     return knowledge
 
 @router.delete("/knowledge/{k_id}")
@@ -331,7 +489,7 @@ async def delete_general_knowledge(
     if not knowledge:
         raise HTTPException(status_code=404, detail="Không tìm thấy bài viết")
     try:
-        rag_service.delete_general_knowledge_vector(k_id)
+        get_rag_service().delete_general_knowledge_vector(k_id)
     except:
         pass
     db.delete(knowledge)
@@ -385,7 +543,7 @@ async def create_disease(
             db.add(med)
     db.commit()
     db.refresh(disease)
-    background_tasks.add_task(rag_service.sync_disease, disease.id)
+    background_tasks.add_task(get_rag_service().sync_disease, disease.id)
     return disease
 
 @router.put("/diseases/{disease_id}", response_model=DiseaseOut)
@@ -427,7 +585,7 @@ async def update_disease(
     disease.sync_error = None
     db.commit()
     db.refresh(disease)
-    background_tasks.add_task(rag_service.sync_disease, disease.id)
+    background_tasks.add_task(get_rag_service().sync_disease, disease.id)
     return disease
 
 @router.delete("/diseases/{disease_id}")
@@ -440,7 +598,7 @@ async def delete_disease(
     if not disease:
         raise HTTPException(status_code=404, detail="Không tìm thấy bệnh")
     try:
-        rag_service.delete_disease_vector(disease_id)
+        get_rag_service().delete_disease_vector(disease_id)
     except Exception as e:
         print(f"Delete vector error: {e}")
     db.delete(disease)
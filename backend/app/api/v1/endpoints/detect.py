@@ -1,147 +1,439 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-import cv2
-import numpy as np
+from fastapi.responses import FileResponse, Response, StreamingResponse
+import asyncio
+import json
+import math
 import base64
 import os
 import uuid
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, Dict, Literal, Optional, Tuple
 from sqlalchemy.orm import Session, joinedload
 
 from app.services.yolo_service import get_yolo_service, YOLOService
-from app.schema.detection import DetectionResponse, ClassificationResponse, DetectionBox, VideoAnalysisResponse
-from app.core.database import get_db
-from app.core.models import DiagnosisLog, DetectionLog, User, Disease, TreatmentStep
+from app.schema.detection import DetectionResponse, ClassificationResponse, DetectionBox, VideoAnalysisResponse, VideoJobResponse
+from app.core.database import get_db, SessionLocal
+from app.core.models import DiagnosisLog, DetectionLog, User, Disease, TreatmentStep, VideoJob
 from app.config import get_settings
 from app.api import deps
 from app.services.usage_service import usage_service
+from app.services.video_job_service import get_video_job_service, TERMINAL_STATUSES
+from app.services.result_cache import ResultCache, get_result_cache
+from app.services.derivatives import get_derivative_service
+from app.services.stats_rollup import record_detection, record_diagnosis
+from app.services.annotated_images import annotated_image_url, annotated_rel_path, load_or_render, parse_file_id, verify_signature
+from app.services.image_ingest import DecodedImage, ImageHeader, check_image_limits, decode_image, probe_image_file
+from app.services.upload_store import IncomingUpload, receive_upload
+from app.services.video_preview import preview_path
+from app.services.video_sidecar import sidecar_path
 
 router = APIRouter()
 settings = get_settings()
 
-@router.post("/video_analyze", response_model=VideoAnalysisResponse)
-async def analyze_video(
-    file: UploadFile = File(...),
-    yolo_service: YOLOService = Depends(get_yolo_service),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_active_user)
-) -> Any:
-    """
-    Analyze video to detect sick chickens
-    """
-    # 1. Save uploaded video
+DETECTION_CONF_THRESHOLD = 0.3
+
+
+# Ảnh annotated không đổi sau khi render (file_id là uuid) -> cho client cache lâu
+ANNOTATED_IMAGE_HEADERS = {"Cache-Control": "private, max-age=604800"}
+
+
+async def _check_image_upload(upload: IncomingUpload) -> ImageHeader:
+    """Check format / pixel caps of a received image from its header, before any decoding"""
+    header = await asyncio.to_thread(probe_image_file, upload.path)
+    check_image_limits(header, settings.upload_max_pixels)
+    return header
+
+
+async def _decode_upload(
+    yolo_service: YOLOService, kind: str, upload: IncomingUpload, header: ImageHeader, tiled: bool = False
+) -> DecodedImage:
+    # Detection letterbox theo cạnh dài, classification resize theo cạnh ngắn
+    target_size = yolo_service.input_size(kind) if settings.upload_reduced_decode else None
+    fit = "long" if kind == "detection" else "short"
+    if tiled and target_size:
+        # Tiled: chỉ thu nhỏ tới mức model vẫn thấy từng tile ở độ phân giải của nó
+        plan = yolo_service.tile_plan(header.width, header.height)
+        if plan is not None:
+            target_size = math.ceil(max(header.width, header.height) * plan.scale)
+    return await yolo_service.executor.run(decode_image, upload.path, header, target_size, fit)
+
+
+async def _cache_lookup(namespace: str, digest: str, model_version: Optional[str], **params) -> Tuple[Optional[ResultCache], Optional[str], Optional[Dict]]:
+    """Return (cache, key, cached entry); cache is None when caching is disabled"""
+    if not settings.result_cache_enabled:
+        return None, None, None
+    cache = get_result_cache(namespace)
+    key, cached = await asyncio.to_thread(cache.lookup, digest, model_version or "unversioned", **params)
+    return cache, key, cached
+
+
+async def _save_video_upload(file: UploadFile) -> Tuple[str, str, str]:
+    """Save an uploaded clip, return (file_id, input_rel_path, output_rel_path)"""
     file_id = str(uuid.uuid4())
-    file_ext = os.path.splitext(file.filename)[1] or ".mp4"
-    
-    input_filename = f"{file_id}_input{file_ext}"
-    input_rel_path = os.path.join("detections", input_filename)
-    input_abs_path = os.path.join(settings.upload_dir, input_rel_path)
-    
-    with open(input_abs_path, "wb") as f:
-        while content := await file.read(1024 * 1024): # Read 1MB chunks
-            f.write(content)
-            
-    # 2. Process video
+
+    # Ghi theo nội dung: cùng một clip gửi lại không tốn thêm dung lượng
+    async with receive_upload(file, settings.video_upload_max_bytes, what="Video") as upload:
+        input_rel_path = await upload.commit("detections", default_ext=".mp4")
+
     output_filename = f"{file_id}_output.mp4"
     output_rel_path = os.path.join("detections", output_filename)
-    output_abs_path = os.path.join(settings.upload_dir, output_rel_path)
-    
-    # Process with skip_frames=3 (process 1 frame every 4 frames)
-    stats = await yolo_service.process_video(
-        input_path=input_abs_path,
-        output_path=output_abs_path,
-        skip_frames=3
-    )
-    
-    # 3. Log usage
-    usage_service.log_usage(
-        feature="video_detection",
-        provider="yolo",
-        model="yolov8n",
-        user_id=current_user.id
-    )
-    
-    # Generate relative path for GIF
-    gif_rel_path = output_rel_path.replace('.mp4', '.gif')
-    
-    # 4. Save log (Optional: reuse DetectionLog or create new VideoLog table)
-    # For now, we just log a representative entry in DetectionLog using the video thumbnail?
-    # Or just skip DB logging for MVP video demo
-    
+    return file_id, input_rel_path, output_rel_path
+
+
+def _upload_url(rel_path: str) -> str:
+    return f"/uploads/{rel_path}".replace("\\", "/")
+
+
+def _video_analysis_response(output_rel_path: str, stats: Dict) -> VideoAnalysisResponse:
+    analysis_only = stats.get("analysis_only", False)
+    # Kết quả cũ (trước khi có báo cáo preview) luôn là GIF
+    preview = stats.get("preview")
+    preview_url = None
+    if preview is not None or "preview" not in stats:
+        preview_format = preview["format"] if preview else "gif"
+        preview_url = _upload_url(preview_path(output_rel_path, preview_format))
     return VideoAnalysisResponse(
-        video_url=f"/uploads/{output_rel_path}".replace("\\", "/"),
-        gif_url=f"/uploads/{gif_rel_path}".replace("\\", "/"),
+        video_url=None if analysis_only else _upload_url(output_rel_path),
+        detections_url=_upload_url(sidecar_path(output_rel_path)) if stats.get("detections") else None,
+        gif_url=preview_url if preview_url and preview_url.endswith(".gif") else None,
+        preview_url=preview_url,
+        preview=preview,
         total_frames=stats["total_frames"],
         processed_frames=stats["processed_frames"],
         max_total_chickens=stats["max_total_chickens"],
         max_sick_chickens=stats["max_sick_chickens"],
         has_sick_chickens=stats["has_sick_chickens"],
+        unique_total_chickens=stats.get("unique_total_chickens"),
+        unique_sick_chickens=stats.get("unique_sick_chickens"),
+        tracking=stats.get("tracking"),
+        sampling=stats.get("sampling"),
         alert=stats["alert"]
     )
 
+
+def _video_job_response(job: VideoJob) -> VideoJobResponse:
+    progress = 0.0
+    eta_seconds = None
+    if job.status == "SUCCESS":
+        progress = 1.0
+    elif job.total_frames:
+        progress = min(1.0, job.frames_processed / job.total_frames)
+
+    # ETA = thời gian đã chạy / số frame đã xử lý * số frame còn lại
+    if job.status == "RUNNING" and job.started_at and job.frames_processed and job.total_frames:
+        started_at = job.started_at
+        if started_at.tzinfo is None:
+            started_at = started_at.replace(tzinfo=timezone.utc)
+        elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+        remaining = max(0, job.total_frames - job.frames_processed)
+        eta_seconds = round(elapsed / job.frames_processed * remaining, 1)
+
+    return VideoJobResponse(
+        job_id=job.id,
+        status=job.status,
+        total_frames=job.total_frames or 0,
+        frames_processed=job.frames_processed or 0,
+        progress=round(progress, 4),
+        current_sick_count=job.current_sick_count or 0,
+        eta_seconds=eta_seconds,
+        status_url=f"/api/v1/detect/video_jobs/{job.id}",
+        events_url=f"/api/v1/detect/video_jobs/{job.id}/events",
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        result=_video_analysis_response(job.output_path, job.result) if job.status == "SUCCESS" and job.result else None,
+        error=job.error
+    )
+
+
+def _get_user_video_job(db: Session, job_id: str, current_user: User) -> VideoJob:
+    job = db.query(VideoJob).filter(VideoJob.id == job_id).first()
+    if not job or (job.user_id != current_user.id and not current_user.is_superuser):
+        raise HTTPException(status_code=404, detail="Không tìm thấy video job")
+    return job
+
+
+@router.post("/video_jobs", response_model=VideoJobResponse, status_code=202)
+async def submit_video_job(
+    file: UploadFile = File(...),
+    analysis_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Submit a video for background analysis and return immediately with a job id.
+    Poll `status_url` or stream `events_url` (Server-Sent Events) for progress.
+    `analysis_only=true` skips the annotated output video: the result links a
+    per-frame detections sidecar (`detections_url`, NDJSON) and the preview.
+    """
+    file_id, input_rel_path, output_rel_path = await _save_video_upload(file)
+    job = get_video_job_service().create_job(
+        db,
+        user_id=current_user.id,
+        job_id=file_id,
+        input_path=input_rel_path,
+        output_path=output_rel_path,
+        analysis_only=analysis_only
+    )
+    return _video_job_response(job)
+
+
+@router.get("/video_jobs/{job_id}", response_model=VideoJobResponse)
+async def get_video_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """Current status, progress and ETA of a video job"""
+    return _video_job_response(_get_user_video_job(db, job_id, current_user))
+
+
+@router.get("/video_jobs/{job_id}/events")
+async def stream_video_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """Stream job progress as Server-Sent Events until the job finishes"""
+    _get_user_video_job(db, job_id, current_user)
+
+    def load_snapshot() -> Optional[str]:
+        # Session riêng cho mỗi lần đọc: session của request đã đóng khi stream chạy
+        session = SessionLocal()
+        try:
+            job = session.query(VideoJob).filter(VideoJob.id == job_id).first()
+            if job is None:
+                return None
+            return _video_job_response(job).model_dump_json()
+        finally:
+            session.close()
+
+    async def event_stream():
+        last_payload = None
+        while True:
+            payload = await asyncio.to_thread(load_snapshot)
+            if payload is None:
+                break
+            if payload != last_payload:
+                yield f"data: {payload}\n\n"
+                last_payload = payload
+            if json.loads(payload)["status"] in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(settings.video_job_progress_interval)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _load_video_job(job_id: str) -> Optional[VideoJob]:
+    # Session riêng cho mỗi lần đọc (gọi qua asyncio.to_thread)
+    session = SessionLocal()
+    try:
+        return session.query(VideoJob).filter(VideoJob.id == job_id).first()
+    finally:
+        session.close()
+
+
+@router.post("/video_analyze", response_model=VideoAnalysisResponse)
+async def analyze_video(
+    file: UploadFile = File(...),
+    analysis_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user)
+) -> Any:
+    """
+    Analyze video to detect sick chickens (blocking).
+    Long clips should use `POST /video_jobs` instead: this endpoint submits the
+    same background job and waits for it, so it shares `video_job_concurrency`
+    with the job workers instead of starting its own analysis.
+    `analysis_only=true`: no annotated video, detections come as an NDJSON
+    sidecar (`detections_url`) for client-side overlay — much less CPU.
+    """
+    job_service = get_video_job_service()
+    if not job_service.running:
+        raise HTTPException(status_code=503, detail="Video workers are not running, retry shortly")
+
+    # 1. Save uploaded video, queue it like POST /video_jobs (usage được worker ghi)
+    file_id, input_rel_path, output_rel_path = await _save_video_upload(file)
+    job_service.create_job(
+        db,
+        user_id=current_user.id,
+        job_id=file_id,
+        input_path=input_rel_path,
+        output_path=output_rel_path,
+        analysis_only=analysis_only
+    )
+
+    # 2. Chờ worker xử lý xong (client ngắt kết nối thì job vẫn chạy tiếp)
+    while True:
+        await asyncio.sleep(settings.video_job_progress_interval)
+        job = await asyncio.to_thread(_load_video_job, file_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Không tìm thấy video job")
+        if job.status in TERMINAL_STATUSES:
+            break
+
+    if job.status != "SUCCESS" or not job.result:
+        raise HTTPException(status_code=500, detail=f"Video analysis failed: {job.error or 'unknown error'}")
+    return _video_analysis_response(output_rel_path, job.result)
+
+@router.get("/annotated/{file_id}.jpg")
+async def get_annotated_image(
+    file_id: str,
+    expires: int = 0,
+    sig: str = "",
+    yolo_service: YOLOService = Depends(get_yolo_service),
+    db: Session = Depends(get_db)
+) -> Any:
+    """
+    Annotated image of a detection. Requests made with `response_mode=boxes` do not
+    render it: it is drawn from the stored original and boxes on the first GET,
+    written to disk and served as a plain file afterwards.
+    Only the signed URLs returned by the API (`annotated_image_url`) are accepted.
+    """
+    file_id = parse_file_id(file_id)
+    if file_id is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy ảnh")
+    if not verify_signature(file_id, expires, sig):
+        raise HTTPException(status_code=403, detail="Link ảnh không hợp lệ hoặc đã hết hạn")
+
+    annot_rel_path = annotated_rel_path(file_id)
+    annot_abs_path = os.path.join(settings.upload_dir, annot_rel_path)
+    if os.path.exists(annot_abs_path):
+        return FileResponse(annot_abs_path, media_type="image/jpeg", headers=ANNOTATED_IMAGE_HEADERS)
+
+    db_log = db.query(DetectionLog).filter(DetectionLog.annotated_image_path == annot_rel_path).first()
+    if db_log is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy ảnh")
+
+    buffer = await yolo_service.executor.run(
+        load_or_render, db_log.image_path, annot_rel_path, db_log.raw_result or []
+    )
+    if buffer is None:
+        raise HTTPException(status_code=404, detail="Ảnh gốc không còn trên server")
+    return Response(content=buffer, media_type="image/jpeg", headers=ANNOTATED_IMAGE_HEADERS)
+
+
 @router.post("/detect", response_model=DetectionResponse)
 async def detect_chickens(
     file: UploadFile = File(...),
+    response_mode: Literal["full", "boxes"] = "full",
+    tiled: bool = False,
     yolo_service: YOLOService = Depends(get_yolo_service),
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ) -> Any:
     """
-    Detect healthy and sick chickens in an image and save to database
+    Detect healthy and sick chickens in an image and save to database.
+
+    `response_mode=full` embeds the annotated JPEG as `image_base64`.
+    `response_mode=boxes` returns only the boxes (in original image pixels) and
+    `annotated_image_url`; the annotated image is rendered on its first GET.
+    `tiled=true` runs the detector on overlapping tiles of high-resolution
+    images (wide-angle barn photos) and reports the per-tile latency in `tiling`.
     """
-    # Read image
-    contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    if image is None:
-        raise HTTPException(status_code=400, detail="Invalid image file")
-    
-    # Run detection
-    results = await yolo_service.detect_sick_chickens(image)
-    
-    # Save images
-    file_id = str(uuid.uuid4())
-    file_ext = os.path.splitext(file.filename)[1] or ".jpg"
-    
-    # 1. Original image
-    orig_filename = f"{file_id}_orig{file_ext}"
-    orig_rel_path = os.path.join("detections", orig_filename)
-    orig_abs_path = os.path.join(settings.upload_dir, orig_rel_path)
-    with open(orig_abs_path, "wb") as f:
-        f.write(contents)
-        
-    # 2. Annotated image
-    annot_filename = f"{file_id}_annot.jpg"
-    annot_rel_path = os.path.join("detections", annot_filename)
-    annot_abs_path = os.path.join(settings.upload_dir, annot_rel_path)
-    cv2.imwrite(annot_abs_path, results["annotated_image"])
-    
-    # Log usage
-    usage_service.log_usage(
-        feature="detection",
-        provider="yolo",
-        model="yolov8n",
-        user_id=current_user.id
-    )
-    
-    # Save to Database
-    db_log = DetectionLog(
-        image_path=orig_rel_path,
-        annotated_image_path=annot_rel_path,
-        total_chickens=results["total_chickens"],
-        healthy_count=results["healthy_count"],
-        sick_count=results["sick_count"],
-        raw_result=results["detections"],
-        user_id=current_user.id
-    )
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
-    
-    # Convert annotated image to base64 for immediate display
-    _, buffer = cv2.imencode('.jpg', results["annotated_image"])
-    img_base64 = base64.b64encode(buffer).decode('utf-8')
-    
+    # Nhận ảnh ra file tạm + hash trong lúc nhận; từ chối ảnh quá nặng / sai định dạng / quá nhiều pixel trước khi decode
+    async with receive_upload(file, settings.upload_max_bytes, what="Ảnh") as upload:
+        header = await _check_image_upload(upload)
+
+        # Ảnh đã gửi trước đó (retry trên mạng chập chờn, mở lại app) -> dùng lại kết quả
+        # và ảnh đã lưu, không decode / chạy model / ghi file lần nữa
+        model_version = yolo_service.model_versions["detection"]
+        cache, cache_key, cached = await _cache_lookup(
+            "detection", upload.sha256, model_version,
+            conf=DETECTION_CONF_THRESHOLD, reduced_decode=settings.upload_reduced_decode, tiled=tiled
+        )
+        if cached is not None and not os.path.exists(os.path.join(settings.upload_dir, cached["image_path"])):
+            # File đã bị dọn -> coi như miss
+            await asyncio.to_thread(cache.invalidate, cache_key)
+            cached = None
+
+        # Ảnh + box dùng để vẽ ảnh annotated ở mode full (None -> vẽ lại từ ảnh gốc đã lưu)
+        render_image, render_detections = None, None
+        if cached is not None:
+            results = cached["results"]
+            orig_rel_path = cached["image_path"]
+            annot_rel_path = cached["annotated_image_path"]
+        else:
+            # Decode thẳng ở độ phân giải vừa đủ cho model (ảnh điện thoại 12-50 MP)
+            decoded = await _decode_upload(yolo_service, "detection", upload, header, tiled)
+
+            # Run detection (vẽ box để sau: chỉ vẽ khi client cần ảnh)
+            results = await yolo_service.detect_sick_chickens(
+                decoded.image, DETECTION_CONF_THRESHOLD, annotate=False, tiled=tiled
+            )
+            render_image, render_detections = decoded.image, results["detections"]
+            # Box trả về / lưu DB luôn theo pixel của ảnh gốc client gửi
+            results["detections"] = decoded.to_original(results["detections"])
+
+            # Save images
+            file_id = str(uuid.uuid4())
+
+            # 1. Original image (luôn lưu: ảnh annotated được vẽ lại từ đây khi cần).
+            # Rename file tạm sang đường dẫn theo nội dung, không ghi lại lần nữa
+            orig_rel_path = await upload.commit("detections", default_ext=".jpg")
+
+            # 2. Annotated image: ghi ngay ở mode full, ở mode boxes thì GET đầu tiên mới render
+            annot_rel_path = annotated_rel_path(file_id)
+
+            # Log usage
+            usage_service.log_usage(
+                feature="detection",
+                provider="yolo",
+                model="yolov8n",
+                user_id=current_user.id
+            )
+
+    img_base64 = None
+    if response_mode == "full":
+        # Encode JPEG một lần: dùng cho cả file lưu trữ lẫn base64 trả về
+        buffer = await yolo_service.executor.run(
+            load_or_render, orig_rel_path, annot_rel_path, render_detections or results["detections"], render_image
+        )
+        if buffer is not None:
+            img_base64 = base64.b64encode(buffer).decode('utf-8')
+
+    # Save to Database (cùng user gửi lại cùng ảnh -> không ghi thêm dòng lịch sử trùng)
+    db_log = None
+    if cached is not None and cached["user_id"] == current_user.id:
+        db_log = db.get(DetectionLog, cached["log_id"])
+    if db_log is None:
+        db_log = DetectionLog(
+            image_path=orig_rel_path,
+            annotated_image_path=annot_rel_path,
+            total_chickens=results["total_chickens"],
+            healthy_count=results["healthy_count"],
+            sick_count=results["sick_count"],
+            raw_result=results["detections"],
+            model_version=results.get("model_version"),
+            user_id=current_user.id
+        )
+        db.add(db_log)
+        record_detection(db, db_log)
+        db.commit()
+        db.refresh(db_log)
+    if db_log.thumbnail_path is None:
+        # Thumbnail / preview cho màn hình lịch sử: sinh nền, không giữ request
+        get_derivative_service().submit("detection", db_log.id)
+
+    # Model bị hot-swap giữa lúc tra cache và lúc infer -> kết quả không thuộc khoá này
+    if cache is not None and cached is None and results.get("model_version") == model_version:
+        await asyncio.to_thread(cache.set, cache_key, {
+            "image_path": orig_rel_path,
+            "annotated_image_path": annot_rel_path,
+            "log_id": db_log.id,
+            "user_id": current_user.id,
+            "results": {
+                key: results[key] for key in (
+                    "total_chickens", "healthy_count", "sick_count", "detections", "has_sick_chickens", "alert",
+                    "model_version"
+                )
+            }
+        })
+
     # Map detections to schema
     detections = [
         DetectionBox(
@@ -159,7 +451,10 @@ async def detect_chickens(
         detections=detections,
         has_sick_chickens=results["has_sick_chickens"],
         alert=results["alert"],
-        image_base64=img_base64
+        image_base64=img_base64,
+        annotated_image_url=annotated_image_url(annot_rel_path),
+        tiling=results.get("tiling"),
+        cached=cached is not None
     )
 
 @router.post("/classify", response_model=ClassificationResponse)
@@ -173,44 +468,67 @@ async def classify_disease(
     Classify chicken disease from a fecal image and save to database
     """
     # Read image
-    contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    if image is None:
-        raise HTTPException(status_code=400, detail="Invalid image file")
-    
-    # Save original image
-    file_ext = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{file_ext}"
-    relative_path = os.path.join("diagnoses", filename)
-    file_path = os.path.join(settings.upload_dir, relative_path)
-    
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    # Run classification
-    results = await yolo_service.classify_disease(image)
-    
-    # Log usage
-    usage_service.log_usage(
-        feature="classification",
-        provider="yolo",
-        model="yolov8n-cls",
-        user_id=current_user.id
-    )
+    async with receive_upload(file, settings.upload_max_bytes, what="Ảnh") as upload:
+        header = await _check_image_upload(upload)
+
+        model_version = yolo_service.model_versions["classification"]
+        cache, cache_key, cached = await _cache_lookup(
+            "classification", upload.sha256, model_version,
+            reduced_decode=settings.upload_reduced_decode
+        )
+        if cached is not None and not os.path.exists(os.path.join(settings.upload_dir, cached["image_path"])):
+            await asyncio.to_thread(cache.invalidate, cache_key)
+            cached = None
+
+        if cached is not None:
+            results = cached["results"]
+            relative_path = cached["image_path"]
+        else:
+            decoded = await _decode_upload(yolo_service, "classification", upload, header)
+
+            # Save original image (rename file tạm sang đường dẫn theo nội dung)
+            relative_path = await upload.commit("diagnoses", default_ext=".jpg")
+
+            # Run classification
+            results = await yolo_service.classify_disease(decoded.image)
+
+            # Log usage
+            usage_service.log_usage(
+                feature="classification",
+                provider="yolo",
+                model="yolov8n-cls",
+                user_id=current_user.id
+            )
 
     # Save to Database
-    db_log = DiagnosisLog(
-        image_path=relative_path,
-        predicted_disease=results["disease"],
-        confidence=results["confidence"],
-        all_probabilities=results["all_probabilities"],
-        user_id=current_user.id
-    )
-    db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    db_log = None
+    if cached is not None and cached["user_id"] == current_user.id:
+        db_log = db.get(DiagnosisLog, cached["log_id"])
+    if db_log is None:
+        db_log = DiagnosisLog(
+            image_path=relative_path,
+            predicted_disease=results["disease"],
+            confidence=results["confidence"],
+            all_probabilities=results["all_probabilities"],
+            model_version=results.get("model_version"),
+            user_id=current_user.id
+        )
+        db.add(db_log)
+        record_diagnosis(db, db_log)
+        db.commit()
+        db.refresh(db_log)
+    if db_log.thumbnail_path is None:
+        get_derivative_service().submit("diagnosis", db_log.id)
+
+    if cache is not None and cached is None and results.get("model_version") == model_version:
+        await asyncio.to_thread(cache.set, cache_key, {
+            "image_path": relative_path,
+            "log_id": db_log.id,
+            "user_id": current_user.id,
+            "results": {
+                key: results[key] for key in ("disease", "confidence", "all_probabilities", "is_healthy", "model_version")
+            }
+        })
 
     # Lookup Detailed Info from Knowledge Base
     disease_detail = None
@@ -228,5 +546,6 @@ async def classify_disease(
         confidence=results["confidence"],
         all_probabilities=results["all_probabilities"],
         is_healthy=results["is_healthy"],
-        disease_detail=disease_detail
+        disease_detail=disease_detail,
+        cached=cached is not None
     )
\ No newline at end of file
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+import asyncio
+import logging
+from typing import Dict
+
+from app.api import deps
+from app.config import get_settings
+from app.core.database import SessionLocal
+from app.services.camera_stream import CameraStreamFullError, get_camera_stream_service
+from app.services.lifecycle import get_service_lifecycle
+from app.services.yolo_service import get_yolo_service
+
+router = APIRouter()
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Close code "Try Again Later": model chưa sẵn sàng hoặc đã đủ số camera
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+def _authenticate(token: str):
+    db = SessionLocal()
+    try:
+        return deps.get_user_from_token(db, token)
+    finally:
+        db.close()
+
+
+@router.websocket("/camera-stream")
+async def camera_stream(
+    websocket: WebSocket,
+    token: str = Query(...),
+    conf: float = Query(0.3, ge=0.05, le=0.95)
+):
+    """
+    Live detection on a camera feed: send JPEG frames as binary messages.
+
+    Each result is a JSON text message (`type: "detections"`) with the boxes in
+    frame pixels, healthy / sick counts, `latency_ms` (frame received -> result
+    sent), `fps` and `dropped` for this connection. Results come as fast as the
+    server can infer: frames that arrive meanwhile are dropped, only the newest
+    one is kept. Authenticate with `?token=<access token>`.
+    """
+    user = await asyncio.to_thread(_authenticate, token)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not get_service_lifecycle().is_ready("yolo"):
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason="Models are still loading")
+        return
+
+    service = get_camera_stream_service()
+    try:
+        session = service.connect(user.id)
+    except CameraStreamFullError as e:
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER, reason=str(e))
+        return
+
+    await websocket.accept()
+    await websocket.send_json({"type": "ready", "session_id": session.id, "conf": conf})
+
+    async def send(message: Dict):
+        await websocket.send_json(message)
+
+    # Nhận frame (task hiện tại) và infer + gửi kết quả (task riêng) chạy độc lập
+    worker = asyncio.create_task(service.run(session, get_yolo_service(), conf, send))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            data = message.get("bytes")
+            if data is None:
+                continue  # Text (ping của client) bỏ qua
+            if len(data) > settings.camera_stream_max_frame_bytes:
+                session.failed += 1
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": f"Frame larger than {settings.camera_stream_max_frame_bytes} bytes"
+                })
+                continue
+            session.offer(data)
+            if worker.done():
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        service.disconnect(session)
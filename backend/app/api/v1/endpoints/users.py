@@ -10,6 +10,8 @@ from app.core import models
 from app.core.database import get_db
 from app.schema.user import UserOut, UserUpdate
 from app.schema.knowledge import GeneralKnowledgeOut
+from app.services.annotated_images import annotated_image_url
+from app.services.derivatives import derivative_urls
 
 router = APIRouter()
 
@@ -77,10 +79,13 @@ def get_user_history(
                 joinedload(models.Disease.treatment_steps).joinedload(models.TreatmentStep.medicines)
             ).filter(models.Disease.name_en.ilike(log.predicted_disease)).first()
 
+        thumbnail_url, preview_url = derivative_urls(log, f"/uploads/{log.image_path}")
         formatted_logs.append({
             "id": log.id,
             "type": "diagnosis",
             "image_url": f"/uploads/{log.image_path}",
+            "thumbnail_url": thumbnail_url,
+            "preview_url": preview_url,
             "result": log.predicted_disease,
             "confidence": log.confidence,
             "created_at": log.created_at,
@@ -93,10 +98,13 @@ def get_user_history(
     ).order_by(models.DetectionLog.created_at.desc()).limit(limit).all()
     
     for log in detection_logs:
+        thumbnail_url, preview_url = derivative_urls(log, annotated_image_url(log.annotated_image_path))
         formatted_logs.append({
             "id": log.id,
             "type": "detection",
-            "image_url": f"/uploads/{log.annotated_image_path}",
+            "image_url": annotated_image_url(log.annotated_image_path),
+            "thumbnail_url": thumbnail_url,
+            "preview_url": preview_url,
             "result": f"{log.sick_count} gà bệnh / {log.total_chickens} tổng",
             "confidence": 0.0,
             "created_at": log.created_at,
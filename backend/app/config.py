@@ -29,12 +29,109 @@ class Settings(BaseSettings):
     # Model Paths
     detection_model_path: str = "model_store/detection_best.pt"
     classification_model_path: str = "model_store/classification_best.pt"
+    inference_backend: str = "torch"  # torch | onnxruntime | openvino (export trước bằng scripts/export_models.py)
+    inference_precision: str = "fp32"  # fp32 | int8 (onnxruntime/openvino, tạo bằng scripts/quantize_models.py)
+
+    # Model Registry (đổi model qua /api/v1/admin/model-versions, không restart)
+    registry_store_dir: str = "model_store"  # Chỉ nạp file trong thư mục này (.pt được unpickle khi load)
+    registry_poll_seconds: float = 30.0  # Chu kỳ các worker khác theo version active trong DB, 0 = tắt
+
+    # Startup (khởi tạo nền, song song; /ready trả 503 tới khi xong)
+    startup_parallel: bool = True  # False = khởi tạo tuần tự trước khi nhận request (cách cũ)
+    startup_warmup: bool = True  # Chạy thử model trên mọi thread inference để request đầu không chậm
+
+    # Multi-worker Serving (gunicorn -c gunicorn.conf.py app.main:app)
+    web_workers: int = 0  # Số worker process, 0 = số core
+    prefork_preload_models: bool = True  # Nạp YOLO + embedding ở master trước khi fork, worker dùng chung RAM (copy-on-write)
+    worker_torch_threads: int = 0  # Thread intra-op torch mỗi worker, 0 = số core / số worker
+
+    # Inference Scheduling
+    detection_batch_max_size: int = 8  # Số ảnh tối đa gom vào một lần gọi model
+    detection_batch_max_wait_ms: float = 5.0  # Thời gian chờ tối đa để gom batch
+    inference_workers: int = 2  # Số thread chạy YOLO/OpenCV ngoài event loop
+    inference_max_pending: int = 16  # Vượt ngưỡng này API trả 503 thay vì xếp hàng vô hạn
+
+    # Tiled Detection (/detect?tiled=true cho ảnh chuồng góc rộng, độ phân giải cao)
+    detection_tile_overlap: float = 0.2  # Tỷ lệ chồng lấn giữa hai tile liền kề
+    detection_tile_max_tiles: int = 16  # Quá số tile này thì tile lớn dần (mỗi tile bị thu nhỏ nhiều hơn)
+
+    # Result Cache (/detect, /classify theo nội dung ảnh)
+    result_cache_enabled: bool = True
+    result_cache_max_entries: int = 1024  # Số entry tối đa trong LRU của mỗi process
+    result_cache_max_bytes: int = 32 * 1024 * 1024  # Tổng dung lượng JSON tối đa của LRU
+    result_cache_ttl_seconds: int = 86400
+    result_cache_shared_dir: str = ""  # VD "uploads/.result_cache" để các worker dùng chung, trống = tắt
+
+    # Video Jobs (phân tích video chạy nền)
+    video_job_concurrency: int = 1  # Số video xử lý song song trên mỗi process (pool thread riêng, ngoài inference_workers)
+    video_job_poll_interval: float = 2.0
+    video_job_progress_interval: float = 1.0  # Chu kỳ ghi tiến độ / heartbeat (giây)
+    video_job_stale_seconds: int = 120  # Job RUNNING mất heartbeat quá lâu sẽ được chạy lại
+
+    # Video Pipeline (decode -> infer -> encode)
+    video_pipeline_threaded: bool = True
+    video_infer_batch_size: int = 4  # Số frame lấy mẫu gom vào một lần gọi model
+    video_pipeline_queue_size: int = 16  # Số frame tối đa chờ giữa hai stage
+
+    # Video Sampling (chọn frame chạy detector)
+    video_sampling_mode: str = "adaptive"  # "fixed" (1/(skip_frames+1)) | "adaptive" (theo chuyển động)
+    video_sample_min_interval: int = 4  # Khoảng cách tối thiểu giữa hai frame được infer (= skip_frames + 1 cũ)
+    video_sample_max_interval: int = 24  # Bắt buộc infer lại sau chừng này frame dù cảnh đứng yên
+    video_motion_threshold: float = 0.01  # Tỷ lệ pixel (ảnh thu nhỏ) thay đổi để coi là có chuyển động
+
+    # Video Tracking (đếm cá thể duy nhất)
+    video_tracking_enabled: bool = True
+    video_track_iou_threshold: float = 0.3  # IoU tối thiểu giữa box dự đoán của track và detection mới
+    video_track_max_age: int = 48  # Số frame mất dấu tối đa trước khi đóng track
+    video_track_min_hits: int = 2  # Track phải được thấy ít nhất chừng này lần mới được đếm
+    video_track_max_listed: int = 200  # Số track (ở lâu nhất) liệt kê chi tiết trong kết quả video, 0 = chỉ tổng
+
+    # Video Preview (ảnh động báo cáo cho app mobile)
+    video_preview_format: str = "gif"  # "gif" | "mp4" (clip H.264 ngắn, nhẹ hơn GIF nhiều)
+    video_preview_max_frames: int = 60  # Rải đều trên cả clip, 0 = không tạo preview
+    video_preview_width: int = 320
+    video_preview_fps: float = 8
+
+    # Camera Stream (/ws/camera-stream, frame JPEG trực tiếp từ điện thoại / camera chuồng)
+    camera_stream_max_connections: int = 16  # Số camera stream cùng lúc trên mỗi process, quá -> đóng kết nối (1013)
+    camera_stream_max_inflight: int = 2  # Số frame camera infer cùng lúc, chia đều (round-robin) giữa các kết nối
+    camera_stream_max_frame_bytes: int = 2 * 1024 * 1024  # Frame lớn hơn bị bỏ qua, báo lỗi cho client
+
+    # Camera Ingest (camera cố định theo đàn, kiểm tra tự động theo lịch -> DetectionLog)
+    camera_ingest_enabled: bool = True
+    camera_ingest_local_dir: str = "camera_feeds"  # Nguồn file / thư mục chỉ được nằm trong thư mục này
+    camera_ingest_poll_seconds: float = 2.0  # Chu kỳ tìm camera đến lịch trong DB
+    camera_ingest_max_concurrent: int = 4  # Số camera được kiểm tra cùng lúc (không phải một thread mỗi camera)
+    camera_ingest_capture_workers: int = 4  # Thread đọc RTSP / file (chặn I/O), dùng chung cho mọi camera
+    camera_ingest_cpu_budget: float = 0.5  # Giây CPU (decode + infer) mỗi giây, trung bình; 1.0 = một core
+    camera_ingest_min_interval_seconds: int = 30  # Chu kỳ kiểm tra nhỏ nhất cho phép của một camera
+    camera_ingest_max_frames_per_check: int = 5
+    camera_ingest_snapshot_width: int = 1280  # Frame lớn hơn được thu nhỏ trước khi infer / lưu
+    camera_ingest_connect_timeout_seconds: float = 10.0  # Timeout mở / đọc stream RTSP
+    camera_ingest_backoff_base_seconds: float = 15.0  # Lỗi kết nối: chờ base * 2^(lần lỗi - 1), có jitter
+    camera_ingest_backoff_max_seconds: float = 900.0
+    
+    # Usage Logs (ghi theo lô ở nền thay vì một commit mỗi request)
+    usage_flush_batch_size: int = 200  # Buffer đủ số sự kiện này -> ghi ngay một lô
+    usage_flush_interval_seconds: float = 2.0  # Chu kỳ ghi phần còn lại trong buffer
+    usage_buffer_max_events: int = 10000  # Buffer đầy (DB chậm / lỗi) -> bỏ sự kiện mới, đếm vào "dropped"
     
     # Demo Video
     demo_video_path: str = "demo_videos/chicken_farm.mp4"
     
     # Upload Settings
     upload_dir: str = "uploads"
+    upload_max_bytes: int = 25 * 1024 * 1024  # Ảnh /detect, /classify lớn hơn -> 413 ngay khi đọc
+    upload_max_pixels: int = 64_000_000  # Đọc từ header trước khi decode, vượt -> 413
+    upload_reduced_decode: bool = True  # Decode JPEG ở 1/2, 1/4, 1/8 vừa đủ kích thước input của model
+    video_upload_max_bytes: int = 500 * 1024 * 1024  # Video /video_analyze, /video_jobs lớn hơn -> 413 ngay khi nhận
+
+    # Thumbnails (ảnh nhỏ cho lịch sử / log admin, sinh nền sau khi lưu)
+    thumbnail_max_side: int = 256
+    preview_max_side: int = 1024
+    derivative_format: str = "webp"  # webp | jpg
+    derivative_quality: int = 80
+    derivative_workers: int = 1  # Số thread sinh thumbnail trên mỗi process
     
     # CORS
     cors_origins: list[str] = ["*", "http://localhost:5173", "http://127.0.0.1:5173"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, JSON, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Boolean, JSON, Text, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -41,13 +41,24 @@ class Flock(Base):
 # 3. Log Phát hiện (Kết quả Bước 1 - Detection)
 class DetectionLog(Base):
     __tablename__ = "detection_logs"
+    __table_args__ = (
+        # Lịch sử / thống kê của user: WHERE user_id = ? ORDER BY created_at DESC LIMIT n
+        Index("ix_detection_logs_user_id_created_at", "user_id", "created_at"),
+        # Đếm log có gà bệnh của user (/users/me/stats)
+        Index(
+            "ix_detection_logs_user_id_sick", "user_id",
+            postgresql_where=text("sick_count > 0"), sqlite_where=text("sick_count > 0")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     flock_id = Column(Integer, ForeignKey("flocks.id"), nullable=True)
     
     image_path = Column(String) # Đường dẫn ảnh gốc lưu trên server
-    annotated_image_path = Column(String) # Đường dẫn ảnh vẽ box
+    annotated_image_path = Column(String, index=True) # Đường dẫn ảnh vẽ box; GET /annotated render lần đầu tra theo cột này
+    thumbnail_path = Column(String, nullable=True) # Ảnh nhỏ cho danh sách lịch sử (sinh nền, xem derivatives)
+    preview_path = Column(String, nullable=True) # Ảnh cỡ vừa cho màn hình chi tiết
     
     total_chickens = Column(Integer)
     healthy_count = Column(Integer)
@@ -55,8 +66,9 @@ class DetectionLog(Base):
     
     # Lưu chi tiết tọa độ box dưới dạng JSON
     raw_result = Column(JSON, nullable=True) 
+    model_version = Column(String, nullable=True) # Fingerprint model detection đã tạo ra kết quả (xem ModelVersion)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True) # /admin/recent-logs: ORDER BY created_at DESC LIMIT n
     
     user = relationship("User", back_populates="detections")
     flock = relationship("Flock", back_populates="detections")
@@ -64,21 +76,32 @@ class DetectionLog(Base):
 # 4. Log Chẩn đoán bệnh (Kết quả Bước 2 - Classification)
 class DiagnosisLog(Base):
     __tablename__ = "diagnosis_logs"
+    __table_args__ = (
+        Index("ix_diagnosis_logs_user_id_created_at", "user_id", "created_at"),
+        # Partial index: chỉ chứa ca bệnh, đếm predicted_disease != 'Healthy' không phải quét cả bảng
+        Index(
+            "ix_diagnosis_logs_user_id_sick", "user_id",
+            postgresql_where=text("predicted_disease != 'Healthy'"), sqlite_where=text("predicted_disease != 'Healthy'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     flock_id = Column(Integer, ForeignKey("flocks.id"), nullable=True)
     
     image_path = Column(String)
+    thumbnail_path = Column(String, nullable=True) # Ảnh nhỏ cho danh sách lịch sử (sinh nền, xem derivatives)
+    preview_path = Column(String, nullable=True) # Ảnh cỡ vừa cho màn hình chi tiết
     predicted_disease = Column(String) # VD: Coccidiosis
     confidence = Column(Float) # VD: 0.95
     all_probabilities = Column(JSON, nullable=True)
+    model_version = Column(String, nullable=True) # Fingerprint model classification đã tạo ra kết quả
     
     # Cho phép bác sĩ thú y xác nhận lại đúng/sai -> Dùng để train lại model sau này
     verified_result = Column(String, nullable=True) 
     is_correct = Column(Boolean, nullable=True)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True) # /admin/recent-logs: ORDER BY created_at DESC LIMIT n
     
     user = relationship("User", back_populates="diagnoses")
     flock = relationship("Flock", back_populates="diagnoses")
@@ -190,6 +213,97 @@ class UsageLog(Base):
     tokens_completion = Column(Integer, default=0)
     total_tokens = Column(Integer, default=0)
     cost_est = Column(Float, default=0.0) # Chi phí ước tính (USD)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True) # Quét theo khoảng thời gian (đối soát daily_rollups)
+    
+    user = relationship("User")
+
+# 10. Video Analysis Jobs (Phân tích video chạy nền, client poll tiến độ)
+class VideoJob(Base):
+    __tablename__ = "video_jobs"
+    
+    id = Column(String, primary_key=True, index=True) # UUID
+    user_id = Column(Integer, ForeignKey("users.id"))
+    flock_id = Column(Integer, ForeignKey("flocks.id"), nullable=True)
+    
+    status = Column(String, default="PENDING", index=True) # PENDING, RUNNING, SUCCESS, ERROR
+    input_path = Column(String) # Video gốc (đường dẫn tương đối trong upload_dir)
+    output_path = Column(String) # Video kết quả đã vẽ box
+    analysis_only = Column(Boolean, default=False) # Không xuất video, chỉ sidecar detections NDJSON
+    
+    # Tiến độ (được worker cập nhật định kỳ)
+    total_frames = Column(Integer, default=0)
+    frames_processed = Column(Integer, default=0)
+    current_sick_count = Column(Integer, default=0)
+    
+    result = Column(JSON, nullable=True) # Thống kê cuối cùng của process_video
+    error = Column(Text, nullable=True)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now()) # Heartbeat
     
     user = relationship("User")
+
+# 11. Model Registry (các phiên bản model, đổi model không cần restart backend)
+class ModelVersion(Base):
+    __tablename__ = "model_versions"
+    __table_args__ = (UniqueConstraint("kind", "version", name="uq_model_versions_kind_version"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True) # detection | classification
+    version = Column(String) # Nhãn do admin đặt, VD: det-2026-10-v3
+    weights_path = Column(String) # File .pt trong model_store_dir (artifact ONNX/OpenVINO nằm cạnh)
+    backend = Column(String) # Backend / precision lúc đăng ký, artifact được hash theo cặp này
+    precision = Column(String)
+    fingerprint = Column(String, index=True) # artifact_fingerprint, ghi vào DetectionLog/DiagnosisLog.model_version
+    class_names = Column(JSON, nullable=True)
+    metrics = Column(JSON, nullable=True) # Benchmark: mAP do admin nhập, warm-up / latency đo lúc kích hoạt
+    notes = Column(Text, nullable=True)
+    
+    is_active = Column(Boolean, default=False, index=True) # Mỗi kind chỉ có một version active
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    activated_at = Column(DateTime(timezone=True), nullable=True)
+
+# 12. Camera Sources (camera cố định trong chuồng, kiểm tra tự động theo lịch)
+class CameraSource(Base):
+    __tablename__ = "camera_sources"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    flock_id = Column(Integer, ForeignKey("flocks.id"), nullable=False, index=True)
+    name = Column(String) # VD: Camera góc trái chuồng 1
+    kind = Column(String) # stream (RTSP/HTTP) | file | directory
+    source = Column(String) # URL RTSP/HTTP, hoặc đường dẫn tương đối trong camera_ingest_local_dir
+    interval_seconds = Column(Integer, default=300) # Chu kỳ kiểm tra (giới hạn tần suất của từng camera)
+    frames_per_check = Column(Integer, default=3) # Số frame lấy mỗi lần kiểm tra, infer chung một batch
+    is_active = Column(Boolean, default=True, index=True)
+    
+    # Lịch (bảng này là nguồn sự thật: worker nào claim được thì chạy, restart không mất lịch)
+    next_check_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    last_checked_at = Column(DateTime(timezone=True), nullable=True)
+    last_success_at = Column(DateTime(timezone=True), nullable=True)
+    consecutive_failures = Column(Integer, default=0) # Tăng backoff kết nối lại
+    # Con trỏ đọc: file -> frame "live" giả lập kế tiếp; directory -> mtime_ns file mới nhất đã xử lý.
+    # Ghi cùng transaction với DetectionLog: restart / nhiều worker không xử lý lại cùng ảnh
+    read_position = Column(BigInteger, default=0, nullable=False, server_default="0")
+    last_error = Column(Text, nullable=True)
+    last_detection_id = Column(Integer, ForeignKey("detection_logs.id"), nullable=True)
+    
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    flock = relationship("Flock")
+
+# 13. Daily Rollups (thống kê cộng dồn theo ngày, cập nhật cùng transaction khi ghi log)
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+    
+    # Khoá (source, day, key): dashboard lọc theo source rồi theo khoảng ngày
+    source = Column(String, primary_key=True) # diagnosis | detection | usage
+    day = Column(Date, primary_key=True) # Ngày của created_at theo giờ của DB
+    key = Column(String, primary_key=True, default="") # Bệnh (diagnosis), feature (usage), "" (detection)
+    
+    count = Column(Integer, nullable=False, default=0) # Số log
+    sick = Column(Integer, nullable=False, default=0) # Log có bệnh / có gà bệnh
+    tokens = Column(BigInteger, nullable=False, default=0) # Tổng total_tokens (usage)
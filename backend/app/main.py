@@ -1,10 +1,19 @@
 """FastAPI main application"""
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from app.api.deps import get_current_active_superuser
 from app.config import get_settings
 from app.core.database import engine, Base
+from app.core.models import User
+from app.services.derivatives import DERIVATIVES_DIR
+from app.services.inference_executor import InferenceOverloadedError, get_inference_executor, get_video_executor
+from app.services.lifecycle import get_service_lifecycle
+from app.services.camera_ingest import CameraSourceError
+from app.services.model_registry import ModelRegistryError
+from app.services.upload_store import UploadLimitMiddleware, UploadRejectedError
 import os
 import logging
 
@@ -12,9 +21,6 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create Tables
-Base.metadata.create_all(bind=engine)
-
 # Get settings
 settings = get_settings()
 
@@ -27,6 +33,14 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Giới hạn body của các endpoint upload ngay khi nhận, trước khi form multipart được parse
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/api/v1/detect/detect": (settings.upload_max_bytes, "Ảnh"),
+    "/api/v1/detect/classify": (settings.upload_max_bytes, "Ảnh"),
+    "/api/v1/detect/video_analyze": (settings.video_upload_max_bytes, "Video"),
+    "/api/v1/detect/video_jobs": (settings.video_upload_max_bytes, "Video"),
+})
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -36,40 +50,140 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class UploadStaticFiles(StaticFiles):
+    """`/uploads`; thumbnails / previews never change once written (size in the name) -> cached for a year"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if os.path.relpath(full_path, os.path.realpath(self.directory)).startswith(DERIVATIVES_DIR + os.sep):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
 # Mount Static Files
 os.makedirs(settings.upload_dir, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
+app.mount("/uploads", UploadStaticFiles(directory=settings.upload_dir), name="uploads")
+
+
+@app.exception_handler(InferenceOverloadedError)
+async def inference_overloaded_handler(request: Request, exc: InferenceOverloadedError):
+    """Hệ thống AI đang quá tải -> báo client thử lại sau thay vì treo request"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Hệ thống AI đang bận, vui lòng thử lại sau."},
+        headers={"Retry-After": "5"}
+    )
+
+
+@app.exception_handler(UploadRejectedError)
+async def upload_rejected_handler(request: Request, exc: UploadRejectedError):
+    """Upload bị từ chối trước khi xử lý (quá nặng, rỗng, sai định dạng ảnh, quá nhiều pixel)"""
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+
+@app.exception_handler(ModelRegistryError)
+async def model_registry_error_handler(request: Request, exc: ModelRegistryError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+
+@app.exception_handler(CameraSourceError)
+async def camera_source_error_handler(request: Request, exc: CameraSourceError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+
+def _init_database():
+    """Create tables and seed default data"""
+    from app.core.database import SessionLocal
+    from app.core.seed import seed_knowledge_base, seed_users
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        seed_users(db)
+        seed_knowledge_base(db)
+    finally:
+        db.close()
+
+
+def _init_yolo():
+    """Load the YOLO models and warm them up on every inference thread"""
+    from app.services import get_yolo_service
+
+    yolo_service = get_yolo_service()
+    if settings.startup_warmup:
+        logger.info(f"🔥 YOLO warm-up: {yolo_service.warmup()}")
+
+
+async def _start_model_registry():
+    """Swap in the model versions activated through the registry, then follow later activations"""
+    from app.services.model_registry import get_model_registry
+    await get_model_registry().start()
+
+
+async def _start_video_jobs():
+    """Start background video job workers (resumes jobs queued before a restart)"""
+    from app.services.video_job_service import get_video_job_service
+    await get_video_job_service().start()
+
+
+async def _start_derivatives():
+    """Start the thumbnail / preview workers"""
+    from app.services.derivatives import get_derivative_service
+    await get_derivative_service().start()
+
+
+async def _start_usage_writer():
+    """Start the batched usage-log writer (events are written one by one until then)"""
+    from app.services.usage_service import usage_service
+    await usage_service.start()
+
+
+async def _start_camera_ingest():
+    """Start the scheduled checks of the registered barn cameras"""
+    from app.services.camera_ingest import get_camera_ingest_service
+    if settings.camera_ingest_enabled:
+        await get_camera_ingest_service().start()
+
+
+def _init_embeddings():
+    from app.services.rag_service import get_rag_service
+    get_rag_service().load_embeddings()
+
+
+def _init_chroma():
+    from app.services.rag_service import get_rag_service
+    get_rag_service().connect_chroma()
+
+
+def _init_llm():
+    from app.services.rag_service import get_rag_service
+    get_rag_service()._initialize_llm()
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize services on startup"""
+    """Start service initialization in the background; readiness is reported by /ready"""
     logger.info("🚀 Starting Chicken Disease Diagnosis API...")
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Debug mode: {settings.debug}")
-    
-    # Initialize YOLO models
-    try:
-        from app.services import get_yolo_service
-        yolo_service = get_yolo_service()
-        logger.info("✅ YOLO Service initialized")
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize YOLO Service: {e}")
-    
-    # Initialize Database & Seed Data
-    try:
-        from app.core.database import SessionLocal
-        from app.core.seed import seed_knowledge_base, seed_users
-        db = SessionLocal()
-        seed_users(db)
-        seed_knowledge_base(db)
-        db.close()
-    except Exception as e:
-        logger.error(f"❌ Failed to seed database: {e}")
-    
-    # TODO: Initialize RAG service
-    # TODO: Initialize database connection
-    
+
+    # YOLO, embedding model, Chroma và DB khởi tạo song song trong nền: server nhận
+    # kết nối ngay, /health trả lời luôn, /ready trả 503 tới khi các phần bắt buộc xong
+    lifecycle = get_service_lifecycle()
+    lifecycle.register("database", _init_database)
+    lifecycle.register("yolo", _init_yolo)
+    lifecycle.register("model_registry", _start_model_registry, depends_on=["database", "yolo"])
+    # Job PENDING được resume ngay khi start: chờ YOLO nạp xong (không nạp model trên event loop)
+    # và model registry kích hoạt version đang active
+    lifecycle.register("video_jobs", _start_video_jobs, depends_on=["database", "yolo", "model_registry"])
+    lifecycle.register("usage_writer", _start_usage_writer, required=False, depends_on=["database"])
+    lifecycle.register("derivatives", _start_derivatives, required=False, depends_on=["database"])
+    lifecycle.register("camera_ingest", _start_camera_ingest, required=False, depends_on=["database", "yolo"])
+    lifecycle.register("embeddings", _init_embeddings, required=False)
+    lifecycle.register("chroma", _init_chroma, required=False, retry=True)
+    lifecycle.register("llm", _init_llm, required=False, depends_on=["database"])
+    await lifecycle.start()
+
     logger.info("✅ Startup complete!")
 
 
@@ -78,7 +192,20 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("👋 Shutting down...")
     
-    # TODO: Cleanup resources
+    from app.services.model_registry import get_model_registry
+    from app.services.video_job_service import get_video_job_service
+    from app.services.derivatives import get_derivative_service
+    from app.services.camera_ingest import get_camera_ingest_service
+    from app.services.usage_service import usage_service
+    await get_service_lifecycle().stop()
+    await get_model_registry().stop()
+    await get_video_job_service().stop()
+    await get_derivative_service().stop()
+    await get_camera_ingest_service().stop()
+    # Sau các service còn ghi usage: xả nốt buffer trước khi thoát
+    await usage_service.stop()
+    get_inference_executor().shutdown(wait=False)
+    get_video_executor().shutdown(wait=False)
     
     logger.info("✅ Shutdown complete!")
 
@@ -102,31 +229,60 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    from app.services import get_yolo_service
-    
-    try:
+    """Liveness: the process is up and serving, even while models are still loading"""
+    lifecycle = get_service_lifecycle()
+    models_loaded = False
+    if lifecycle.is_ready("yolo"):
+        from app.services import get_yolo_service
         yolo_service = get_yolo_service()
         models_loaded = (
             yolo_service.detection_model is not None and 
             yolo_service.classification_model is not None
         )
-    except:
-        models_loaded = False
     
     return {
         "status": "healthy",
         "environment": settings.environment,
+        "ready": lifecycle.ready,
         "models_loaded": models_loaded,
-        "database_connected": False,  # TODO: Check database connection
+        "database_connected": lifecycle.is_ready("database"),
+    }
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the database and YOLO are initialized and warmed up, 503 before"""
+    lifecycle = get_service_lifecycle()
+    return JSONResponse(status_code=200 if lifecycle.ready else 503, content=lifecycle.status())
+
+
+@app.get("/metrics")
+async def metrics(current_user: User = Depends(get_current_active_superuser)):
+    """Runtime metrics of the inference services (admin only: no paths or user ids in the payload)"""
+    from app.services import get_yolo_service
+    from app.services.camera_ingest import get_camera_ingest_service
+    from app.services.camera_stream import get_camera_stream_service
+    from app.services.derivatives import get_derivative_service
+    from app.services.result_cache import result_cache_metrics
+    from app.services.usage_service import usage_service
+
+    return {
+        # Chưa nạp xong thì không gọi get_yolo_service() (sẽ chặn event loop chờ model)
+        "yolo": get_yolo_service().get_metrics() if get_service_lifecycle().is_ready("yolo") else None,
+        "result_cache": result_cache_metrics(),
+        "derivatives": get_derivative_service().metrics(),
+        "camera_stream": get_camera_stream_service().metrics(),
+        "camera_ingest": get_camera_ingest_service().metrics(),
+        "usage_writer": usage_service.metrics(),
+        "startup": get_service_lifecycle().status()
     }
 
 
 # Include routers
-from app.api.v1.endpoints import detect, chat, admin, auth, users
+from app.api.v1.endpoints import detect, chat, admin, auth, users, stream
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
 app.include_router(detect.router, prefix="/api/v1/detect", tags=["detection"])
 app.include_router(chat.router, prefix="/api/v1/chat", tags=["chat"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
-# app.include_router(stream.router, prefix="/ws", tags=["websocket"])
+app.include_router(stream.router, prefix="/ws", tags=["websocket"])
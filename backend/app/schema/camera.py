@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class CameraSourceCreate(BaseModel):
+    flock_id: int
+    name: str
+    source: str # rtsp://..., http(s)://... hoặc file / thư mục trong camera_ingest_local_dir
+    interval_seconds: int = Field(300, ge=1) # Nhỏ hơn camera_ingest_min_interval_seconds thì bị nâng lên
+    frames_per_check: int = Field(3, ge=1)
+    is_active: bool = True
+
+class CameraSourceUpdate(BaseModel):
+    name: Optional[str] = None
+    source: Optional[str] = None
+    interval_seconds: Optional[int] = Field(None, ge=1)
+    frames_per_check: Optional[int] = Field(None, ge=1)
+    is_active: Optional[bool] = None
+
+class CameraSourceOut(BaseModel):
+    id: int
+    flock_id: int
+    name: Optional[str] = None
+    kind: str # rtsp | file | directory
+    source: str
+    interval_seconds: int
+    frames_per_check: int
+    is_active: bool
+    next_check_at: Optional[datetime] = None
+    last_checked_at: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+    last_detection_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class CameraSourceList(BaseModel):
+    cameras: List[CameraSourceOut]
+    ingest: Dict[str, Any] # Metrics của scheduler trong process trả lời
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
+from datetime import datetime
 from app.schema.knowledge import DiseaseOut
 
 class DetectionBox(BaseModel):
@@ -15,7 +16,10 @@ class DetectionResponse(BaseModel):
     detections: List[DetectionBox]
     has_sick_chickens: bool
     alert: Optional[str] = None
-    image_base64: Optional[str] = None
+    image_base64: Optional[str] = None # Chỉ có ở response_mode=full
+    annotated_image_url: Optional[str] = None # Ảnh vẽ box, render khi GET lần đầu
+    tiling: Optional[Dict[str, Any]] = None # tiled=true: lưới tile, kích thước, latency mỗi tile
+    cached: bool = False # True khi ảnh này đã được phân tích trước đó (không chạy lại model)
 
 class ClassificationResponse(BaseModel):
     disease: str
@@ -25,13 +29,37 @@ class ClassificationResponse(BaseModel):
     description: Optional[str] = None
     recommendation: Optional[str] = None
     disease_detail: Optional[DiseaseOut] = None # Thông tin chi tiết từ DB (thuốc, phác đồ...)
+    cached: bool = False
 
 class VideoAnalysisResponse(BaseModel):
-    video_url: str
-    gif_url: Optional[str] = None
+    video_url: Optional[str] = None # None khi analysis_only (không xuất video)
+    detections_url: Optional[str] = None # Sidecar NDJSON detections theo frame (analysis_only)
+    gif_url: Optional[str] = None # Chỉ có khi preview là GIF (client cũ)
+    preview_url: Optional[str] = None # Preview động: GIF hoặc clip MP4 ngắn (xem preview.format)
+    preview: Optional[Dict[str, Any]] = None # format, codec, bytes, frames, encode_ms
     total_frames: int
     processed_frames: int
     max_total_chickens: int
     max_sick_chickens: int
     has_sick_chickens: bool
+    unique_total_chickens: Optional[int] = None # Số cá thể (track) duy nhất trong cả video
+    unique_sick_chickens: Optional[int] = None
+    tracking: Optional[Dict[str, Any]] = None # Tổng theo class, dwell + tối đa VIDEO_TRACK_MAX_LISTED track chi tiết
+    sampling: Optional[Dict[str, Any]] = None # mode, inferences, inferences_saved...
     alert: Optional[str] = None
+
+class VideoJobResponse(BaseModel):
+    job_id: str
+    status: str # PENDING, RUNNING, SUCCESS, ERROR
+    total_frames: int = 0
+    frames_processed: int = 0
+    progress: float = 0.0 # 0 -> 1
+    current_sick_count: int = 0
+    eta_seconds: Optional[float] = None
+    status_url: str
+    events_url: str
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[VideoAnalysisResponse] = None
+    error: Optional[str] = None
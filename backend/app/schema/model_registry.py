@@ -0,0 +1,41 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+
+class ModelVersionCreate(BaseModel):
+    kind: Literal["detection", "classification"]
+    version: str # Nhãn hiển thị, duy nhất theo kind
+    weights_path: str # Tương đối với model_store_dir, VD: detection_2026_10.pt
+    metrics: Optional[Dict[str, Any]] = None # mAP, precision/recall... từ lần train / đánh giá
+    notes: Optional[str] = None
+
+class ModelVersionOut(BaseModel):
+    id: int
+    kind: str
+    version: str
+    weights_path: str
+    backend: str
+    precision: str
+    fingerprint: str
+    class_names: Optional[Dict[str, str]] = None
+    metrics: Optional[Dict[str, Any]] = None
+    notes: Optional[str] = None
+    is_active: bool
+    loaded: bool = False # Đang phục vụ request trong process trả lời
+    created_at: Optional[datetime] = None
+    activated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ModelActivationResponse(BaseModel):
+    model: ModelVersionOut
+    previous_version: Optional[str] = None # Fingerprint của model vừa được thay
+    load_seconds: float
+    warmup_seconds: float
+    latency_ms: Optional[float] = None # Trung bình các lần chạy warm-up
+    warm_clones: int
+
+class ModelVersionList(BaseModel):
+    active: Dict[str, Optional[str]] # Fingerprint đang chạy theo từng kind
+    versions: List[ModelVersionOut]
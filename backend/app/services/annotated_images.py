@@ -0,0 +1,95 @@
+import hashlib
+import hmac
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.config import get_settings
+from app.services.yolo_service import YOLOService
+
+settings = get_settings()
+
+ANNOTATED_URL_PREFIX = "/api/v1/detect/annotated"
+# URL ký có hạn 7-8 ngày, làm tròn theo ngày để URL ổn định (client / browser cache được)
+ANNOTATED_URL_TTL_DAYS = 7
+
+
+def annotated_rel_path(file_id: str) -> str:
+    return os.path.join("detections", f"{file_id}_annot.jpg")
+
+
+def annotated_image_url(rel_path: Optional[str]) -> Optional[str]:
+    """
+    URL of the annotated image of a detection. It goes through the lazy render
+    endpoint so images of `response_mode=boxes` requests (not written yet) work too.
+    The URL is signed (`expires`, `sig`): clients load it with a plain `<img>`
+    without the bearer token, and only URLs issued by the API can trigger a render.
+    """
+    if not rel_path:
+        return None
+    file_id = os.path.basename(rel_path).rsplit("_annot", 1)[0]
+    expires = (int(time.time()) // 86400 + ANNOTATED_URL_TTL_DAYS + 1) * 86400
+    return f"{ANNOTATED_URL_PREFIX}/{file_id}.jpg?expires={expires}&sig={_signature(file_id, expires)}"
+
+
+def _signature(file_id: str, expires: int) -> str:
+    message = f"{file_id}:{expires}".encode()
+    return hmac.new(settings.secret_key.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def verify_signature(file_id: str, expires: int, sig: str) -> bool:
+    """Whether `sig` was issued by `annotated_image_url` for this file id and is not expired"""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_signature(file_id, expires), sig)
+
+
+def parse_file_id(file_id: str) -> Optional[str]:
+    """Canonical uuid string, None for anything else (the id ends up in a file path)"""
+    try:
+        return str(uuid.UUID(file_id))
+    except ValueError:
+        return None
+
+
+def encode_jpeg(image: np.ndarray) -> bytes:
+    ok, buffer = cv2.imencode('.jpg', image)
+    if not ok:
+        raise RuntimeError("Could not encode annotated image")
+    return buffer.tobytes()
+
+
+def load_or_render(
+    original_rel_path: str,
+    annotated_rel_path: str,
+    detections: List[Dict],
+    image: Optional[np.ndarray] = None
+) -> Optional[bytes]:
+    """
+    JPEG bytes of the annotated image. Rendered from `image` (or the stored
+    original when the file does not exist yet) and written next to it, so the
+    boxes are only drawn and encoded once per detection.
+    Returns None when neither the annotated file nor the original exists.
+    """
+    annotated_abs_path = os.path.join(settings.upload_dir, annotated_rel_path)
+    if image is None:
+        try:
+            with open(annotated_abs_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        image = cv2.imread(os.path.join(settings.upload_dir, original_rel_path), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+
+    buffer = encode_jpeg(YOLOService.annotate_detections(image, detections))
+    # Ghi ra file tạm rồi rename: hai request render cùng lúc không đọc phải file ghi dở
+    tmp_path = f"{annotated_abs_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer)
+    os.replace(tmp_path, annotated_abs_path)
+    return buffer
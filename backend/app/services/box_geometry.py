@@ -0,0 +1,42 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def box_areas(boxes: np.ndarray) -> np.ndarray:
+    """Areas of an (N, 4) xyxy array, degenerate boxes count as 0"""
+    return np.maximum(0.0, boxes[:, 2] - boxes[:, 0]) * np.maximum(0.0, boxes[:, 3] - boxes[:, 1])
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2.0, (boxes[:, 1] + boxes[:, 3]) / 2.0], axis=1)
+
+
+def box_diagonals(boxes: np.ndarray) -> np.ndarray:
+    return np.hypot(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+
+
+def pairwise_box_metrics(boxes_a: np.ndarray, boxes_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Intersection area, IoU and overlap-over-smaller-box for every (a, b) pair of
+    two xyxy arrays, as (N, M) matrices computed in one broadcast. Same formula
+    (and same float results) as the per-pair version the detector used to run.
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        empty = np.zeros((len(boxes_a), len(boxes_b)), dtype=np.result_type(boxes_a, boxes_b))
+        return empty, empty.copy(), empty.copy()
+
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.maximum(0.0, np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]))
+    inter_h = np.maximum(0.0, np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]))
+    inter_area = inter_w * inter_h
+
+    area_a = box_areas(boxes_a)[:, None]
+    area_b = box_areas(boxes_b)[None, :]
+    union = area_a + area_b - inter_area
+    smaller = np.minimum(area_a, area_b)
+
+    iou = np.divide(inter_area, union, out=np.zeros_like(inter_area), where=union > 0)
+    overlap_min = np.divide(inter_area, smaller, out=np.zeros_like(inter_area), where=smaller > 0)
+    return inter_area, iou, overlap_min
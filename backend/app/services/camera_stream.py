@@ -0,0 +1,236 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.config import get_settings
+from app.services.image_ingest import ImageRejectedError, ingest_image
+from app.services.inference_executor import InferenceOverloadedError
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Số frame gần nhất dùng để tính fps / độ trễ của mỗi kết nối
+STATS_WINDOW = 60
+# Executor đầy (upload / video job đang chiếm) -> chờ chút rồi lấy frame mới nhất
+OVERLOAD_BACKOFF_SECONDS = 0.05
+
+
+class CameraStreamFullError(RuntimeError):
+    """Raised when `camera_stream_max_connections` cameras are already streaming"""
+
+
+@dataclass
+class _CameraFrame:
+    data: bytes
+    seq: int
+    received_at: float
+
+
+def _percentile_ms(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))] * 1000, 1)
+
+
+class CameraSession:
+    """
+    One connected camera: a single-slot mailbox (a new frame replaces the one
+    still waiting, which is counted as dropped) and rolling latency / fps stats.
+    """
+
+    def __init__(self, session_id: int, user_id: int):
+        self.id = session_id
+        self.user_id = user_id
+        self.connected_at = time.time()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._seq = 0
+        self._latest: Optional[_CameraFrame] = None
+        self._arrived = asyncio.Event()
+        self._latencies: Deque[float] = deque(maxlen=STATS_WINDOW)
+        self._finished_at: Deque[float] = deque(maxlen=STATS_WINDOW)
+
+    def offer(self, data: bytes) -> int:
+        """Put the newest frame in the mailbox; returns its sequence number"""
+        self._seq += 1
+        self.received += 1
+        if self._latest is not None:
+            self.dropped += 1
+        self._latest = _CameraFrame(data, self._seq, time.perf_counter())
+        self._arrived.set()
+        return self._seq
+
+    async def wait_frame(self):
+        while self._latest is None:
+            self._arrived.clear()
+            await self._arrived.wait()
+
+    def take(self) -> Optional[_CameraFrame]:
+        frame, self._latest = self._latest, None
+        return frame
+
+    def record(self, frame: _CameraFrame) -> float:
+        """Account a frame whose result is being sent; returns its latency in seconds"""
+        now = time.perf_counter()
+        latency = now - frame.received_at
+        self.processed += 1
+        self._latencies.append(latency)
+        self._finished_at.append(now)
+        return latency
+
+    @property
+    def fps(self) -> float:
+        if len(self._finished_at) < 2:
+            return 0.0
+        elapsed = self._finished_at[-1] - self._finished_at[0]
+        return round((len(self._finished_at) - 1) / elapsed, 2) if elapsed > 0 else 0.0
+
+    def stats(self) -> Dict:
+        latencies = list(self._latencies)
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "connected_at": self.connected_at,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "fps": self.fps,
+            "latency_p50_ms": _percentile_ms(latencies, 50),
+            "latency_p95_ms": _percentile_ms(latencies, 95),
+        }
+
+
+class CameraStreamService:
+    """
+    Live detection for phones / barn cameras streaming JPEG frames over a WebSocket.
+
+    Each connection keeps only its newest frame: frames that arrive while the
+    previous one is being inferred replace each other, so a camera faster than
+    the CPU sees fresh results with bounded latency instead of a growing
+    backlog. At most `camera_stream_max_inflight` frames are inferred at once
+    across all cameras; a connection waits for a slot with at most one frame,
+    and `asyncio.Semaphore` hands freed slots to waiters in FIFO order, so the
+    capacity is shared round-robin whatever the frame rate of each camera.
+    Frames inferred concurrently still meet in the `/detect` micro-batcher.
+    """
+
+    def __init__(self):
+        self.max_connections = max(1, settings.camera_stream_max_connections)
+        self.max_inflight = max(1, settings.camera_stream_max_inflight)
+        self._sessions: Dict[int, CameraSession] = {}
+        self._ids = itertools.count(1)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight = 0
+        self._closed_totals = {"received": 0, "processed": 0, "dropped": 0, "failed": 0}
+
+    def connect(self, user_id: int) -> CameraSession:
+        if len(self._sessions) >= self.max_connections:
+            raise CameraStreamFullError(f"{self.max_connections} camera streams already connected")
+        session = CameraSession(next(self._ids), user_id)
+        self._sessions[session.id] = session
+        logger.info(f"📹 Camera stream {session.id} connected (user {user_id})")
+        return session
+
+    def disconnect(self, session: CameraSession):
+        if self._sessions.pop(session.id, None) is None:
+            return
+        stats = session.stats()
+        for key in self._closed_totals:
+            self._closed_totals[key] += stats[key]
+        logger.info(
+            f"📹 Camera stream {session.id} closed: {stats['processed']}/{stats['received']} frames, "
+            f"{stats['fps']} fps, p50 {stats['latency_p50_ms']} ms"
+        )
+
+    async def run(self, session: CameraSession, yolo_service, conf_threshold: float,
+                  send: Callable[[Dict], Awaitable[None]]):
+        """Infer the newest frame of `session` whenever a slot is free and `send` each result"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_inflight)
+
+        while True:
+            await session.wait_frame()
+            async with self._slots:
+                # Lấy frame mới nhất tại thời điểm có slot, các frame cũ hơn đã bị thay
+                frame = session.take()
+                self._inflight += 1
+                try:
+                    message = await self._infer(frame, yolo_service, conf_threshold)
+                except InferenceOverloadedError:
+                    session.dropped += 1
+                    await asyncio.sleep(OVERLOAD_BACKOFF_SECONDS)
+                    continue
+                except ImageRejectedError as e:
+                    session.failed += 1
+                    message = {"type": "error", "seq": frame.seq, "detail": e.detail}
+                except Exception as e:
+                    session.failed += 1
+                    logger.error(f"❌ Camera stream {session.id} frame {frame.seq} failed: {e}")
+                    message = {"type": "error", "seq": frame.seq, "detail": "Inference failed"}
+                finally:
+                    self._inflight -= 1
+
+            # Gửi sau khi trả slot: client mạng chậm không giữ phần CPU của camera khác
+            if message["type"] == "detections":
+                latency = session.record(frame)
+                message.update({
+                    "latency_ms": round(latency * 1000, 1),
+                    "fps": session.fps,
+                    "received": session.received,
+                    "dropped": session.dropped,
+                })
+            await send(message)
+
+    async def _infer(self, frame: _CameraFrame, yolo_service, conf_threshold: float) -> Dict:
+        decoded = await yolo_service.executor.run(
+            ingest_image, frame.data, settings.upload_max_pixels, yolo_service.input_size("detection"), "long"
+        )
+        results = await yolo_service.detect_sick_chickens(decoded.image, conf_threshold, annotate=False)
+        return {
+            "type": "detections",
+            "seq": frame.seq,
+            "width": decoded.header.width,
+            "height": decoded.header.height,
+            "total_chickens": results["total_chickens"],
+            "healthy_count": results["healthy_count"],
+            "sick_count": results["sick_count"],
+            "has_sick_chickens": results["has_sick_chickens"],
+            "detections": decoded.to_original(results["detections"]),
+            "model_version": results.get("model_version"),
+        }
+
+    def metrics(self) -> Dict:
+        sessions = [session.stats() for session in self._sessions.values()]
+        totals = dict(self._closed_totals)
+        # user_id chỉ dùng cho log, không đưa ra metrics
+        for stats in sessions:
+            stats.pop("user_id", None)
+        for stats in sessions:
+            for key in totals:
+                totals[key] += stats[key]
+        return {
+            "connections": len(sessions),
+            "max_connections": self.max_connections,
+            "max_inflight": self.max_inflight,
+            "inflight": self._inflight,
+            "totals": totals,
+            "sessions": sessions,
+        }
+
+
+_camera_stream_service: Optional[CameraStreamService] = None
+
+
+def get_camera_stream_service() -> CameraStreamService:
+    global _camera_stream_service
+    if _camera_stream_service is None:
+        _camera_stream_service = CameraStreamService()
+    return _camera_stream_service
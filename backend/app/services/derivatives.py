@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import get_settings
+from app.core import models
+from app.core.database import SessionLocal
+from app.services.image_ingest import decode_image, probe_image_file
+from app.services.yolo_service import YOLOService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DERIVATIVES_DIR = "thumbs"
+DERIVATIVE_QUEUE_SIZE = 256
+
+# Loại log -> model SQLAlchemy
+LOG_MODELS = {"detection": models.DetectionLog, "diagnosis": models.DiagnosisLog}
+
+
+def derivative_sizes() -> Dict[str, int]:
+    """Derivative name -> max side in pixels"""
+    return {"thumb": settings.thumbnail_max_side, "preview": settings.preview_max_side}
+
+
+def derivative_rel_path(source_rel_path: str, name: str, max_side: int) -> str:
+    """
+    `thumbs/<source path without extension>_<name><size>.<format>`. Sources are
+    never rewritten (content hash / uuid names) and the size is in the name, so
+    a derivative path always points at the same bytes and can be cached forever.
+    """
+    stem = os.path.splitext(source_rel_path)[0]
+    return os.path.join(DERIVATIVES_DIR, f"{stem}_{name}{max_side}.{settings.derivative_format}")
+
+
+def derivative_url(rel_path: Optional[str]) -> Optional[str]:
+    if not rel_path:
+        return None
+    return f"/uploads/{rel_path}".replace("\\", "/")
+
+
+def derivative_urls(log, full_url: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(thumbnail_url, preview_url) of a log, the full-size image until they are rendered"""
+    return derivative_url(log.thumbnail_path) or full_url, derivative_url(log.preview_path) or full_url
+
+
+def _encode(image: np.ndarray) -> bytes:
+    if settings.derivative_format == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, settings.derivative_quality]
+    else:
+        params = [cv2.IMWRITE_JPEG_QUALITY, settings.derivative_quality]
+    ok, buffer = cv2.imencode(f".{settings.derivative_format}", image, params)
+    if not ok:
+        raise RuntimeError(f"Could not encode {settings.derivative_format} derivative")
+    return buffer.tobytes()
+
+
+def _write_atomic(abs_path: str, data: bytes):
+    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    tmp_path = f"{abs_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, abs_path)
+
+
+def render_derivatives(
+    image_rel_path: str,
+    key_rel_path: str,
+    detections: Optional[List[Dict]] = None
+) -> Dict[str, str]:
+    """
+    Write the thumbnail and preview of a stored upload; returns {name: path
+    relative to `upload_dir`}. The original is decoded once, at the reduced
+    JPEG scale that still covers the preview, and `detections` (boxes in
+    original pixels) are drawn on it. Files already present are kept.
+    """
+    sizes = derivative_sizes()
+    paths = {name: derivative_rel_path(key_rel_path, name, side) for name, side in sizes.items()}
+    missing = [name for name, path in paths.items() if not os.path.exists(os.path.join(settings.upload_dir, path))]
+    if not missing:
+        return paths
+
+    source = os.path.join(settings.upload_dir, image_rel_path)
+    decoded = decode_image(source, probe_image_file(source), max(sizes.values()), "long")
+    image = decoded.image
+    if detections:
+        # Box lưu theo pixel ảnh gốc -> đổi về pixel ảnh đã decode thu nhỏ
+        image = YOLOService.annotate_detections(image, [
+            {**d, "bbox": [d["bbox"][0] / decoded.scale_x, d["bbox"][1] / decoded.scale_y,
+                           d["bbox"][2] / decoded.scale_x, d["bbox"][3] / decoded.scale_y]}
+            for d in detections
+        ])
+
+    height, width = image.shape[:2]
+    for name in missing:
+        scale = min(1.0, sizes[name] / max(height, width))
+        resized = image if scale == 1.0 else cv2.resize(
+            image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA
+        )
+        _write_atomic(os.path.join(settings.upload_dir, paths[name]), _encode(resized))
+    return paths
+
+
+def generate_for_log(kind: str, log_id: int, db=None) -> Optional[Dict[str, str]]:
+    """
+    Render the derivatives of a detection / diagnosis log and record their
+    paths on the row. Returns None when the row or its original is gone.
+    """
+    session = db or SessionLocal()
+    try:
+        log = session.get(LOG_MODELS[kind], log_id)
+        if log is None or not log.image_path:
+            return None
+        if kind == "detection":
+            # Theo file_id của ảnh annotated: mỗi lần detect có box riêng dù ảnh gốc trùng
+            key, detections = log.annotated_image_path or log.image_path, log.raw_result or []
+        else:
+            key, detections = log.image_path, None
+        try:
+            paths = render_derivatives(log.image_path, key, detections)
+        except FileNotFoundError:
+            return None
+        log.thumbnail_path, log.preview_path = paths["thumb"], paths["preview"]
+        session.commit()
+        return paths
+    finally:
+        if db is None:
+            session.close()
+
+
+class DerivativeService:
+    """
+    Thumbnail / preview generation in the background.
+
+    The endpoints enqueue a log right after saving it and return; a small
+    dedicated thread pool (`derivative_workers`) renders the files so it never
+    competes with inference or with the default `to_thread` pool used for DB
+    calls. The queue is per process and bounded: when it is full the log is
+    skipped and picked up by `scripts/backfill_derivatives.py`, and list
+    endpoints fall back to the full-size image meanwhile.
+    """
+
+    def __init__(self):
+        self.concurrency = max(1, settings.derivative_workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._generated = 0
+        self._failed = 0
+        self._dropped = 0
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=DERIVATIVE_QUEUE_SIZE)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="derivatives")
+        self._workers = [asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)]
+        logger.info(f"✅ Derivative workers started (concurrency={self.concurrency})")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, kind: str, log_id: int):
+        """Queue a saved log for thumbnail / preview rendering (no-op before `start`)"""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((kind, log_id))
+        except asyncio.QueueFull:
+            self._dropped += 1
+            logger.warning(f"⚠️ Derivative queue full, {kind} log {log_id} left for the backfill")
+
+    def metrics(self) -> Dict:
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "generated": self._generated,
+            "failed": self._failed,
+            "dropped": self._dropped,
+        }
+
+    async def _worker_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            kind, log_id = await self._queue.get()
+            try:
+                if await loop.run_in_executor(self._pool, generate_for_log, kind, log_id) is not None:
+                    self._generated += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"❌ Derivatives of {kind} log {log_id} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+_derivative_service: Optional[DerivativeService] = None
+
+
+def get_derivative_service() -> DerivativeService:
+    global _derivative_service
+    if _derivative_service is None:
+        _derivative_service = DerivativeService()
+    return _derivative_service
+
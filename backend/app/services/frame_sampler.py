@@ -0,0 +1,143 @@
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class FrameSampler:
+    """Decides which decoded video frames are sent to the detector"""
+
+    mode = "base"
+
+    def __init__(self, baseline_interval: int):
+        # Khoảng lấy mẫu cố định cũ (skip_frames + 1) dùng làm mốc so sánh
+        self.baseline_interval = max(1, baseline_interval)
+        self.frames_seen = 0
+        self.inferences = 0
+
+    def needs_frame(self, index: int) -> bool:
+        """False when frame `index` is skipped whatever its pixels (it can be grabbed without decoding)"""
+        return True
+
+    def should_infer(self, index: int, frame: Optional[np.ndarray]) -> bool:
+        self.frames_seen = index + 1
+        if self._decide(index, frame):
+            self.inferences += 1
+            return True
+        return False
+
+    def _decide(self, index: int, frame: np.ndarray) -> bool:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        baseline = -(-self.frames_seen // self.baseline_interval)  # ceil
+        return {
+            "mode": self.mode,
+            "inferences": self.inferences,
+            "baseline_inferences": baseline,
+            "inferences_saved": baseline - self.inferences,
+        }
+
+
+class FixedIntervalSampler(FrameSampler):
+    """Run the detector on one frame every `skip_frames + 1` (legacy behaviour)"""
+
+    mode = "fixed"
+
+    def __init__(self, skip_frames: int = 3):
+        super().__init__(skip_frames + 1)
+
+    def needs_frame(self, index: int) -> bool:
+        return index % self.baseline_interval == 0
+
+    def _decide(self, index: int, frame: np.ndarray) -> bool:
+        return index % self.baseline_interval == 0
+
+
+class MotionAdaptiveSampler(FrameSampler):
+    """
+    Chỉ chạy detector khi cảnh thay đổi đủ nhiều so với frame được infer gần nhất.
+
+    Tín hiệu thay đổi rất rẻ: ảnh xám thu nhỏ (~96x54), đếm tỷ lệ pixel lệch quá
+    `pixel_delta` mức xám. Vượt `motion_threshold` thì infer lại; chuồng đứng yên
+    thì dùng lại kết quả cũ. Khoảng cách giữa hai lần infer luôn nằm trong
+    [min_interval, max_interval] frame để không bỏ sót quá lâu.
+    """
+
+    mode = "adaptive"
+
+    def __init__(
+        self,
+        baseline_interval: int,
+        min_interval: int = 4,
+        max_interval: int = 24,
+        motion_threshold: float = 0.01,
+        pixel_delta: int = 15,
+        probe_width: int = 96
+    ):
+        super().__init__(baseline_interval)
+        self.min_interval = max(1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.motion_threshold = motion_threshold
+        self.pixel_delta = pixel_delta
+        self.probe_width = probe_width
+        self._last_index: Optional[int] = None
+        self._reference: Optional[np.ndarray] = None
+        self.motion_triggered = 0
+
+    def _probe(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (self.probe_width, max(1, int(height * self.probe_width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def needs_probe(self, index: int) -> bool:
+        """Frames inside the minimum interval are never inferred, no need to look at them"""
+        return self._last_index is None or index - self._last_index >= self.min_interval
+
+    def needs_frame(self, index: int) -> bool:
+        return self.needs_probe(index)
+
+    def _decide(self, index: int, frame: np.ndarray) -> bool:
+        if not self.needs_probe(index):
+            return False
+
+        probe = self._probe(frame)
+        if self._reference is None or index - self._last_index >= self.max_interval:
+            infer = True
+        else:
+            changed = cv2.absdiff(probe, self._reference) > self.pixel_delta
+            infer = float(np.count_nonzero(changed)) / changed.size >= self.motion_threshold
+            if infer:
+                self.motion_triggered += 1
+
+        if infer:
+            self._last_index = index
+            self._reference = probe
+        return infer
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats.update({
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "motion_triggered": self.motion_triggered,
+        })
+        return stats
+
+
+def create_frame_sampler(skip_frames: int = 3, mode: Optional[str] = None) -> FrameSampler:
+    """Build the sampler configured by `video_sampling_mode`"""
+    mode = mode or settings.video_sampling_mode
+    if mode == "adaptive":
+        return MotionAdaptiveSampler(
+            baseline_interval=skip_frames + 1,
+            min_interval=settings.video_sample_min_interval,
+            max_interval=settings.video_sample_max_interval,
+            motion_threshold=settings.video_motion_threshold
+        )
+    return FixedIntervalSampler(skip_frames)
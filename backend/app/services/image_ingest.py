@@ -0,0 +1,190 @@
+import io
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from app.services.upload_store import UploadRejectedError
+
+# Cờ decode theo hệ số thu nhỏ; với JPEG libjpeg giải mã thẳng ở 1/2, 1/4, 1/8 (không decode full rồi resize)
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# SOF0-SOF15 trừ DHT (C4), JPG (C8), DAC (CC)
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+# Magic bytes + header PNG / WebP / BMP nằm gọn trong đoạn đầu file
+_HEAD_BYTES = 32
+
+
+class ImageRejectedError(UploadRejectedError):
+    """Upload refused before decoding; the API maps it to `status_code` (400 / 413 / 415)"""
+
+
+@dataclass
+class ImageHeader:
+    format: str  # jpeg | png | webp | bmp
+    width: int  # Kích thước lưu trong file, chưa xoay theo EXIF
+    height: int
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+@dataclass
+class DecodedImage:
+    image: np.ndarray  # BGR, đã thu nhỏ theo `factor`, đã xoay theo EXIF
+    header: ImageHeader
+    factor: int
+    scale_x: float  # Nhân toạ độ trên ảnh thu nhỏ với hệ số này để về pixel ảnh gốc
+    scale_y: float
+
+    def to_original(self, detections: List[Dict]) -> List[Dict]:
+        """Copy of `detections` with `bbox` ([x1, y1, x2, y2]) in original image pixels"""
+        if self.factor == 1:
+            return detections
+        sx, sy = self.scale_x, self.scale_y
+        return [
+            {**d, "bbox": [round(d["bbox"][0] * sx, 2), round(d["bbox"][1] * sy, 2),
+                           round(d["bbox"][2] * sx, 2), round(d["bbox"][3] * sy, 2)]}
+            for d in detections
+        ]
+
+
+def _jpeg_size(f: BinaryIO) -> Optional[tuple]:
+    # Nhảy qua từng segment bằng seek: EXIF / ICC profile lớn không phải đọc vào bộ nhớ
+    f.seek(2)
+    while True:
+        marker_bytes = f.read(2)
+        if len(marker_bytes) < 2 or marker_bytes[0] != 0xFF:
+            return None
+        marker = marker_bytes[1]
+        if marker == 0xFF:  # byte đệm
+            f.seek(-1, io.SEEK_CUR)
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xDA:  # Start of scan trước SOF -> file hỏng
+            return None
+        segment_start = f.tell()
+        segment = f.read(7)
+        if len(segment) < 2:
+            return None
+        length = struct.unpack(">H", segment[:2])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if len(segment) < 7:
+                return None
+            height, width = struct.unpack(">HH", segment[3:7])
+            return width, height
+        f.seek(segment_start + length)
+
+
+def _webp_size(data: bytes) -> Optional[tuple]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30 and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25 and data[20] == 0x2F:
+        bits = struct.unpack("<I", data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _probe(f: BinaryIO) -> ImageHeader:
+    data = f.read(_HEAD_BYTES)
+    size, image_format = None, None
+    if data[:3] == b"\xff\xd8\xff":
+        image_format, size = "jpeg", _jpeg_size(f)
+    elif data[:8] == b"\x89PNG\r\n\x1a\n":
+        if data[12:16] == b"IHDR" and len(data) >= 24:
+            image_format, size = "png", struct.unpack(">II", data[16:24])
+    elif data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        image_format, size = "webp", _webp_size(data)
+    elif data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        image_format, size = "bmp", (width, abs(height))
+    else:
+        raise ImageRejectedError(415, "Định dạng ảnh không được hỗ trợ (chỉ nhận JPEG, PNG, WebP, BMP)")
+
+    if not size or size[0] <= 0 or size[1] <= 0:
+        raise ImageRejectedError(400, "Invalid image file")
+    return ImageHeader(image_format, int(size[0]), int(size[1]))
+
+
+def probe_image(data: bytes) -> ImageHeader:
+    """Format and dimensions from the magic bytes / header only, no pixel is decoded"""
+    return _probe(io.BytesIO(data))
+
+
+def probe_image_file(path: str) -> ImageHeader:
+    """`probe_image` for a stored upload: only the header bytes are read from disk"""
+    with open(path, "rb") as f:
+        return _probe(f)
+
+
+def check_image_limits(header: ImageHeader, max_pixels: int):
+    if header.pixels > max_pixels:
+        raise ImageRejectedError(
+            413, f"Ảnh quá lớn: {header.width}x{header.height} (tối đa {max_pixels / 1e6:.0f} MP)"
+        )
+
+
+def reduction_factor(header: ImageHeader, target_size: int, fit: str = "long") -> int:
+    """
+    Largest DCT scale (1, 2, 4, 8) that keeps the image at least `target_size`
+    on the side the model resizes: the long side for detection (letterbox), the
+    short side for classification (resize + center crop).
+    """
+    side = max(header.width, header.height) if fit == "long" else min(header.width, header.height)
+    factor = 1
+    for candidate in (2, 4, 8):
+        if side / candidate >= target_size:
+            factor = candidate
+    return factor
+
+
+def decode_image(
+    source: Union[bytes, str], header: ImageHeader, target_size: Optional[int] = None, fit: str = "long"
+) -> DecodedImage:
+    """
+    Decode `source` (encoded bytes or the path of a stored upload) at the
+    reduced scale chosen by `reduction_factor` (full size when `target_size`
+    is None). Runs in the inference executor: it releases the GIL.
+    """
+    factor = reduction_factor(header, target_size, fit) if target_size else 1
+    if isinstance(source, str):
+        image = cv2.imread(source, REDUCED_DECODE_FLAGS[factor])
+    else:
+        image = cv2.imdecode(np.frombuffer(source, np.uint8), REDUCED_DECODE_FLAGS[factor])
+    if image is None:
+        raise ImageRejectedError(400, "Invalid image file")
+
+    # imdecode xoay ảnh theo EXIF orientation: header lưu kích thước trước khi xoay
+    decoded_height, decoded_width = image.shape[:2]
+    width, height = header.width, header.height
+    if abs(decoded_width - width / factor) > abs(decoded_width - height / factor):
+        width, height = height, width
+    return DecodedImage(image, header, factor, width / decoded_width, height / decoded_height)
+
+
+def ingest_image(data: bytes, max_pixels: int, target_size: Optional[int] = None, fit: str = "long") -> DecodedImage:
+    """
+    Check an upload before anything expensive happens (format from the magic
+    bytes, pixel cap from the header), then decode it directly at a reduced
+    scale that still covers the model input.
+    """
+    header = probe_image(data)
+    check_image_limits(header, max_pixels)
+    return decode_image(data, header, target_size, fit)
@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class InferenceOverloadedError(RuntimeError):
+    """Raised when the inference backlog is full; the API maps it to HTTP 503"""
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for blocking YOLO / OpenCV work.
+
+    Ultralytics, cv2.imdecode/imwrite and the VideoCapture loop all release the
+    GIL while they crunch pixels, so running them here keeps the event loop free
+    for `/health`, `/api/v1/chat/ask`... while a video is being analyzed.
+    `max_pending` caps queued + running jobs: beyond it we fail fast instead of
+    letting latency grow without bound.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16, thread_name_prefix: str = "inference"):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self.thread_name_prefix = thread_name_prefix
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # Tạo pool lười (lazy) để process con sau khi fork không thừa hưởng thread chết
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self.thread_name_prefix
+                    )
+        return self._pool
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run `func(*args, **kwargs)` on the pool and await its result"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise InferenceOverloadedError(
+                    f"Inference backlog is full ({self.max_pending} jobs pending)"
+                )
+            self._pending += 1
+
+        try:
+            future = self._get_pool().submit(functools.partial(func, *args, **kwargs))
+        except Exception:
+            self._release(None)
+            raise
+        # Giải phóng slot khi thread thực sự chạy xong, kể cả khi caller bị huỷ giữa chừng
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def run_on_each_worker(self, func: Callable, timeout: float = 300.0) -> List:
+        """
+        Run `func()` once on every worker thread and block until all are done
+        (startup warm-ups of per-thread state). Each task waits at a barrier
+        after `func`, so no thread can pick up a second one.
+        """
+        barrier = threading.Barrier(self.max_workers)
+
+        def task():
+            result = func()
+            try:
+                barrier.wait(timeout)
+            except threading.BrokenBarrierError:
+                pass
+            return result
+
+        futures = [self._get_pool().submit(task) for _ in range(self.max_workers)]
+        return [future.result() for future in futures]
+
+    def metrics(self) -> Dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+_inference_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    global _inference_executor
+    if _inference_executor is None:
+        _inference_executor = InferenceExecutor(
+            max_workers=settings.inference_workers,
+            max_pending=settings.inference_max_pending
+        )
+    return _inference_executor
+
+
+_video_executor: Optional[InferenceExecutor] = None
+
+
+def get_video_executor() -> InferenceExecutor:
+    """
+    Separate pool for whole-clip video pipelines (a task holds its thread for
+    the entire clip). Sized by `video_job_concurrency`, so videos never occupy
+    the threads serving /detect, /classify, the camera stream and ingest.
+    """
+    global _video_executor
+    if _video_executor is None:
+        _video_executor = InferenceExecutor(
+            max_workers=settings.video_job_concurrency,
+            max_pending=settings.inference_max_pending,
+            thread_name_prefix="video"
+        )
+    return _video_executor
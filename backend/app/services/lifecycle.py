@@ -0,0 +1,163 @@
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PENDING, STARTING, READY, FAILED = "pending", "starting", "ready", "failed"
+
+
+@dataclass
+class _Component:
+    name: str
+    init: Callable[[], Any]  # Hàm sync (chạy trong thread) hoặc coroutine function
+    required: bool  # /ready chỉ trả 200 khi mọi component required đã READY
+    depends_on: List[str] = field(default_factory=list)
+    retry: bool = False  # Thử lại với backoff khi lỗi (service ngoài khởi động chậm: Chroma)
+    status: str = PENDING
+    attempts: int = 0
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class ServiceLifecycle:
+    """
+    Background initialization of the heavy services (DB schema + seed, YOLO,
+    embedding model, Chroma, LLM client).
+
+    Components start concurrently as soon as their dependencies are ready, so
+    the HTTP server accepts connections immediately: `/health` (liveness)
+    answers right away while `/ready` (readiness) returns 503 until every
+    required component is up. Optional components (RAG) never block
+    readiness and are retried with backoff when an external service is slow.
+    """
+
+    def __init__(self, parallel: bool = True, retry_max_seconds: float = 60.0):
+        self.parallel = parallel
+        self.retry_max_seconds = retry_max_seconds
+        self._components: Dict[str, _Component] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._started_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+
+    def register(self, name: str, init: Callable[[], Any], required: bool = True,
+                 depends_on: Optional[List[str]] = None, retry: bool = False):
+        self._components[name] = _Component(name, init, required, list(depends_on or []), retry)
+
+    async def _run_once(self, component: _Component):
+        if inspect.iscoroutinefunction(component.init):
+            await component.init()
+        else:
+            await asyncio.to_thread(component.init)
+
+    async def _start_component(self, component: _Component):
+        for dependency in component.depends_on:
+            await self._components[dependency].done.wait()
+            if self._components[dependency].status != READY:
+                component.status, component.error = FAILED, f"dependency '{dependency}' failed"
+                component.done.set()
+                return
+
+        delay = 1.0
+        while True:
+            component.status = STARTING
+            component.attempts += 1
+            started = time.perf_counter()
+            try:
+                await self._run_once(component)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                component.error = str(e)
+                logger.error(f"❌ {component.name} failed to start (attempt {component.attempts}): {e}")
+                if component.retry:
+                    # Vẫn báo done để component phụ thuộc / /ready không phải chờ mãi
+                    component.status = FAILED
+                    component.done.set()
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.retry_max_seconds)
+                    continue
+                component.status = FAILED
+                component.done.set()
+                return
+
+            component.seconds = round(time.perf_counter() - started, 3)
+            component.status, component.error = READY, None
+            component.done.set()
+            logger.info(f"✅ {component.name} ready in {component.seconds}s")
+            self._check_ready()
+            return
+
+    def _check_ready(self):
+        if self._ready_at is None and self.ready:
+            self._ready_at = time.perf_counter()
+            logger.info(f"✅ Service ready in {self._ready_at - self._started_at:.2f}s")
+
+    async def start(self):
+        """Start every component; returns immediately when `parallel`, after all of them otherwise"""
+        self._started_at = time.perf_counter()
+        if self.parallel:
+            self._tasks = [
+                asyncio.create_task(self._start_component(component))
+                for component in self._components.values()
+            ]
+            return
+        # Chế độ tuần tự (như trước đây), giữ lại để so sánh trong benchmarks/bench_startup.py
+        for component in self._components.values():
+            component.retry = False
+            await self._start_component(component)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def ready(self) -> bool:
+        return self._started_at is not None and all(
+            component.status == READY for component in self._components.values() if component.required
+        )
+
+    def is_ready(self, name: str) -> bool:
+        component = self._components.get(name)
+        return component is not None and component.status == READY
+
+    async def wait_ready(self, name: str):
+        await self._components[name].done.wait()
+
+    def status(self) -> Dict:
+        now = time.perf_counter()
+        return {
+            "ready": self.ready,
+            "parallel": self.parallel,
+            "uptime_seconds": round(now - self._started_at, 3) if self._started_at else None,
+            "ready_after_seconds": round(self._ready_at - self._started_at, 3) if self._ready_at else None,
+            "components": {
+                component.name: {
+                    "status": component.status,
+                    "required": component.required,
+                    "attempts": component.attempts,
+                    "seconds": component.seconds,
+                    "error": component.error,
+                }
+                for component in self._components.values()
+            },
+        }
+
+
+_service_lifecycle: Optional[ServiceLifecycle] = None
+
+
+def get_service_lifecycle() -> ServiceLifecycle:
+    global _service_lifecycle
+    if _service_lifecycle is None:
+        _service_lifecycle = ServiceLifecycle(parallel=settings.startup_parallel)
+    return _service_lifecycle
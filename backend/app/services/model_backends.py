@@ -0,0 +1,124 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+from ultralytics import YOLO
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BACKENDS = ("torch", "onnxruntime", "openvino")
+SUPPORTED_PRECISIONS = ("fp32", "int8")
+
+# Định dạng `YOLO.export(format=...)` tương ứng với từng backend
+EXPORT_FORMATS = {
+    "onnxruntime": "onnx",
+    "openvino": "openvino",
+}
+
+_torch_load_patched = False
+
+
+def patch_torch_load():
+    """
+    Thủ thuật (Monkeypatch) để qua mặt hàng rào cảnh báo bảo mật mới nhất của PyTorch 2.6+.
+    Bắt buộc phải viết đè hàm torch.load này để thư viện Ultralytics YOLO cho phép nạp lại tệp weights an toàn.
+    Chỉ cần khi đọc file `.pt` (backend torch hoặc lúc export), không áp dụng khi import module.
+    """
+    global _torch_load_patched
+    if _torch_load_patched:
+        return
+
+    import torch
+
+    original_torch_load = torch.load
+
+    def patched_torch_load(*args, **kwargs):
+        if 'weights_only' not in kwargs:
+            kwargs['weights_only'] = False
+        return original_torch_load(*args, **kwargs)
+
+    torch.load = patched_torch_load
+    _torch_load_patched = True
+
+
+def resolve_model_artifact(weights_path: str, backend: str, precision: str = "fp32") -> Path:
+    """
+    Path of the artifact a backend loads, derived from the `.pt` weights path the
+    same way `YOLO.export` names its outputs:
+    `detection_best.pt` -> `detection_best.onnx` / `detection_best_openvino_model/`,
+    INT8 variants (scripts/quantize_models.py) -> `detection_best_int8.onnx` /
+    `detection_best_int8_openvino_model/`.
+    """
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"Unsupported model precision '{precision}', expected one of {SUPPORTED_PRECISIONS}")
+
+    weights = Path(weights_path)
+    suffix = "_int8" if precision == "int8" else ""
+    if backend == "torch":
+        if precision != "fp32":
+            raise ValueError("INT8 models are served through onnxruntime or openvino, not torch")
+        return weights
+    if backend == "onnxruntime":
+        return weights.with_name(f"{weights.stem}{suffix}.onnx")
+    if backend == "openvino":
+        return weights.parent / f"{weights.stem}{suffix}_openvino_model"
+    raise ValueError(f"Unsupported inference backend '{backend}', expected one of {SUPPORTED_BACKENDS}")
+
+
+def artifact_fingerprint(weights_path: str, backend: str, precision: str = "fp32") -> Optional[str]:
+    """
+    Model version used in cache keys: backend, precision and a hash of the
+    artifact bytes, so re-exported or retrained weights never reuse old results.
+    """
+    artifact = resolve_model_artifact(weights_path, backend, precision)
+    if not artifact.exists():
+        return None
+
+    files = [artifact] if artifact.is_file() else sorted(p for p in artifact.rglob("*") if p.is_file())
+    external_data = Path(str(artifact) + ".data")
+    if artifact.is_file() and external_data.exists():
+        files.append(external_data)
+
+    digest = hashlib.sha256()
+    for path in files:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return f"{backend}-{precision}-{digest.hexdigest()[:16]}"
+
+
+def load_model(weights_path: str, backend: str, task: str, precision: str = "fp32") -> Optional[YOLO]:
+    """Load the artifact of `backend` through Ultralytics, None when it has not been exported"""
+    artifact = resolve_model_artifact(weights_path, backend, precision)
+    if not artifact.exists():
+        logger.warning(f"⚠️ {task} model for backend '{backend}' ({precision}) not found at {artifact}")
+        return None
+
+    if backend == "torch":
+        patch_torch_load()
+    logger.info(f"Loading {task} model ({backend}, {precision}) from {artifact}")
+    return YOLO(str(artifact), task=task)
+
+
+def export_model(weights_path: str, backend: str, imgsz: Optional[int] = None, **kwargs) -> Path:
+    """
+    Export `.pt` weights to the artifact of `backend` (next to the weights).
+    Batch/height/width are exported dynamic so the detection micro-batches and
+    video batches keep working.
+    """
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(f"Backend '{backend}' has nothing to export, expected one of {tuple(EXPORT_FORMATS)}")
+
+    patch_torch_load()
+    model = YOLO(weights_path)
+    options = {"format": EXPORT_FORMATS[backend], "dynamic": True}
+    if imgsz is not None:
+        options["imgsz"] = imgsz
+    options.update(kwargs)
+
+    exported = Path(model.export(**options))
+    expected = resolve_model_artifact(weights_path, backend)
+    if exported.resolve() != expected.resolve():
+        logger.warning(f"⚠️ Export wrote {exported}, the service will look for {expected}")
+    return exported
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.core import models
+from app.core.database import SessionLocal
+from app.services.model_backends import artifact_fingerprint, load_model
+from app.services.yolo_service import MODEL_TASKS, get_yolo_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ModelRegistryError(ValueError):
+    """Registry request refused; the API maps it to `status_code` (400 / 404 / 409)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def resolve_weights_path(weights_path: str) -> Tuple[str, str]:
+    """
+    (path relative to `registry_store_dir`, absolute path) of a weights file.
+    Only files inside the store are accepted: `.pt` weights are unpickled on load.
+    """
+    store = Path(settings.registry_store_dir).resolve()
+    path = (store / weights_path).resolve()
+    if store not in path.parents:
+        raise ModelRegistryError(400, f"weights_path phải nằm trong thư mục {settings.registry_store_dir}")
+    return path.relative_to(store).as_posix(), str(path)
+
+
+class ModelRegistry:
+    """
+    Versioned detection / classification models.
+
+    Each registered file is recorded with its fingerprint (hash of the artifact
+    for the configured backend / precision), class names and benchmark
+    metadata. Activating a version hot-swaps it into `YOLOService` of the
+    worker that served the request; the `model_versions` table is the source of
+    truth, the other uvicorn workers follow it on their next poll.
+    """
+
+    def __init__(self):
+        self.poll_interval = settings.registry_poll_seconds
+        self._watcher: Optional[asyncio.Task] = None
+        # Kích hoạt và đồng bộ nền không được xen nhau (sync đọc DB cũ rồi swap ngược lại)
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Load the active versions recorded in the DB, then follow activations made by other workers"""
+        await self.sync()
+        if self.poll_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+
+    def list_versions(self, db: Session, kind: Optional[str] = None) -> List[models.ModelVersion]:
+        query = db.query(models.ModelVersion)
+        if kind is not None:
+            query = query.filter(models.ModelVersion.kind == kind)
+        return query.order_by(models.ModelVersion.created_at.desc(), models.ModelVersion.id.desc()).all()
+
+    @staticmethod
+    def _inspect(kind: str, abs_path: str) -> Tuple[str, Dict[str, str]]:
+        backend, precision = settings.inference_backend, settings.inference_precision
+        fingerprint = artifact_fingerprint(abs_path, backend, precision)
+        if fingerprint is None:
+            raise ModelRegistryError(404, f"Không tìm thấy artifact {backend} ({precision}) cho {abs_path}")
+        try:
+            model = load_model(abs_path, backend, MODEL_TASKS[kind], precision)
+            names = model.names
+        except Exception as e:
+            raise ModelRegistryError(400, f"Không nạp được model: {e}")
+        return fingerprint, {str(index): name for index, name in names.items()}
+
+    async def register(
+        self,
+        db: Session,
+        kind: str,
+        weights_path: str,
+        version: str,
+        metrics: Optional[Dict] = None,
+        notes: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> models.ModelVersion:
+        """Record a weights file as a new version of `kind` (inactive until activated)"""
+        rel_path, abs_path = resolve_weights_path(weights_path)
+        if db.query(models.ModelVersion).filter(
+            models.ModelVersion.kind == kind, models.ModelVersion.version == version
+        ).first():
+            raise ModelRegistryError(409, f"Version '{version}' đã tồn tại")
+
+        # Nạp thử một lần (lấy tên class, chắc chắn file dùng được) ngoài event loop
+        fingerprint, class_names = await asyncio.to_thread(self._inspect, kind, abs_path)
+        duplicate = db.query(models.ModelVersion).filter(
+            models.ModelVersion.kind == kind, models.ModelVersion.fingerprint == fingerprint
+        ).first()
+        if duplicate:
+            raise ModelRegistryError(409, f"File này đã được đăng ký là version '{duplicate.version}'")
+
+        row = models.ModelVersion(
+            kind=kind,
+            version=version,
+            weights_path=rel_path,
+            backend=settings.inference_backend,
+            precision=settings.inference_precision,
+            fingerprint=fingerprint,
+            class_names=class_names,
+            metrics=metrics,
+            notes=notes,
+            is_active=False,
+            created_by=user_id
+        )
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        return row
+
+    async def activate(self, db: Session, version_id: int) -> Tuple[models.ModelVersion, Dict]:
+        """Hot-swap a registered version in and mark it active; returns (row, swap timings)"""
+        row = db.get(models.ModelVersion, version_id)
+        if row is None:
+            raise ModelRegistryError(404, "Không tìm thấy model version")
+        if (row.backend, row.precision) != (settings.inference_backend, settings.inference_precision):
+            raise ModelRegistryError(
+                400, f"Version đăng ký cho {row.backend} ({row.precision}), backend hiện tại là "
+                     f"{settings.inference_backend} ({settings.inference_precision})"
+            )
+        _, abs_path = resolve_weights_path(row.weights_path)
+
+        async with self._lock:
+            swap = await self._swap(row.kind, abs_path, row.fingerprint)
+
+            db.query(models.ModelVersion).filter(
+                models.ModelVersion.kind == row.kind, models.ModelVersion.id != row.id
+            ).update({models.ModelVersion.is_active: False}, synchronize_session=False)
+            row.is_active = True
+            row.activated_at = datetime.now(timezone.utc)
+            # Số đo lúc kích hoạt (trên máy đang chạy) để so sánh các version
+            row.metrics = {**(row.metrics or {}), "activation": {
+                "load_seconds": swap["load_seconds"],
+                "warmup_seconds": swap["warmup_seconds"],
+                "latency_ms": swap["latency_ms"],
+                "measured_at": row.activated_at.isoformat(),
+            }}
+            db.commit()
+            db.refresh(row)
+
+        logger.info(f"✅ Model version {row.kind}/{row.version} activated")
+        return row, swap
+
+    @staticmethod
+    async def _swap(kind: str, abs_path: str, fingerprint: str) -> Dict:
+        try:
+            return await asyncio.to_thread(get_yolo_service().hot_swap, kind, abs_path, fingerprint)
+        except FileNotFoundError as e:
+            raise ModelRegistryError(404, str(e))
+        except ValueError as e:
+            # File bị thay sau khi đăng ký: phải đăng ký lại thành version mới
+            raise ModelRegistryError(409, str(e))
+
+    @staticmethod
+    def _active_versions() -> List[Dict]:
+        db = SessionLocal()
+        try:
+            rows = db.query(models.ModelVersion).filter(models.ModelVersion.is_active.is_(True)).all()
+            return [
+                {
+                    "kind": row.kind,
+                    "version": row.version,
+                    "weights_path": row.weights_path,
+                    "backend": row.backend,
+                    "precision": row.precision,
+                    "fingerprint": row.fingerprint,
+                }
+                for row in rows
+            ]
+        finally:
+            db.close()
+
+    async def sync(self) -> List[str]:
+        """Swap in the active version of each kind when this process runs another one"""
+        swapped = []
+        async with self._lock:
+            rows = await asyncio.to_thread(self._active_versions)
+            loaded = get_yolo_service().model_versions
+            for row in rows:
+                if row["fingerprint"] == loaded.get(row["kind"]):
+                    continue
+                if (row["backend"], row["precision"]) != (settings.inference_backend, settings.inference_precision):
+                    logger.warning(f"⚠️ Active {row['kind']} version '{row['version']}' targets another backend, skipped")
+                    continue
+                try:
+                    _, abs_path = resolve_weights_path(row["weights_path"])
+                    await self._swap(row["kind"], abs_path, row["fingerprint"])
+                    swapped.append(f"{row['kind']}/{row['version']}")
+                except Exception as e:
+                    # Giữ model đang chạy, lần poll sau thử lại
+                    logger.error(f"❌ Could not load active {row['kind']} version '{row['version']}': {e}")
+        return swapped
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Model registry sync error: {e}")
+
+
+_model_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry()
+    return _model_registry
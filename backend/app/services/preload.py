@@ -0,0 +1,69 @@
+import gc
+import logging
+import os
+import time
+from typing import Dict
+
+import torch
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def preload_models() -> Dict:
+    """
+    Load YOLO and the embedding model in the gunicorn master, before the
+    workers fork (`gunicorn.conf.py`). Workers inherit the singletons and the
+    weight pages stay shared copy-on-write, since inference only reads them.
+
+    No inference and no executor threads here: threads do not survive a fork
+    and an OpenMP pool started in the parent can hang its children. Each
+    worker warms up in its own lifecycle startup instead.
+    """
+    from app.services.rag_service import get_rag_service
+    from app.services.yolo_service import get_yolo_service
+
+    timings = {}
+    # Fuse Conv+BN chạy vài phép torch: giữ 1 thread để master không dựng thread pool OpenMP
+    torch.set_num_threads(1)
+
+    started = time.perf_counter()
+    get_yolo_service()
+    timings["yolo"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    try:
+        get_rag_service().load_embeddings(warmup=False)
+        timings["embeddings"] = round(time.perf_counter() - started, 3)
+    except Exception as e:
+        # Không bắt buộc: worker sẽ thử lại trong lifecycle (component embeddings)
+        logger.warning(f"⚠️ Embedding model not preloaded: {e}")
+        timings["embeddings"] = None
+
+    logger.info(f"✅ Models preloaded in master (pid {os.getpid()}): {timings}")
+    return timings
+
+
+def freeze_heap():
+    """
+    Move every object the master holds (imported modules, preloaded models) to
+    the permanent GC generation right before forking: the workers' collections
+    never scan them or write to their headers, so those pages stay shared.
+    """
+    gc.collect()
+    gc.freeze()
+    logger.info(f"🧊 {gc.get_freeze_count()} objects frozen before fork")
+
+
+def configure_worker(workers: int):
+    """Per-worker setup right after fork"""
+    from app.core.database import engine
+
+    # Connection pool của master (nếu có) không được dùng chung giữa các process
+    engine.dispose(close=False)
+
+    # N worker x số core thread intra-op -> tranh CPU; chia đều core cho các worker
+    threads = settings.worker_torch_threads or max(1, (os.cpu_count() or 1) // max(1, workers))
+    torch.set_num_threads(threads)
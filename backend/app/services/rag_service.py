@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import threading
 from typing import List, Optional, Dict
 import chromadb
 from langchain_groq import ChatGroq
@@ -23,48 +25,60 @@ class RAGService:
     """Service for RAG using Local HuggingFace Embeddings and Dynamic LLM Provider"""
 
     def __init__(self):
+        # Không tải gì ở đây: embedding model, Chroma và LLM được khởi tạo song song
+        # trong nền bởi ServiceLifecycle (app/services/lifecycle.py) khi app start
         self.settings = get_settings()
         self.llm = None
         self.custom_system_prompt = None
-        self._initialize_llm()
-        
-        # 2. Initialize LOCAL Embeddings (HuggingFace)
-        try:
+        self._llm_initialized = False
+        self.embeddings = None
+        self._embeddings_warm = False
+        self.chroma_client = None
+        self.collection = None
+
+        # Initialize Text Splitter
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=700,
+            chunk_overlap=150,
+            separators=["\n\n", "\n", ".", "!", "?", " ", ""]
+        )
+
+    def load_embeddings(self, warmup: bool = True):
+        """
+        Load the local HuggingFace embedding model and run one warm-up query (raises on failure).
+        `warmup=False` in the gunicorn master: no torch compute before the workers fork.
+        """
+        if self.embeddings is None:
             logger.info("📡 Loading Local Embedding Model (paraphrase-multilingual-MiniLM-L12-v2)...")
             self.embeddings = HuggingFaceEmbeddings(
                 model_name="paraphrase-multilingual-MiniLM-L12-v2"
             )
             logger.info("✅ Local Embedding Model loaded.")
-        except Exception as e:
-            logger.error(f"❌ Failed to load Embedding model: {e}")
-            self.embeddings = None
+        if warmup and not self._embeddings_warm:
+            # Câu hỏi đầu tiên không phải trả giá khởi tạo tokenizer / cấp phát tensor
+            self.embeddings.embed_query("khởi động")
+            self._embeddings_warm = True
 
-        # 3. Initialize ChromaDB Client
-        try:
-            self.chroma_client = chromadb.HttpClient(
-                host=self.settings.chroma_host,
-                port=self.settings.chroma_port,
-                settings=chromadb.Settings(
-                    allow_reset=True,
-                    anonymized_telemetry=False
-                )
+    def connect_chroma(self):
+        """Connect to ChromaDB and open the knowledge collection (raises on failure)"""
+        if self.chroma_client is not None:
+            return
+        client = chromadb.HttpClient(
+            host=self.settings.chroma_host,
+            port=self.settings.chroma_port,
+            settings=chromadb.Settings(
+                allow_reset=True,
+                anonymized_telemetry=False
             )
-            self.chroma_client.heartbeat()
-            self.collection = self.chroma_client.get_or_create_collection(name="chicken_knowledge")
-            logger.info("✅ Connected to ChromaDB")
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to ChromaDB: {e}")
-            self.chroma_client = None
-
-        # 4. Initialize Text Splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=700,
-            chunk_overlap=150,
-            separators=["\n\n", "\n", ".", "!", "?", " ", ""]
         )
+        client.heartbeat()
+        self.collection = client.get_or_create_collection(name="chicken_knowledge")
+        self.chroma_client = client
+        logger.info("✅ Connected to ChromaDB")
 
     def _initialize_llm(self):
         """Initialize LLM with dynamic settings from Database"""
+        self._llm_initialized = True
         db = SessionLocal()
         try:
             # Lấy toàn bộ settings liên quan đến AI
@@ -234,6 +248,8 @@ class RAGService:
     async def answer_question(self, question: str, history: List[Dict] = []) -> Dict:
         if not self.chroma_client or not self.embeddings: 
             return {"answer": "Hệ thống AI chưa sẵn sàng.", "usage": None}
+        if not self._llm_initialized:
+            await asyncio.to_thread(self._initialize_llm)
         try:
             query_vector = self.embeddings.embed_query(question)
             results = self.collection.query(query_embeddings=[query_vector], n_results=5)
@@ -329,7 +345,11 @@ class RAGService:
             return {"answer": "Đã xảy ra lỗi khi xử lý câu hỏi.", "usage": None}
 
 _rag_service: Optional[RAGService] = None
+_rag_service_lock = threading.Lock()
 def get_rag_service() -> RAGService:
     global _rag_service
-    if _rag_service is None: _rag_service = RAGService()
+    if _rag_service is None:
+        # Lifecycle gọi từ nhiều thread cùng lúc lúc khởi động
+        with _rag_service_lock:
+            if _rag_service is None: _rag_service = RAGService()
     return _rag_service
@@ -0,0 +1,237 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def content_key(digest: str, model_version: str, **params) -> str:
+    """sha256 of the upload's sha256 (computed while it is received) + model version + inference parameters"""
+    suffix = ",".join(f"{name}={params[name]}" for name in sorted(params))
+    return hashlib.sha256(f"{digest}|{model_version}|{suffix}".encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache kết quả inference theo nội dung ảnh upload.
+
+    - Tầng 1: LRU trong process (OrderedDict), giới hạn theo số entry và tổng
+      dung lượng JSON, mỗi entry hết hạn sau `ttl_seconds`.
+    - Tầng 2 (tuỳ chọn): thư mục dùng chung `shared_dir` (cùng volume với uploads)
+      để các worker uvicorn / container khác cũng được hưởng. Ghi atomic bằng
+      file tạm + `os.replace`, entry hết hạn bị xoá lười khi đọc và khi dọn định kỳ.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 86400,
+        shared_dir: Optional[str] = None,
+        shared_max_entries: int = 20000
+    ):
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.ttl = ttl_seconds
+        self.shared_dir = Path(shared_dir) / namespace if shared_dir else None
+        self.shared_max_entries = shared_max_entries
+
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._shared_writes = 0
+
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+
+    # --- Public API ---
+
+    def lookup(self, digest: str, model_version: str, **params) -> Tuple[str, Optional[Dict]]:
+        """(key, cached value or None) for an upload with sha256 `digest`"""
+        key = content_key(digest, model_version, **params)
+        return key, self.get(key)
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                self._drop(key)
+                self._expired += 1
+
+        value = self._shared_get(key, now)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._shared_hits += 1
+        self._local_set(key, value, now)
+        return value
+
+    def set(self, key: str, value: Dict):
+        now = time.time()
+        self._local_set(key, value, now)
+        self._shared_set(key, value, now)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._drop(key)
+        if self.shared_dir is not None:
+            try:
+                self._shared_path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._shared_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "shared_tier": self.shared_dir is not None,
+                "hits": self._hits,
+                "shared_hits": self._shared_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._hits + self._shared_hits) / lookups, 4) if lookups else 0.0,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+
+    # --- Local tier ---
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _local_set(self, key: str, value: Dict, now: float):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (now + self.ttl, size, value)
+            self._bytes += size
+            # Quá giới hạn -> bỏ entry ít được dùng nhất (đầu OrderedDict)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evicted += 1
+
+    # --- Shared tier ---
+
+    def _shared_path(self, key: str) -> Path:
+        return self.shared_dir / key[:2] / f"{key}.json"
+
+    def _shared_get(self, key: str, now: float) -> Optional[Dict]:
+        if self.shared_dir is None:
+            return None
+        path = self._shared_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Unreadable result cache entry {path}: {e}")
+            return None
+
+        if payload.get("expires_at", 0) <= now:
+            with self._lock:
+                self._expired += 1
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            return None
+        return payload.get("value")
+
+    def _shared_set(self, key: str, value: Dict, now: float):
+        if self.shared_dir is None:
+            return
+        path = self._shared_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": now + self.ttl, "value": value}, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write result cache entry {path}: {e}")
+            return
+
+        with self._lock:
+            self._shared_writes += 1
+            prune = self._shared_writes % 100 == 0
+        if prune:
+            self._prune_shared(now)
+
+    def _prune_shared(self, now: float):
+        """Drop expired files, then the oldest ones above `shared_max_entries`"""
+        files = []
+        for path in self.shared_dir.glob("*/*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+
+        files.sort()
+        excess = len(files) - self.shared_max_entries
+        for index, (mtime, path) in enumerate(files):
+            if index >= excess and mtime + self.ttl > now:
+                break
+            try:
+                path.unlink()
+                with self._lock:
+                    self._evicted += 1
+            except FileNotFoundError:
+                pass
+
+
+_result_caches: Dict[str, ResultCache] = {}
+_result_caches_lock = threading.Lock()
+
+
+def get_result_cache(namespace: str) -> ResultCache:
+    with _result_caches_lock:
+        cache = _result_caches.get(namespace)
+        if cache is None:
+            cache = _result_caches[namespace] = ResultCache(
+                namespace,
+                max_entries=settings.result_cache_max_entries,
+                max_bytes=settings.result_cache_max_bytes,
+                ttl_seconds=settings.result_cache_ttl_seconds,
+                shared_dir=settings.result_cache_shared_dir or None
+            )
+        return cache
+
+
+def result_cache_metrics() -> Dict:
+    with _result_caches_lock:
+        caches = dict(_result_caches)
+    return {namespace: cache.metrics() for namespace, cache in caches.items()}
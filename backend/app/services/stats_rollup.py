@@ -0,0 +1,191 @@
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, case, cast, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core import models
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_SOURCES = ("diagnosis", "detection", "usage")
+HEALTHY_DISEASE = "Healthy"
+# Số mốc thời gian mỗi câu SELECT khi lô usage trải qua nhiều ngày
+DAY_QUERY_CHUNK = 200
+
+Rollup = models.DailyRollup
+
+
+def _day(column, dialect: str):
+    """Calendar day of a timestamp column, computed by the database (its timezone)"""
+    # SQLite: CAST(... AS DATE) trả về số (năm), phải dùng date()
+    return func.date(column, type_=Date) if dialect == "sqlite" else cast(column, Date)
+
+
+def _today(dialect: str):
+    return func.date("now", type_=Date) if dialect == "sqlite" else func.current_date()
+
+
+def _db_days(db: Session, stamps: Iterable[datetime]) -> Dict[datetime, date]:
+    """Calendar day of each timestamp as `_day` computes it (database timezone)"""
+    dialect = db.get_bind().dialect.name
+    ordered = sorted(set(stamps))
+    if not ordered:
+        return {}
+
+    def query(values: List[datetime]) -> List[date]:
+        return list(db.execute(select(*[
+            _day(literal(value, DateTime(timezone=True)), dialect) for value in values
+        ])).one())
+
+    # Thường cả lô cùng một ngày: hỏi DB ngày của mốc đầu / cuối là đủ
+    first, last = query([ordered[0], ordered[-1]])
+    if first == last:
+        return {stamp: first for stamp in ordered}
+    days = {}
+    for start in range(0, len(ordered), DAY_QUERY_CHUNK):
+        chunk = ordered[start:start + DAY_QUERY_CHUNK]
+        days.update(zip(chunk, query(chunk)))
+    return days
+
+
+def _upsert(db: Session, increments: Dict[Tuple[str, Optional[date], str], Tuple[int, int, int]]):
+    """
+    Add (count, sick, tokens) to the (source, day, key) rows, creating them if
+    needed; a `None` day is the database's current date.
+    """
+    if not increments:
+        return
+    dialect = db.get_bind().dialect.name
+    today = _today(dialect)
+    rows = [
+        {"source": source, "day": day or today, "key": key, "count": count, "sick": sick, "tokens": tokens}
+        for (source, day, key), (count, sick, tokens) in increments.items()
+    ]
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(Rollup).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Rollup.source, Rollup.day, Rollup.key],
+            set_={
+                "count": Rollup.count + stmt.excluded.count,
+                "sick": Rollup.sick + stmt.excluded.sick,
+                "tokens": Rollup.tokens + stmt.excluded.tokens,
+            }
+        )
+        db.execute(stmt)
+        return
+
+    # DB khác: UPDATE trước, chưa có dòng thì INSERT
+    for row in rows:
+        updated = db.query(Rollup).filter(
+            Rollup.source == row["source"], Rollup.day == row["day"], Rollup.key == row["key"]
+        ).update({
+            Rollup.count: Rollup.count + row["count"],
+            Rollup.sick: Rollup.sick + row["sick"],
+            Rollup.tokens: Rollup.tokens + row["tokens"],
+        }, synchronize_session=False)
+        if not updated:
+            db.execute(Rollup.__table__.insert().values(row))
+
+
+def record_detection(db: Session, log: models.DetectionLog):
+    """Count a new detection log; call before the commit that saves it"""
+    # created_at = now() của chính transaction này -> ngày hiện tại của DB
+    _upsert(db, {("detection", None, ""): (1, 1 if (log.sick_count or 0) > 0 else 0, 0)})
+
+
+def record_diagnosis(db: Session, log: models.DiagnosisLog):
+    """Count a new diagnosis log; call before the commit that saves it"""
+    disease = log.predicted_disease or ""
+    sick = 1 if disease not in (HEALTHY_DISEASE, "") else 0
+    _upsert(db, {("diagnosis", None, disease): (1, sick, 0)})
+
+
+def record_usage(db: Session, events: Iterable[Dict]):
+    """
+    Count a batch of usage events (one upsert row per day and feature). The
+    day comes from each event's `created_at` (set when it was enqueued), not
+    from the flush time, so a batch held across midnight lands where
+    `rebuild_rollups` would put it.
+    """
+    events = list(events)
+    days = _db_days(db, [event["created_at"] for event in events if event.get("created_at")])
+    totals: Dict[Tuple[str, Optional[date], str], List[int]] = defaultdict(lambda: [0, 0, 0])
+    for event in events:
+        total = totals[("usage", days.get(event.get("created_at")), event.get("feature") or "")]
+        total[0] += 1
+        total[2] += event.get("total_tokens") or 0
+    _upsert(db, {key: tuple(value) for key, value in totals.items()})
+
+
+def _aggregate_logs(db: Session, source: str, since: Optional[date]) -> Dict[Tuple[date, str], Tuple[int, int, int]]:
+    dialect = db.get_bind().dialect.name
+    if source == "diagnosis":
+        model = models.DiagnosisLog
+        key = func.coalesce(model.predicted_disease, "")
+        sick = func.sum(case((key.notin_([HEALTHY_DISEASE, ""]), 1), else_=0))
+        tokens = literal(0)
+    elif source == "detection":
+        model = models.DetectionLog
+        key = literal("")
+        sick = func.sum(case((model.sick_count > 0, 1), else_=0))
+        tokens = literal(0)
+    else:
+        model = models.UsageLog
+        key = func.coalesce(model.feature, "")
+        sick = literal(0)
+        tokens = func.sum(model.total_tokens)
+
+    day = _day(model.created_at, dialect)
+    query = select(day, key, func.count(model.id), sick, tokens).where(model.created_at.isnot(None))
+    query = query.group_by(day) if source == "detection" else query.group_by(day, key)
+    if since is not None:
+        # PostgreSQL: so sánh trực tiếp created_at (dùng được index), không qua biểu thức ngày
+        since_day = cast(literal(since), Date)
+        query = query.where(day >= since if dialect == "sqlite" else model.created_at >= since_day)
+
+    result = {}
+    for row_day, row_key, count, row_sick, row_tokens in db.execute(query):
+        result[(row_day, row_key or "")] = (count, int(row_sick or 0), int(row_tokens or 0))
+    return result
+
+
+def rebuild_rollups(db: Session, since: Optional[date] = None, dry_run: bool = False) -> Dict:
+    """
+    Recompute the rollups from the log tables (from `since`, or all history)
+    and replace the stored rows. With `dry_run` only the differences are
+    reported. The caller commits.
+    """
+    report = {}
+    for source in ROLLUP_SOURCES:
+        expected = _aggregate_logs(db, source, since)
+        query = db.query(Rollup).filter(Rollup.source == source)
+        if since is not None:
+            query = query.filter(Rollup.day >= since)
+        stored = {(row.day, row.key): (row.count, row.sick, row.tokens) for row in query}
+
+        mismatched = sorted({
+            day for day, key in set(expected) | set(stored)
+            if expected.get((day, key), (0, 0, 0)) != stored.get((day, key), (0, 0, 0))
+        })
+        report[source] = {
+            "days": len({day for day, _ in expected}),
+            "rows": len(expected),
+            "logs": sum(count for count, _, _ in expected.values()),
+            "mismatched_days": [day.isoformat() for day in mismatched],
+        }
+        if dry_run or not mismatched:
+            continue
+
+        query.delete(synchronize_session=False)
+        if expected:
+            db.execute(Rollup.__table__.insert(), [
+                {"source": source, "day": day, "key": key, "count": count, "sick": sick, "tokens": tokens}
+                for (day, key), (count, sick, tokens) in expected.items()
+            ])
+        logger.info(f"📊 Rollup {source}: rebuilt {len(mismatched)} day(s)")
+    return report
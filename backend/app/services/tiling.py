@@ -0,0 +1,93 @@
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class TilePlan:
+    tile_width: int
+    tile_height: int
+    overlap: int  # Số pixel chồng lấn giữa hai tile liền kề
+    origins: List[Tuple[int, int]]  # Góc trên-trái (x, y) của từng tile
+    grid: Tuple[int, int]  # (cột, hàng)
+    model_size: int
+
+    @property
+    def scale(self) -> float:
+        """Fraction of the original resolution the model sees inside a tile"""
+        return min(1.0, self.model_size / max(self.tile_width, self.tile_height))
+
+
+def _axis_origins(length: int, tile: int, overlap: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    count = math.ceil((length - overlap) / (tile - overlap))
+    return [int(round(x)) for x in np.linspace(0, length - tile, count)]
+
+
+def plan_tiles(
+    width: int,
+    height: int,
+    model_size: int,
+    overlap_ratio: float = 0.2,
+    max_tiles: int = 16,
+    min_side_ratio: float = 1.5
+) -> Optional[TilePlan]:
+    """
+    Overlapping tiles covering a `width` x `height` image.
+
+    Tiles start at the model input size, so birds are seen at native
+    resolution, and grow by 25% steps until the grid fits in `max_tiles` (one
+    batched model call). Returns None when the image is small enough
+    (long side <= `min_side_ratio` x model size) that a single pass loses nothing.
+    """
+    if max(width, height) <= model_size * min_side_ratio:
+        return None
+
+    tile = model_size
+    while True:
+        tile_width, tile_height = min(tile, width), min(tile, height)
+        overlap = int(min(tile_width, tile_height) * overlap_ratio)
+        xs = _axis_origins(width, tile_width, overlap)
+        ys = _axis_origins(height, tile_height, overlap)
+        if len(xs) * len(ys) <= max(1, max_tiles):
+            break
+        tile = int(tile * 1.25)
+
+    return TilePlan(
+        tile_width=tile_width,
+        tile_height=tile_height,
+        overlap=overlap,
+        origins=[(x, y) for y in ys for x in xs],
+        grid=(len(xs), len(ys)),
+        model_size=model_size,
+    )
+
+
+def crop_tiles(image: np.ndarray, plan: TilePlan) -> List[np.ndarray]:
+    """Views into `image` (no copy), in the order of `plan.origins`"""
+    return [image[y:y + plan.tile_height, x:x + plan.tile_width] for x, y in plan.origins]
+
+
+def seam_clipped(bboxes: np.ndarray, origin: Tuple[int, int], plan: TilePlan, width: int, height: int,
+                 margin: float = 2.0) -> np.ndarray:
+    """
+    For boxes of one tile (tile coordinates), whether they touch an edge of the
+    tile that lies inside the image: those birds are cut by the seam and the
+    neighbouring tile most likely holds a complete box.
+    """
+    x0, y0 = origin
+    clipped = np.zeros(len(bboxes), dtype=bool)
+    if not len(bboxes):
+        return clipped
+    if x0 > 0:
+        clipped |= bboxes[:, 0] <= margin
+    if y0 > 0:
+        clipped |= bboxes[:, 1] <= margin
+    if x0 + plan.tile_width < width:
+        clipped |= bboxes[:, 2] >= plan.tile_width - margin
+    if y0 + plan.tile_height < height:
+        clipped |= bboxes[:, 3] >= plan.tile_height - margin
+    return clipped
@@ -0,0 +1,277 @@
+import heapq
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.box_geometry import pairwise_box_metrics
+
+
+def greedy_match(scores: np.ndarray, threshold: float) -> List[tuple]:
+    """Pair rows/cols by descending score, each used at most once"""
+    rows, cols = np.nonzero(scores >= threshold)
+    if len(rows) == 0:
+        return []
+
+    order = np.argsort(-scores[rows, cols], kind="stable")
+    used_rows, used_cols = set(), set()
+    matches = []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matches.append((row, col))
+    return matches
+
+
+@dataclass
+class _Track:
+    track_id: int
+    box: np.ndarray
+    first_frame: int
+    last_frame: int
+    velocity: np.ndarray = field(default_factory=lambda: np.zeros(4, dtype=np.float32))
+    hits: int = 1
+    sick_hits: int = 0
+    classes: Counter = field(default_factory=Counter)
+
+    def predict(self, frame_index: int) -> np.ndarray:
+        return self.box + self.velocity * (frame_index - self.last_frame)
+
+
+@dataclass
+class _TrackTotals:
+    """
+    Running totals over closed tracks. Only the `max_tracks` longest-dwelling
+    tracks are kept as rows (min-heap on dwell), the rest are dropped.
+    """
+    max_tracks: int = 0
+    count: int = 0
+    sick: int = 0
+    classes: Counter = field(default_factory=Counter)
+    dwell_frames: int = 0
+    max_dwell_frames: int = 0
+    tracks: List[tuple] = field(default_factory=list)
+
+    def add(self, row: Dict):
+        dwell_frames = row["last_frame"] - row["first_frame"] + 1
+        self.count += 1
+        self.sick += int(row["is_sick"])
+        self.classes[row["class"]] += 1
+        self.dwell_frames += dwell_frames
+        self.max_dwell_frames = max(self.max_dwell_frames, dwell_frames)
+        self._keep((dwell_frames, -row["track_id"], row))
+
+    def merge(self, other: "_TrackTotals"):
+        self.count += other.count
+        self.sick += other.sick
+        self.classes.update(other.classes)
+        self.dwell_frames += other.dwell_frames
+        self.max_dwell_frames = max(self.max_dwell_frames, other.max_dwell_frames)
+        for item in other.tracks:
+            self._keep(item)
+
+    def _keep(self, item: tuple):
+        if self.max_tracks <= 0:
+            return
+        # Cùng dwell: giữ track xuất hiện trước (track_id nhỏ hơn)
+        if len(self.tracks) < self.max_tracks:
+            heapq.heappush(self.tracks, item)
+        elif item[:2] > self.tracks[0][:2]:
+            heapq.heapreplace(self.tracks, item)
+
+
+class IoUTracker:
+    """
+    Tracker kiểu SORT rút gọn cho video chuồng gà.
+
+    Mỗi track giữ box cuối cùng và vận tốc (px/frame) ước lượng từ hai lần thấy
+    gần nhất; ở frame mới box được dự đoán theo vận tốc rồi ghép với detection
+    bằng IoU (ma trận `pairwise_box_metrics` tính một lần bằng NumPy, ghép tham
+    lam theo IoU giảm dần).
+    Không ghép theo class: một con gà có thể lúc "healthy" lúc "sick", nhãn cuối
+    cùng của track được quyết định bằng bỏ phiếu trên toàn bộ các lần thấy.
+
+    Các frame không chạy detector nằm giữa hai frame đã infer được nội suy box
+    tuyến tính theo track (`interpolate`).
+
+    Track đã đóng được cộng dồn vào tổng (số cá thể, số con bệnh, theo class,
+    thời gian có mặt) rồi bỏ đi, nên bộ nhớ không tăng theo độ dài video; chỉ
+    `max_tracks` track ở lâu nhất được giữ chi tiết (class, dwell) cho kết quả.
+    """
+
+    def __init__(
+        self,
+        is_healthy: Callable[[str], bool],
+        iou_threshold: float = 0.3,
+        max_age: int = 48,
+        min_hits: int = 2,
+        sick_ratio: float = 0.5,
+        max_tracks: int = 200
+    ):
+        self.is_healthy = is_healthy
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age  # Số frame tối đa một track được phép mất dấu
+        self.min_hits = max(1, min_hits)
+        self.sick_ratio = sick_ratio
+        self.max_tracks = max(0, max_tracks)  # Số track liệt kê chi tiết trong summary
+
+        self._next_id = 1
+        self._active: List[_Track] = []
+        # Tổng của track đã đóng theo số lần thấy (chặn ở min_hits): video ngắn
+        # hơn min_hits lần infer vẫn đếm được track ít lần thấy hơn
+        self._closed: Dict[int, _TrackTotals] = {}
+        self.updates = 0
+
+        # Quan sát ở hai frame infer gần nhất, dùng cho nội suy
+        self._previous: Dict[int, Dict] = {}
+        self._previous_frame: Optional[int] = None
+        self._current: Dict[int, Dict] = {}
+        self._current_frame: Optional[int] = None
+
+    def update(self, frame_index: int, detections: List[Dict]) -> List[Dict]:
+        """Assign a `track_id` to each detection of a sampled frame (returns new dicts)"""
+        self.updates += 1
+
+        # Bỏ các track mất dấu quá lâu
+        alive = []
+        for track in self._active:
+            if frame_index - track.last_frame > self.max_age:
+                self._close(track, self._closed)
+            else:
+                alive.append(track)
+        self._active = alive
+
+        boxes = np.array([d["bbox"] for d in detections], dtype=np.float32).reshape(-1, 4)
+        predicted = np.array(
+            [track.predict(frame_index) for track in self._active], dtype=np.float32
+        ).reshape(-1, 4)
+        _, ious, _ = pairwise_box_metrics(predicted, boxes)
+        matches = greedy_match(ious, self.iou_threshold)
+
+        assigned: List[Optional[_Track]] = [None] * len(detections)
+        for track_index, det_index in matches:
+            track = self._active[track_index]
+            gap = max(1, frame_index - track.last_frame)
+            track.velocity = (boxes[det_index] - track.box) / gap
+            track.box = boxes[det_index]
+            track.last_frame = frame_index
+            track.hits += 1
+            assigned[det_index] = track
+
+        for det_index, track in enumerate(assigned):
+            if track is None:
+                track = _Track(
+                    track_id=self._next_id, box=boxes[det_index],
+                    first_frame=frame_index, last_frame=frame_index
+                )
+                self._next_id += 1
+                self._active.append(track)
+                assigned[det_index] = track
+
+            class_name = detections[det_index]["class_name"]
+            track.classes[class_name] += 1
+            if not self.is_healthy(class_name):
+                track.sick_hits += 1
+
+        tracked = [
+            {**detection, "track_id": track.track_id}
+            for detection, track in zip(detections, assigned)
+        ]
+
+        self._previous, self._previous_frame = self._current, self._current_frame
+        self._current = {detection["track_id"]: detection for detection in tracked}
+        self._current_frame = frame_index
+        return tracked
+
+    def interpolate(self, frame_index: int) -> List[Dict]:
+        """
+        Boxes for a frame the detector skipped. Between the two latest sampled
+        frames the box of each track is interpolated linearly; a track that was
+        lost at the later frame keeps its last box. Past the latest sampled frame
+        the last observations are held.
+        """
+        if self._current_frame is None:
+            return []
+        if self._previous_frame is None or frame_index >= self._current_frame:
+            return [{**detection, "interpolated": True} for detection in self._current.values()]
+
+        span = self._current_frame - self._previous_frame
+        t = (frame_index - self._previous_frame) / span if span > 0 else 1.0
+        interpolated = []
+        for track_id, before in self._previous.items():
+            after = self._current.get(track_id)
+            if after is None:
+                interpolated.append({**before, "interpolated": True})
+                continue
+
+            start = np.asarray(before["bbox"], dtype=np.float32)
+            end = np.asarray(after["bbox"], dtype=np.float32)
+            source = after if t >= 0.5 else before
+            interpolated.append({
+                **source,
+                "bbox": [float(x) for x in start + (end - start) * t],
+                "interpolated": True
+            })
+        return interpolated
+
+    def _row(self, track: _Track) -> Dict:
+        """Per-track summary row; the final class is voted over all its detections"""
+        sick_share = track.sick_hits / track.hits
+        is_sick = sick_share >= self.sick_ratio
+        votes = [
+            (count, name) for name, count in track.classes.items()
+            if self.is_healthy(name) != is_sick
+        ]
+        return {
+            "track_id": track.track_id,
+            "class": max(votes)[1] if votes else track.classes.most_common(1)[0][0],
+            "is_sick": is_sick,
+            "sick_ratio": round(sick_share, 2),
+            "hits": track.hits,
+            "first_frame": track.first_frame,
+            "last_frame": track.last_frame
+        }
+
+    def _close(self, track: _Track, closed: Dict[int, _TrackTotals]):
+        level = min(track.hits, self.min_hits)
+        if level not in closed:
+            closed[level] = _TrackTotals(max_tracks=self.max_tracks)
+        closed[level].add(self._row(track))
+
+    def summary(self, fps: float) -> Dict:
+        """
+        Unique individuals, per-class counts and dwell time, counting confirmed
+        tracks only. `tracks` lists at most `max_tracks` of them (longest dwell
+        first kept, sorted by track id); `tracks_omitted` is the remainder.
+        """
+        closed = {}
+        for level, level_totals in self._closed.items():
+            closed[level] = _TrackTotals(max_tracks=self.max_tracks)
+            closed[level].merge(level_totals)
+        for track in self._active:
+            self._close(track, closed)
+
+        min_hits = min(self.min_hits, max(1, self.updates))
+        totals = _TrackTotals(max_tracks=self.max_tracks)
+        for level, level_totals in closed.items():
+            if level >= min_hits:
+                totals.merge(level_totals)
+
+        seconds_per_frame = 1 / max(fps, 1e-6)
+        tracks = [
+            {**row, "dwell_seconds": round(dwell_frames * seconds_per_frame, 2)}
+            for dwell_frames, _, row in sorted(totals.tracks, key=lambda item: -item[1])
+        ]
+        return {
+            "unique_chickens": totals.count,
+            "unique_sick_chickens": totals.sick,
+            "unique_healthy_chickens": totals.count - totals.sick,
+            "classes": dict(totals.classes.most_common()),
+            "avg_dwell_seconds": round(totals.dwell_frames / max(1, totals.count) * seconds_per_frame, 2),
+            "max_dwell_seconds": round(totals.max_dwell_frames * seconds_per_frame, 2),
+            "tracks": tracks,
+            "tracks_omitted": totals.count - len(tracks)
+        }
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+from starlette.responses import JSONResponse
+
+from app.config import get_settings
+
+settings = get_settings()
+
+UPLOAD_CHUNK = 1024 * 1024
+# Cùng volume với upload_dir để rename sang đường dẫn cuối là atomic
+INCOMING_DIR = ".incoming"
+# Boundary + header của từng part multipart, ngoài nội dung file
+MULTIPART_OVERHEAD = 64 * 1024
+
+_EXT_PATTERN = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+
+class UploadRejectedError(ValueError):
+    """Upload refused while or right after it is received; the API maps it to `status_code`"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _too_large(what: str, max_bytes: int) -> UploadRejectedError:
+    return UploadRejectedError(413, f"{what} quá lớn (tối đa {max_bytes // (1024 * 1024)} MB)")
+
+
+def safe_extension(filename: Optional[str], default: str) -> str:
+    """Lower-cased extension of the client file name, `default` when missing or unusual"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXT_PATTERN.match(ext) else default
+
+
+class IncomingUpload:
+    """
+    An upload streamed to a temp file under `upload_dir/.incoming`, hashed on
+    the way. `commit` moves it to its content-addressed path; anything not
+    committed is deleted when `receive_upload` exits.
+    """
+
+    def __init__(self, filename: Optional[str], path: str):
+        self.filename = filename
+        self.path = path  # File tạm, sau commit là file cuối
+        self.size = 0
+        self.sha256: Optional[str] = None
+        self.rel_path: Optional[str] = None
+
+    async def commit(self, subdir: str, default_ext: str) -> str:
+        """Move the file to `subdir/<sha[:2]>/<sha><ext>` and return that path relative to `upload_dir`"""
+        if self.rel_path is not None:
+            return self.rel_path
+        ext = safe_extension(self.filename, default_ext)
+        rel_path = os.path.join(subdir, self.sha256[:2], f"{self.sha256}{ext}")
+        abs_path = os.path.join(settings.upload_dir, rel_path)
+
+        await aiofiles.os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        if await aiofiles.os.path.exists(abs_path):
+            # Cùng nội dung đã được lưu (gửi lại, user khác gửi cùng file) -> giữ file cũ
+            await aiofiles.os.remove(self.path)
+        else:
+            await aiofiles.os.replace(self.path, abs_path)
+        self.path, self.rel_path = abs_path, rel_path
+        return rel_path
+
+    async def discard(self):
+        if self.rel_path is not None:
+            return
+        try:
+            await aiofiles.os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+@asynccontextmanager
+async def receive_upload(file, max_bytes: int, what: str = "File") -> AsyncIterator[IncomingUpload]:
+    """
+    Stream an `UploadFile` to disk chunk by chunk with non-blocking writes,
+    computing its sha256 and refusing it (413) as soon as it exceeds
+    `max_bytes`. Memory stays at one chunk whatever the file size. The raw
+    request body is capped earlier, while it arrives, by `UploadLimitMiddleware`.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(what, max_bytes)
+
+    incoming_dir = os.path.join(settings.upload_dir, INCOMING_DIR)
+    await aiofiles.os.makedirs(incoming_dir, exist_ok=True)
+    upload = IncomingUpload(file.filename, os.path.join(incoming_dir, f"{uuid.uuid4().hex}.part"))
+    try:
+        hasher = hashlib.sha256()
+        async with aiofiles.open(upload.path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK):
+                upload.size += len(chunk)
+                if upload.size > max_bytes:
+                    raise _too_large(what, max_bytes)
+                # hashlib nhả GIL với chunk lớn: hash trong thread, không chặn event loop
+                await asyncio.to_thread(hasher.update, chunk)
+                await f.write(chunk)
+        if upload.size == 0:
+            raise UploadRejectedError(400, "File rỗng")
+        upload.sha256 = hasher.hexdigest()
+        yield upload
+    finally:
+        await upload.discard()
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware capping the raw body of the upload endpoints before
+    Starlette parses (and spools) the multipart form. `limits` maps a POST path
+    to (max file bytes, what). A `Content-Length` over the cap is answered 413
+    without reading the body; a body that grows past it while arriving
+    (chunked, or a lying header) is cut off with 413 at that point.
+    """
+
+    def __init__(self, app, limits: Dict[str, Tuple[int, str]]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes, what = limit
+        max_body = max_bytes + MULTIPART_OVERHEAD
+        error = _too_large(what, max_bytes)
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > max_body:
+            await self._reject(scope, receive, send, error)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    exceeded = True
+                    raise error
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            # Vượt giới hạn giữa chừng: bỏ response lỗi parse (400) của app, trả 413 bên dưới
+            if exceeded and not started:
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadRejectedError:
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self._reject(scope, receive, send, error)
+
+    @staticmethod
+    async def _reject(scope, receive, send, error: UploadRejectedError):
+        response = JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+        await response(scope, receive, send)
@@ -1,13 +1,55 @@
+import asyncio
 import logging
-from sqlalchemy.orm import Session
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.config import get_settings
 from app.core import models
 from app.core.database import SessionLocal
+from app.services.stats_rollup import record_usage
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
 
 class UsageService:
-    @staticmethod
+    """
+    Usage metering off the request path.
+
+    `log_usage` only appends the event to an in-memory buffer (thread-safe:
+    endpoints, `asyncio.to_thread` workers and the camera scheduler all call
+    it). A background task flushes the buffer every `usage_flush_interval_seconds`
+    or as soon as `usage_flush_batch_size` events are waiting, as multi-row
+    INSERTs in one transaction, instead of one session + commit per request.
+    The buffer holds at most `usage_buffer_max_events`: beyond it new events
+    are dropped and counted, a failed flush puts its batch back while there is
+    room. `stop` flushes what is left. Before `start` (scripts, benchmarks)
+    each event is written right away, as before.
+    """
+
+    def __init__(self):
+        self.batch_size = max(1, settings.usage_flush_batch_size)
+        self.flush_interval = max(0.05, settings.usage_flush_interval_seconds)
+        self.max_events = max(self.batch_size, settings.usage_buffer_max_events)
+        self._buffer: Deque[Dict] = deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._counters = {
+            "enqueued": 0, "written": 0, "dropped": 0, "requeued": 0,
+            "flushes": 0, "failed_flushes": 0, "direct_writes": 0,
+        }
+        self._last_flush_ms = 0.0
+
     def log_usage(
+        self,
         feature: str,
         provider: str,
         model: str,
@@ -16,27 +58,133 @@ class UsageService:
         tokens_completion: int = 0,
         cost_est: float = 0.0
     ):
-        """Ghi nhật ký sử dụng AI"""
+        """Ghi nhật ký sử dụng AI (đưa vào buffer, ghi DB theo lô ở nền)"""
+        event = {
+            "user_id": user_id,
+            "feature": feature,
+            "provider": provider,
+            "model": model,
+            "tokens_prompt": tokens_prompt,
+            "tokens_completion": tokens_completion,
+            "total_tokens": tokens_prompt + tokens_completion,
+            "cost_est": cost_est,
+            # Giữ thời điểm phát sinh, không phải lúc flush
+            "created_at": datetime.now(timezone.utc),
+        }
+        if self._task is None:
+            self._write_direct(event)
+            return
+
+        with self._lock:
+            if len(self._buffer) >= self.max_events:
+                self._counters["dropped"] += 1
+                return
+            self._buffer.append(event)
+            self._counters["enqueued"] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            # Có thể được gọi từ thread khác event loop
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info(
+            f"✅ Usage writer started (batch={self.batch_size}, every {self.flush_interval}s, "
+            f"buffer={self.max_events})"
+        )
+
+    async def stop(self):
+        """Stop the flush loop and write every buffered event"""
+        if self._task is None:
+            return
+        # Huỷ khi không có lô nào đang ghi dở, để không mất đếm của lô đó
+        async with self._flush_lock:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        while self._buffer:
+            if not await self.flush():
+                break
+        if self._buffer:
+            logger.error(f"❌ {len(self._buffer)} usage events lost on shutdown")
+        logger.info(f"📊 Usage writer stopped: {self._counters['written']} events written")
+
+    async def flush(self) -> bool:
+        """Write up to one batch; False if the database write failed"""
+        async with self._flush_lock:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return True
+
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._insert, batch)
+            except Exception as e:
+                self._counters["failed_flushes"] += 1
+                with self._lock:
+                    # Trả lô về đầu buffer nếu còn chỗ (giữ thứ tự), phần dư bị bỏ
+                    room = max(0, self.max_events - len(self._buffer))
+                    kept = batch[:room]
+                    self._buffer.extendleft(reversed(kept))
+                    self._counters["requeued"] += len(kept)
+                    self._counters["dropped"] += len(batch) - len(kept)
+                logger.error(f"❌ Failed to flush {len(batch)} usage events: {e}")
+                return False
+
+            self._counters["flushes"] += 1
+            self._counters["written"] += len(batch)
+            self._last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+            logger.debug(f"📊 Usage flush: {len(batch)} events in {self._last_flush_ms} ms")
+            return True
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Xả hết buffer theo từng lô; lỗi DB thì đợi chu kỳ sau mới thử lại
+            while self._buffer:
+                if not await self.flush():
+                    break
+
+    @staticmethod
+    def _insert(batch: List[Dict]):
         db = SessionLocal()
         try:
-            total_tokens = tokens_prompt + tokens_completion
-            log = models.UsageLog(
-                user_id=user_id,
-                feature=feature,
-                provider=provider,
-                model=model,
-                tokens_prompt=tokens_prompt,
-                tokens_completion=tokens_completion,
-                total_tokens=total_tokens,
-                cost_est=cost_est
-            )
-            db.add(log)
+            # Một câu INSERT ... VALUES (...), (...) cho cả lô, một transaction
+            db.execute(insert(models.UsageLog).values(batch))
+            record_usage(db, batch)
             db.commit()
-            logger.info(f"📊 Usage Log: {feature} | {provider} | {total_tokens} tokens")
-        except Exception as e:
-            logger.error(f"❌ Failed to log usage: {e}")
         finally:
             db.close()
 
+    def _write_direct(self, event: Dict):
+        try:
+            self._insert([event])
+            self._counters["direct_writes"] += 1
+            logger.info(f"📊 Usage Log: {event['feature']} | {event['provider']} | {event['total_tokens']} tokens")
+        except Exception as e:
+            logger.error(f"❌ Failed to log usage: {e}")
+
+    def metrics(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "buffered": len(self._buffer),
+            "max_events": self.max_events,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "last_flush_ms": self._last_flush_ms,
+            **self._counters,
+        }
+
+
 # Singleton
 usage_service = UsageService()
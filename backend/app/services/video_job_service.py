@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+
+from app.config import get_settings
+from app.core import models
+from app.core.database import SessionLocal
+from app.services.inference_executor import InferenceOverloadedError
+from app.services.usage_service import usage_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TERMINAL_STATUSES = {"SUCCESS", "ERROR"}
+
+
+class _ProgressReporter:
+    """
+    Progress callback cho `process_video`. Được gọi từ thread inference nên ghi
+    thẳng xuống DB tại đây (không chạm vào event loop), tối đa mỗi `interval` giây
+    một lần. Mỗi lần ghi cũng đóng vai trò heartbeat của job.
+    """
+
+    def __init__(self, job_id: str, interval: float):
+        self.job_id = job_id
+        self.interval = interval
+        self._last_flush = 0.0
+
+    def __call__(self, progress: Dict):
+        now = time.monotonic()
+        if now - self._last_flush < self.interval:
+            return
+        self._last_flush = now
+
+        db = SessionLocal()
+        try:
+            db.query(models.VideoJob).filter(models.VideoJob.id == self.job_id).update({
+                models.VideoJob.frames_processed: progress["frames_processed"],
+                models.VideoJob.total_frames: progress["total_frames"],
+                models.VideoJob.current_sick_count: progress["current_sick"],
+                models.VideoJob.updated_at: func.now(),
+            }, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            logger.error(f"❌ Failed to persist progress of video job {self.job_id}: {e}")
+        finally:
+            db.close()
+
+
+class VideoJobService:
+    """
+    Hàng đợi phân tích video chạy nền.
+
+    Bảng `video_jobs` chính là hàng đợi: job mới được ghi ở trạng thái PENDING, các
+    worker (giới hạn bởi `video_job_concurrency` trên mỗi process) claim job bằng
+    `SELECT ... FOR UPDATE SKIP LOCKED` nên nhiều worker uvicorn không xử lý trùng.
+    Job đang RUNNING mà mất heartbeat quá `video_job_stale_seconds` (backend bị
+    restart / crash) được đưa về PENDING để chạy lại.
+    """
+
+    def __init__(self):
+        self.concurrency = max(1, settings.video_job_concurrency)
+        self.poll_interval = settings.video_job_poll_interval
+        self.progress_interval = settings.video_job_progress_interval
+        self.stale_after = timedelta(seconds=settings.video_job_stale_seconds)
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        if self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self._requeue_stale_jobs)
+        self._workers = [
+            asyncio.create_task(self._worker_loop(index)) for index in range(self.concurrency)
+        ]
+        logger.info(f"✅ Video job workers started (concurrency={self.concurrency})")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def create_job(self, db, user_id: int, job_id: str, input_path: str, output_path: str,
+                   analysis_only: bool = False) -> models.VideoJob:
+        job = models.VideoJob(
+            id=job_id,
+            user_id=user_id,
+            status="PENDING",
+            input_path=input_path,
+            output_path=output_path,
+            analysis_only=analysis_only,
+            total_frames=0,
+            frames_processed=0,
+            current_sick_count=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    # --- Worker internals ---
+
+    def _requeue_stale_jobs(self):
+        db = SessionLocal()
+        try:
+            threshold = datetime.now(timezone.utc) - self.stale_after
+            count = db.query(models.VideoJob).filter(
+                models.VideoJob.status == "RUNNING",
+                models.VideoJob.updated_at < threshold
+            ).update({models.VideoJob.status: "PENDING"}, synchronize_session=False)
+            db.commit()
+            if count:
+                logger.warning(f"♻️ Requeued {count} interrupted video job(s)")
+        except Exception as e:
+            logger.error(f"❌ Failed to requeue stale video jobs: {e}")
+        finally:
+            db.close()
+
+    def _claim_next_job(self) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            job = db.query(models.VideoJob).filter(
+                models.VideoJob.status == "PENDING"
+            ).order_by(models.VideoJob.created_at).with_for_update(skip_locked=True).first()
+            if job is None:
+                db.rollback()
+                return None
+
+            job.status = "RUNNING"
+            job.started_at = func.now()
+            job.updated_at = func.now()
+            job.error = None
+            db.commit()
+            return {
+                "id": job.id,
+                "user_id": job.user_id,
+                "input_path": job.input_path,
+                "output_path": job.output_path,
+                "analysis_only": bool(job.analysis_only),
+            }
+        finally:
+            db.close()
+
+    def _set_status(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        db = SessionLocal()
+        try:
+            values = {
+                models.VideoJob.status: status,
+                models.VideoJob.updated_at: func.now(),
+            }
+            if status in TERMINAL_STATUSES:
+                values[models.VideoJob.finished_at] = func.now()
+            if result is not None:
+                values[models.VideoJob.result] = result
+                values[models.VideoJob.total_frames] = result["total_frames"]
+                values[models.VideoJob.frames_processed] = result["total_frames"]
+            if error is not None:
+                values[models.VideoJob.error] = error
+            db.query(models.VideoJob).filter(models.VideoJob.id == job_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _worker_loop(self, index: int):
+        last_recovery = time.monotonic()
+        while True:
+            try:
+                if time.monotonic() - last_recovery > self.stale_after.total_seconds():
+                    await asyncio.to_thread(self._requeue_stale_jobs)
+                    last_recovery = time.monotonic()
+
+                job = await asyncio.to_thread(self._claim_next_job)
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Video job worker {index} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run_job(self, job: Dict):
+        from app.services.yolo_service import get_yolo_service
+
+        job_id = job["id"]
+        logger.info(f"🎬 Processing video job {job_id}")
+        try:
+            stats = await get_yolo_service().process_video(
+                input_path=os.path.join(settings.upload_dir, job["input_path"]),
+                output_path=os.path.join(settings.upload_dir, job["output_path"]),
+                skip_frames=3,
+                progress_callback=_ProgressReporter(job_id, self.progress_interval),
+                analysis_only=job["analysis_only"]
+            )
+        except InferenceOverloadedError:
+            # Executor đang đầy -> trả job về hàng đợi, thử lại ở vòng poll sau
+            await asyncio.to_thread(self._set_status, job_id, "PENDING")
+            await asyncio.sleep(self.poll_interval)
+            return
+        except Exception as e:
+            logger.error(f"❌ Video job {job_id} failed: {e}")
+            await asyncio.to_thread(self._set_status, job_id, "ERROR", None, str(e))
+            return
+
+        usage_service.log_usage(
+            feature="video_detection",
+            provider="yolo",
+            model="yolov8n",
+            user_id=job["user_id"]
+        )
+        await asyncio.to_thread(self._set_status, job_id, "SUCCESS", stats)
+        logger.info(f"✅ Video job {job_id} done")
+
+
+_video_job_service: Optional[VideoJobService] = None
+
+
+def get_video_job_service() -> VideoJobService:
+    global _video_job_service
+    if _video_job_service is None:
+        _video_job_service = VideoJobService()
+    return _video_job_service
@@ -0,0 +1,365 @@
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from app.services.frame_sampler import FixedIntervalSampler, FrameSampler
+from app.services.tracker import IoUTracker
+from app.services.video_preview import PreviewWriter, open_mp4_writer, preview_path, preview_stride
+from app.services.video_sidecar import DetectionSidecar, sidecar_path
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+@dataclass
+class _Frame:
+    index: int
+    image: Optional[np.ndarray]  # Frame đã resize về target_w (None: chỉ grab, chế độ analysis_only)
+    sampled: bool
+    detections: Optional[List[Dict]] = None
+
+
+class _PipelineAborted(Exception):
+    """Another stage failed; unwind this one quietly"""
+
+
+class VideoPipeline:
+    """
+    Pipeline nhiều luồng cho `process_video`: decode -> infer -> encode.
+
+    - Thread decode: `cap.read()` + `cv2.resize`, `sampler` chọn frame cần infer.
+    - Stage infer (thread gọi `run`): gom các frame được lấy mẫu thành batch và
+      gọi model một lần cho cả batch, đồng thời tính thống kê theo đúng thứ tự frame.
+    - Thread encode: vẽ box, `out.write` và chuyển frame preview (rải đều cả clip)
+      cho `PreviewWriter`, thread riêng của nó encode GIF / MP4 ngay khi nhận.
+
+    Khi có `tracker`, detection được gán track id và frame skipped được vẽ box
+    nội suy thay vì lặp lại frame đã vẽ trước đó.
+
+    `analysis_only=True`: không có video output. Frame mà sampler chắc chắn bỏ
+    qua chỉ được `cap.grab()` (không retrieve / đổi màu / resize / vẽ / encode),
+    detections của frame được infer ghi ra sidecar NDJSON (`DetectionSidecar`)
+    để app tự vẽ lên clip gốc; preview lấy từ các frame được infer.
+
+    Các stage nối với nhau bằng queue có giới hạn nên RAM không tăng theo độ dài
+    video. Với `threaded=False` các stage chạy tuần tự trên cùng một thread (dùng
+    làm baseline khi benchmark); kết quả thống kê của hai chế độ là như nhau.
+    """
+
+    def __init__(
+        self,
+        detect_batch: Callable[[List[np.ndarray]], List[List[Dict]]],
+        annotate: Callable[[np.ndarray, List[Dict]], np.ndarray],
+        is_healthy: Callable[[str], bool],
+        skip_frames: int = 3,
+        sampler: Optional[FrameSampler] = None,
+        tracker: Optional[IoUTracker] = None,
+        batch_size: int = 4,
+        queue_size: int = 16,
+        threaded: bool = True,
+        target_width: int = 640,
+        preview_format: str = "gif",
+        preview_max_frames: int = 60,
+        preview_width: int = 320,
+        preview_fps: float = 8,
+        analysis_only: bool = False,
+        progress_callback: Optional[Callable[[Dict], None]] = None
+    ):
+        self.detect_batch = detect_batch
+        self.annotate = annotate
+        self.is_healthy = is_healthy
+        self.skip_frames = skip_frames
+        # Mặc định lấy mẫu cố định 1/(skip_frames + 1) như trước
+        self.sampler = sampler or FixedIntervalSampler(skip_frames)
+        self.tracker = tracker
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.threaded = threaded
+        self.target_width = target_width
+        self.preview_format = preview_format
+        self.preview_max_frames = preview_max_frames
+        self.preview_width = preview_width
+        self.preview_fps = preview_fps
+        self.analysis_only = analysis_only
+        self.progress_callback = progress_callback
+
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+        self.total_frames = 0  # CAP_PROP_FRAME_COUNT (ước lượng từ container)
+        self.frame_count = 0
+        self.processed_frames = 0
+        self.max_sick = 0
+        self.max_total = 0
+        self.total_sick_accum = 0
+        self.video_codec: Optional[str] = None
+        self._preview: Optional[PreviewWriter] = None
+        self._preview_stride = 1
+        self._next_preview_index = 0
+
+    def run(self, input_path: str, output_path: str) -> Dict:
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            raise RuntimeError("Could not open video file")
+
+        # Get original properties
+        orig_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        orig_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # Target Resize (Standard YOLO size) -> Speed up 3x-4x
+        scale = self.target_width / orig_width
+        target_size = (self.target_width, int(orig_height * scale))
+
+        out, sidecar = None, None
+        if self.analysis_only:
+            sidecar = DetectionSidecar(
+                sidecar_path(output_path), target_size, (orig_width, orig_height),
+                fps, self.total_frames, self.is_healthy
+            )
+            sink = lambda frames: self._emit(frames, sidecar)  # noqa: E731
+        else:
+            # H.264, bản OpenCV không có encoder thì MPEG-4; không mở được codec nào -> lỗi luôn
+            try:
+                out, self.video_codec = open_mp4_writer(output_path, fps, target_size)
+            except RuntimeError:
+                cap.release()
+                raise
+            sink = lambda frames: self._encode(frames, out)  # noqa: E731
+
+        # Preview cho app mobile: frame rải đều cả clip, encode dần trên thread riêng
+        self._preview_stride = preview_stride(self.total_frames, fps, self.preview_max_frames, self.preview_fps)
+        self._preview = PreviewWriter(
+            preview_path(output_path, self.preview_format),
+            preview_format=self.preview_format,
+            width=self.preview_width,
+            fps=self.preview_fps,
+            max_frames=self.preview_max_frames
+        ) if self.preview_max_frames > 0 else None
+
+        detections = None
+        try:
+            if self.threaded:
+                self._run_threaded(cap, sink, target_size)
+            else:
+                sink(self._infer(self._decode(cap, target_size)))
+            if sidecar is not None:
+                detections = sidecar.close()
+        finally:
+            cap.release()
+            if out is not None:
+                out.release()
+            if sidecar is not None and detections is None:
+                sidecar.discard()
+            preview = self._preview.close() if self._preview is not None else None
+
+        return {
+            "total_frames": self.frame_count,
+            "processed_frames": self.processed_frames,
+            "max_total_chickens": self.max_total,
+            "max_sick_chickens": self.max_sick,
+            "total_sick_accum": self.total_sick_accum,
+            "sampling": self.sampler.stats(),
+            "tracking": self.tracker.summary(fps) if self.tracker is not None else None,
+            "preview": preview,
+            "analysis_only": self.analysis_only,
+            "video_codec": self.video_codec,
+            "detections": detections
+        }
+
+    # --- Threading helpers ---
+
+    def _run_threaded(self, cap, sink: Callable[[Iterable[_Frame]], None], target_size):
+        decoded: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        inferred: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        decoder = threading.Thread(
+            target=self._pump, args=(lambda: self._decode(cap, target_size), decoded),
+            name="video-decode", daemon=True
+        )
+        encoder = threading.Thread(
+            target=self._guard, args=(lambda: sink(self._drain(inferred)),),
+            name="video-encode", daemon=True
+        )
+        decoder.start()
+        encoder.start()
+
+        # Stage infer chạy trên thread hiện tại (thread của inference executor)
+        self._pump(lambda: self._infer(self._drain(decoded)), inferred)
+
+        decoder.join()
+        encoder.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def _guard(self, stage: Callable[[], None]):
+        try:
+            stage()
+        except _PipelineAborted:
+            pass
+        except BaseException as e:
+            logger.error(f"Video pipeline stage failed: {e}")
+            self._errors.append(e)
+            self._stop.set()
+
+    def _pump(self, make_items: Callable[[], Iterable], target: queue.Queue):
+        def produce():
+            for item in make_items():
+                self._put(target, item)
+
+        self._guard(produce)
+        try:
+            self._put(target, _END)
+        except _PipelineAborted:
+            pass
+
+    def _put(self, target: queue.Queue, item):
+        while True:
+            if self._stop.is_set():
+                raise _PipelineAborted()
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _drain(self, source: queue.Queue) -> Iterator:
+        while True:
+            if self._stop.is_set():
+                raise _PipelineAborted()
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return
+            yield item
+
+    # --- Stages ---
+
+    def _decode(self, cap, target_size) -> Iterator[_Frame]:
+        index = 0
+        while cap.isOpened():
+            if self.analysis_only and not self.sampler.needs_frame(index):
+                # Không encode video: frame chắc chắn không infer chỉ cần grab, bỏ retrieve + resize
+                if not cap.grab():
+                    break
+                self.sampler.should_infer(index, None)
+                yield _Frame(index=index, image=None, sampled=False)
+                index += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            # Resize frame immediately
+            frame_resized = cv2.resize(frame, target_size)
+            # Sampler chạy trên thread decode: frame tĩnh dùng lại detections cũ
+            sampled = self.sampler.should_infer(index, frame_resized)
+            yield _Frame(index=index, image=frame_resized, sampled=sampled)
+            index += 1
+
+    def _infer(self, frames: Iterable[_Frame]) -> Iterator[_Frame]:
+        pending: List[_Frame] = []
+        sampled: List[_Frame] = []
+
+        for frame in frames:
+            pending.append(frame)
+            if frame.sampled:
+                sampled.append(frame)
+            if len(sampled) >= self.batch_size:
+                # Frame bị bỏ qua sau frame lấy mẫu cuối được giữ lại chờ batch sau (để nội suy)
+                pending = yield from self._flush(pending, sampled)
+                sampled = []
+
+        yield from self._flush(pending, sampled, final=True)
+
+    def _flush(self, pending: List[_Frame], sampled: List[_Frame], final: bool = False):
+        if sampled:
+            batch_detections = self.detect_batch([frame.image for frame in sampled])
+            for frame, detections in zip(sampled, batch_detections):
+                frame.detections = detections
+
+        if self.tracker is None:
+            for frame in pending:
+                yield self._account(frame)
+            return []
+
+        # Frame skipped chờ tới frame lấy mẫu kế tiếp để nội suy box giữa hai lần thấy
+        skipped: List[_Frame] = []
+        for frame in pending:
+            if not frame.sampled:
+                skipped.append(frame)
+                continue
+            frame.detections = self.tracker.update(frame.index, frame.detections)
+            for gap_frame in skipped:
+                gap_frame.detections = self.tracker.interpolate(gap_frame.index)
+                yield self._account(gap_frame)
+            skipped = []
+            yield self._account(frame)
+
+        if final:
+            for gap_frame in skipped:
+                gap_frame.detections = self.tracker.interpolate(gap_frame.index)
+                yield self._account(gap_frame)
+            skipped = []
+        return skipped
+
+    def _account(self, frame: _Frame) -> _Frame:
+        # Thống kê được tính theo đúng thứ tự frame như bản xử lý tuần tự
+        self.frame_count += 1
+        if frame.sampled:
+            current_total = len(frame.detections)
+            current_sick = sum(
+                1 for detection in frame.detections if not self.is_healthy(detection["class_name"])
+            )
+            self.processed_frames += 1
+            self.max_sick = max(self.max_sick, current_sick)
+            self.max_total = max(self.max_total, current_total)
+            self.total_sick_accum += current_sick
+
+            if self.progress_callback is not None:
+                self.progress_callback({
+                    "frames_processed": frame.index + 1,
+                    "total_frames": self.total_frames,
+                    "current_sick": current_sick
+                })
+        return frame
+
+    def _encode(self, frames: Iterable[_Frame], out):
+        last_annotated_frame = None
+
+        for frame in frames:
+            if frame.detections is not None:
+                # Frame lấy mẫu, hoặc frame skipped đã có box nội suy từ tracker
+                annotated_frame = self.annotate(frame.image, frame.detections)
+                last_annotated_frame = annotated_frame
+            else:
+                # Use last known frame for skipped ones to keep video smooth
+                annotated_frame = last_annotated_frame if last_annotated_frame is not None else frame.image
+
+            out.write(annotated_frame)
+
+            # Mỗi `_preview_stride` frame lấy một frame (đã vẽ box) cho preview
+            if self._preview is not None and frame.index >= self._next_preview_index:
+                self._preview.add(annotated_frame)
+                self._next_preview_index = frame.index + self._preview_stride
+
+    def _emit(self, frames: Iterable[_Frame], sidecar: DetectionSidecar):
+        for frame in frames:
+            # Frame skipped (box nội suy) không ghi: client giữ box cũ / tự nội suy theo track_id
+            if not frame.sampled:
+                continue
+            sidecar.write(frame.index, frame.detections)
+
+            if self._preview is not None and frame.index >= self._next_preview_index:
+                self._preview.add(self.annotate(frame.image, frame.detections))
+                self._next_preview_index = frame.index + self._preview_stride
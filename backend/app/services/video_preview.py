@@ -0,0 +1,170 @@
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_FORMATS = ("gif", "mp4")
+# H.264 trước (phát được trên mọi trình duyệt / app); bản OpenCV không có encoder H.264 thì dùng MPEG-4
+_MP4_CODECS = ("avc1", "mp4v")
+_END = object()
+
+
+def preview_path(output_path: str, preview_format: str) -> str:
+    """Preview file next to the annotated video (`x_output.gif` / `x_output_preview.mp4`)"""
+    stem = output_path[:-4] if output_path.endswith(".mp4") else output_path
+    return f"{stem}.gif" if preview_format == "gif" else f"{stem}_preview.mp4"
+
+
+def open_mp4_writer(path: str, fps: float, size: Tuple[int, int]) -> Tuple[cv2.VideoWriter, str]:
+    """Open an MP4 `VideoWriter` with the first codec this OpenCV build can encode, return (writer, codec)"""
+    for codec in _MP4_CODECS:
+        video = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if video.isOpened():
+            return video, codec
+        video.release()
+    raise RuntimeError("No MP4 encoder available in this OpenCV build")
+
+
+def preview_stride(total_frames: int, source_fps: float, max_frames: int, preview_fps: float) -> int:
+    """
+    Source frames between two preview frames, so `max_frames` cover the whole
+    clip. When the container does not report a frame count, one frame per
+    preview tick (real-time pace) is taken instead.
+    """
+    if total_frames > 0:
+        return max(1, math.ceil(total_frames / max_frames))
+    return max(1, round(source_fps / preview_fps))
+
+
+class PreviewWriter:
+    """
+    Incremental animated preview of an analyzed video (GIF or short MP4 clip).
+
+    Frames are handed over with `add` as the pipeline produces them and encoded
+    one by one on a dedicated thread, straight to the output file: memory stays
+    at a few small frames whatever the length of the clip, and neither the
+    inference nor the video encode stage waits for the GIF palette
+    quantization. `close` returns the report (size, frames, encode time).
+    """
+
+    def __init__(self, path: str, preview_format: str = "gif", width: int = 320, fps: float = 8,
+                 max_frames: int = 60, queue_size: int = 4):
+        if preview_format not in PREVIEW_FORMATS:
+            raise ValueError(f"Unknown preview format '{preview_format}' (expected one of {PREVIEW_FORMATS})")
+        self.path = path
+        self.format = preview_format
+        self.width = width
+        self.fps = fps
+        self.max_frames = max_frames
+
+        self.frames = 0
+        self.codec: Optional[str] = "gif" if preview_format == "gif" else None
+        self._encode_seconds = 0.0
+        self._error: Optional[BaseException] = None
+        self._file = None
+        self._video: Optional[cv2.VideoWriter] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(target=self._run, name="video-preview", daemon=True)
+        self._thread.start()
+
+    @property
+    def full(self) -> bool:
+        return self.frames >= self.max_frames
+
+    def add(self, frame: np.ndarray):
+        """Queue a BGR frame (any size); ignored once `max_frames` were taken or the writer failed"""
+        if self.full or self._error is not None:
+            return
+        height, width = frame.shape[:2]
+        size = (self.width, max(2, int(height * self.width / width)) // 2 * 2)
+        # Resize ngay: queue chỉ giữ frame nhỏ, frame gốc được stage encode dùng tiếp
+        self._queue.put(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+        self.frames += 1
+
+    def close(self) -> Optional[Dict]:
+        """Flush and finish the file; returns the preview report, None when nothing was written"""
+        self._queue.put(_END)
+        self._thread.join()
+        if self._error is not None:
+            logger.error(f"❌ Video preview failed: {self._error}")
+            self._discard()
+            return None
+        if self.frames == 0 or not os.path.exists(self.path):
+            return None
+        return {
+            "format": self.format,
+            "codec": self.codec,
+            "file": os.path.basename(self.path),
+            "bytes": os.path.getsize(self.path),
+            "frames": self.frames,
+            "width": self.width,
+            "fps": self.fps,
+            "encode_ms": round(self._encode_seconds * 1000, 1),
+        }
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if self._error is None:
+                # Lỗi thì chỉ rút queue tới _END: add() không bị chặn, close() không chờ mãi
+                started = time.perf_counter()
+                try:
+                    if frame is _END:
+                        self._finish()
+                    elif self.format == "gif":
+                        self._write_gif_frame(frame)
+                    else:
+                        self._write_mp4_frame(frame)
+                except Exception as e:
+                    self._error = e
+                    self._finish(quiet=True)
+                self._encode_seconds += time.perf_counter() - started
+            if frame is _END:
+                return
+
+    def _write_gif_frame(self, frame: np.ndarray):
+        # Mỗi frame một bảng màu 256 màu riêng (local color table): đẹp hơn một palette chung
+        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).quantize(colors=256)
+        if self._file is None:
+            self._file = open(self.path, "wb")
+            header, _ = GifImagePlugin.getheader(image, info={"loop": 0})
+            for chunk in header:
+                self._file.write(chunk)
+        for chunk in GifImagePlugin.getdata(image, duration=round(1000 / self.fps), include_color_table=True):
+            self._file.write(chunk)
+
+    def _write_mp4_frame(self, frame: np.ndarray):
+        if self._video is None:
+            height, width = frame.shape[:2]
+            self._video, self.codec = open_mp4_writer(self.path, self.fps, (width, height))
+        self._video.write(frame)
+
+    def _finish(self, quiet: bool = False):
+        try:
+            if self._file is not None:
+                self._file.write(b";")  # GIF trailer
+                self._file.close()
+            if self._video is not None:
+                self._video.release()
+        except Exception:
+            if not quiet:
+                raise
+        finally:
+            self._file, self._video = None, None
+
+    def _discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,79 @@
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+SIDECAR_VERSION = 1
+# Thứ tự các cột của một box trong sidecar (khai báo ở dòng header cho client)
+BOX_FIELDS = ["x1", "y1", "x2", "y2", "confidence", "sick", "track_id"]
+
+
+def sidecar_path(output_path: str) -> str:
+    """Detections sidecar next to the (analysis-only, never written) output video: `x_output.ndjson`"""
+    stem = output_path[:-4] if output_path.endswith(".mp4") else output_path
+    return f"{stem}.ndjson"
+
+
+class DetectionSidecar:
+    """
+    Per-frame detections of an analyzed video as NDJSON, for client-side overlay.
+
+    Line 1 is a header (frame size, fps, frame count, box columns); then one
+    line per inferred frame: `{"f": frame index, "t": seconds, "b": [[x1, y1,
+    x2, y2, confidence, sick, track_id], ...]}` with coordinates normalized to
+    0..1 so the app can draw them on the original clip at any display size.
+    Frames in between keep the previous boxes (or interpolate by track id).
+    """
+
+    def __init__(self, path: str, frame_size: Tuple[int, int], source_size: Tuple[int, int],
+                 fps: float, total_frames: int, is_healthy: Callable[[str], bool]):
+        self.path = path
+        self.frame_width, self.frame_height = frame_size
+        self.fps = fps
+        self.is_healthy = is_healthy
+        self.frames = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({
+            "version": SIDECAR_VERSION,
+            "width": source_size[0],
+            "height": source_size[1],
+            "fps": fps,
+            "total_frames": total_frames,
+            "box": BOX_FIELDS,
+        })
+
+    def write(self, index: int, detections: List[Dict]):
+        boxes = []
+        for detection in detections:
+            x1, y1, x2, y2 = detection["bbox"]
+            boxes.append([
+                round(x1 / self.frame_width, 4), round(y1 / self.frame_height, 4),
+                round(x2 / self.frame_width, 4), round(y2 / self.frame_height, 4),
+                round(detection["confidence"], 3),
+                0 if self.is_healthy(detection["class_name"]) else 1,
+                detection.get("track_id"),
+            ])
+        self._write({"f": index, "t": round(index / self.fps, 3), "b": boxes})
+        self.frames += 1
+
+    def close(self) -> Optional[Dict]:
+        if self._file is None:
+            return None
+        self._file.close()
+        self._file = None
+        return {
+            "file": os.path.basename(self.path),
+            "bytes": os.path.getsize(self.path),
+            "frames": self.frames,
+        }
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
@@ -1,62 +1,426 @@
 import os
+import asyncio
+import copy
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
 from ultralytics import YOLO
 import cv2
 import numpy as np
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
-from pathlib import Path
 import torch
-import imageio
-
-# Thủ thuật (Monkeypatch) để qua mặt hàng rào cảnh báo bảo mật mới nhất của PyTorch 2.6+.
-# Bắt buộc phải viết đè hàm torch.load này để thư viện Ultralytics YOLO cho phép nạp lại tệp weights an toàn.
-original_torch_load = torch.load
-def patched_torch_load(*args, **kwargs):
-    if 'weights_only' not in kwargs:
-        kwargs['weights_only'] = False
-    return original_torch_load(*args, **kwargs)
-torch.load = patched_torch_load
 
 from app.config import get_settings
+from app.services.box_geometry import box_centers, box_diagonals, pairwise_box_metrics
+from app.services.frame_sampler import create_frame_sampler
+from app.services.inference_executor import InferenceExecutor, get_inference_executor, get_video_executor
+from app.services.model_backends import artifact_fingerprint, load_model
+from app.services.tiling import crop_tiles, plan_tiles, seam_clipped
+from app.services.tracker import IoUTracker
+from app.services.video_pipeline import VideoPipeline
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# imgsz mặc định của Ultralytics khi model không lưu kích thước lúc train (ONNX / OpenVINO)
+DEFAULT_INPUT_SIZES = {"detection": 640, "classification": 224}
+
+# Task Ultralytics của từng loại model
+MODEL_TASKS = {"detection": "detect", "classification": "classify"}
+
+
+@dataclass
+class _ActiveModel:
+    model: YOLO
+    version: Optional[str]  # artifact_fingerprint, ghi vào log và khoá result cache
+    weights_path: str
+    loaded_at: float = field(default_factory=time.time)
+    # Clone đã warm-up sẵn lúc hot-swap, mỗi thread inference lấy một bản ở lần gọi kế tiếp
+    warm_clones: List[YOLO] = field(default_factory=list)
+
+
+@dataclass
+class _PendingDetection:
+    image: np.ndarray
+    conf_threshold: float
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class DetectionBatcher:
+    """
+    Micro-batching scheduler cho model detection.
+
+    Các request `/detect` đến gần như cùng lúc (giờ cao điểm buổi sáng) được gom
+    lại thành một batch và chạy bằng MỘT lần gọi model, mỗi caller nhận lại đúng
+    kết quả của ảnh mình gửi. Batch được chốt khi đủ `max_batch_size` ảnh hoặc khi
+    ảnh đầu tiên đã chờ quá `max_wait_ms`, nên một người dùng đơn lẻ chỉ trễ thêm
+    tối đa vài mili-giây. Tối đa `max_concurrent_batches` batch chạy song song;
+    khi tất cả đều bận, request mới tiếp tục dồn vào batch kế tiếp.
+    """
+
+    def __init__(
+        self,
+        infer_batch: Callable[[List[np.ndarray], float], Awaitable[List]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 1
+    ):
+        self._infer_batch = infer_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set = set()
+
+        # Metrics
+        self._batches = 0
+        self._requests = 0
+        self._last_batch_size = 0
+        self._largest_batch_size = 0
+        self._batch_size_histogram: Dict[int, int] = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, image: np.ndarray, conf_threshold: float):
+        """Queue one image and wait for its own Ultralytics result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingDetection(image, conf_threshold, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[_PendingDetection]:
+        first = await self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._on_batch_done)
+
+    def _on_batch_done(self, task: asyncio.Task):
+        self._inflight.discard(task)
+        self._slots.release()
+
+    def _record_batch(self, batch: List[_PendingDetection]):
+        now = time.perf_counter()
+        size = len(batch)
+        self._batches += 1
+        self._requests += size
+        self._last_batch_size = size
+        self._largest_batch_size = max(self._largest_batch_size, size)
+        self._batch_size_histogram[size] = self._batch_size_histogram.get(size, 0) + 1
+        for item in batch:
+            waited = now - item.enqueued_at
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    async def _dispatch(self, batch: List[_PendingDetection]):
+        # Caller đã huỷ (client ngắt kết nối) thì không tốn công infer nữa
+        batch = [item for item in batch if not item.future.done()]
+        if not batch:
+            return
+        self._record_batch(batch)
+
+        # Mỗi lần gọi model chỉ nhận một ngưỡng conf, nên tách batch theo ngưỡng
+        groups: Dict[float, List[_PendingDetection]] = {}
+        for item in batch:
+            groups.setdefault(item.conf_threshold, []).append(item)
+
+        for conf_threshold, items in groups.items():
+            try:
+                results = await self._infer_batch([item.image for item in items], conf_threshold)
+            except Exception as e:
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            for item, result in zip(items, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+
+    def metrics(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "inflight_batches": len(self._inflight),
+            "batches": self._batches,
+            "requests": self._requests,
+            "last_batch_size": self._last_batch_size,
+            "largest_batch_size": self._largest_batch_size,
+            "avg_batch_size": round(self._requests / self._batches, 2) if self._batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_size_histogram.items())),
+            "avg_wait_ms": round(self._wait_total / self._requests * 1000, 2) if self._requests else 0.0,
+            "max_observed_wait_ms": round(self._wait_max * 1000, 2),
+        }
+
 
 class YOLOService:
     """Service for YOLO-based chicken disease detection and classification"""
     
     def __init__(self):
         """Initialize YOLO models"""
-        self.detection_model: Optional[YOLO] = None
-        self.classification_model: Optional[YOLO] = None
+        # Cả dict được thay một lần khi hot-swap: request đọc model và version luôn khớp nhau
+        self._active: Dict[str, _ActiveModel] = {}
+        self.executor: InferenceExecutor = get_inference_executor()
+        # Pipeline video chiếm thread suốt cả clip -> pool riêng, không tranh thread với request ảnh
+        self.video_executor: InferenceExecutor = get_video_executor()
+        self._thread_local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._swaps = 0
+        self._detection_batcher = DetectionBatcher(
+            self._run_detection_batch,
+            max_batch_size=settings.detection_batch_max_size,
+            max_wait_ms=settings.detection_batch_max_wait_ms,
+            max_concurrent_batches=self.executor.max_workers
+        )
         self._load_models()
     
     def _load_models(self):
-        """Load YOLO models from disk"""
+        """Load YOLO models for the configured inference backend"""
+        backend = settings.inference_backend
+        precision = settings.inference_precision
+        weights_paths = {
+            "detection": settings.detection_model_path,  # YOLOv8n
+            "classification": settings.classification_model_path,  # YOLOv8n-cls
+        }
         try:
-            # Load Detection Model (YOLOv8n)
-            detection_path = Path(settings.detection_model_path)
-            if detection_path.exists():
-                logger.info(f"Loading detection model from {detection_path}")
-                self.detection_model = YOLO(str(detection_path))
-                logger.info("✅ Detection model loaded successfully")
-            else:
-                logger.warning(f"⚠️ Detection model not found at {detection_path}")
-            
-            # Load Classification Model (YOLOv8n-cls)
-            classification_path = Path(settings.classification_model_path)
-            if classification_path.exists():
-                logger.info(f"Loading classification model from {classification_path}")
-                self.classification_model = YOLO(str(classification_path))
-                logger.info("✅ Classification model loaded successfully")
-            else:
-                logger.warning(f"⚠️ Classification model not found at {classification_path}")
-                
+            active = {}
+            for kind, weights_path in weights_paths.items():
+                model = self._prepare_model(load_model(weights_path, backend, MODEL_TASKS[kind], precision))
+                if model is None:
+                    continue
+                # Phiên bản model (hash file): ghi vào log và dùng làm một phần khoá của result cache
+                version = artifact_fingerprint(weights_path, backend, precision)
+                active[kind] = _ActiveModel(model, version, weights_path)
+                logger.info(f"✅ {kind.capitalize()} model loaded successfully ({backend}, {precision})")
+            self._active = active
+
         except Exception as e:
             logger.error(f"❌ Error loading models: {e}")
             raise
 
+    @property
+    def detection_model(self) -> Optional[YOLO]:
+        active = self._active.get("detection")
+        return active.model if active is not None else None
+
+    @property
+    def classification_model(self) -> Optional[YOLO]:
+        active = self._active.get("classification")
+        return active.model if active is not None else None
+
+    @property
+    def model_versions(self) -> Dict[str, Optional[str]]:
+        active = self._active
+        return {kind: active[kind].version if kind in active else None for kind in MODEL_TASKS}
+
+    @staticmethod
+    def _prepare_model(model: Optional[YOLO]) -> Optional[YOLO]:
+        """
+        Fuse Conv+BN once on the loaded model. Predictors fuse lazily otherwise,
+        which gives every per-thread clone (and every forked worker) its own
+        copy of the fused weights.
+        """
+        if model is not None and isinstance(model.model, torch.nn.Module):
+            # Như AutoBackend: ngoài no_grad, trọng số sau fuse thành tensor non-leaf
+            with torch.no_grad():
+                model.model.fuse(verbose=False)
+            model.model.eval()
+        return model
+
+    @staticmethod
+    def _clone_model(primary: YOLO) -> YOLO:
+        """
+        Per-thread copy of the module tree (predictor, Detect anchor cache) that
+        shares the weight tensors of `primary`: inference only reads them, so
+        N threads / forked workers hold one copy of the weights instead of N.
+        """
+        clone = copy.copy(primary)
+        clone.predictor = None
+        if isinstance(primary.model, torch.nn.Module):
+            shared = {id(t): t for t in itertools.chain(primary.model.parameters(), primary.model.buffers())}
+            clone._modules = dict(primary._modules)
+            clone.model = copy.deepcopy(primary.model, shared)
+        return clone
+
+    def _thread_model(self, kind: str) -> Tuple[YOLO, Optional[str]]:
+        """
+        Ultralytics không thread-safe: predictor giữ trạng thái của lần gọi hiện tại
+        và head Detect cache anchors theo kích thước batch. Vì vậy mỗi thread inference
+        dùng một bản model riêng (YOLOv8n chỉ ~12 MB mỗi bản), tạo lười ở lần gọi đầu
+        và tự tạo lại (hoặc lấy bản đã warm-up sẵn) khi model gốc được hot-swap.
+        Trả về (clone, version của model gốc).
+        """
+        active = self._active.get(kind)
+        if active is None:
+            raise RuntimeError(f"{kind.capitalize()} model not loaded")
+
+        views = getattr(self._thread_local, "views", None)
+        if views is None:
+            views = self._thread_local.views = {}
+
+        view = views.get(kind)
+        if view is None or view[0] is not active:
+            with self._setup_lock:
+                clone = active.warm_clones.pop() if active.warm_clones else self._clone_model(active.model)
+            view = views[kind] = (active, clone)
+        return view[1], active.version
+
+    def _predict_versioned(self, kind: str, source, **kwargs) -> Tuple[List, Optional[str]]:
+        """Results plus the version of the model that produced them (stable across a hot-swap)"""
+        model, version = self._thread_model(kind)
+        return model(source, verbose=False, **kwargs), version
+
+    def _predict(self, kind: str, source, **kwargs) -> List:
+        return self._predict_versioned(kind, source, **kwargs)[0]
+
+    def _detect_batch_sync(self, images: List[np.ndarray], conf_threshold: float) -> List[Dict]:
+        """Run the detector once over a list of images and summarize each result"""
+        results, version = self._predict_versioned("detection", images, conf=conf_threshold, iou=0.45)
+        summaries = [self._summarize_detections(result) for result in results]
+        for summary in summaries:
+            summary["model_version"] = version
+        return summaries
+
+    async def _run_detection_batch(self, images: List[np.ndarray], conf_threshold: float) -> List[Dict]:
+        return await self.executor.run(self._detect_batch_sync, images, conf_threshold)
+
+    def input_size(self, kind: str, model: Optional[YOLO] = None) -> int:
+        """Input size (`imgsz`) the model runs at, used to size the reduced decode of uploads"""
+        if model is None:
+            model = self.detection_model if kind == "detection" else self.classification_model
+        imgsz = model.overrides.get("imgsz") if model is not None else None
+        if isinstance(imgsz, (list, tuple)):
+            imgsz = max(imgsz)
+        return int(imgsz or DEFAULT_INPUT_SIZES[kind])
+
+    def warmup(self) -> Dict:
+        """
+        Dummy inference on every inference thread at startup, so the first real
+        request does not pay for the per-thread model clone, predictor setup,
+        anchor cache and first-call allocations. Returns seconds per model.
+        """
+        timings = {}
+        for kind, model in (("detection", self.detection_model), ("classification", self.classification_model)):
+            if model is None:
+                continue
+            size = self.input_size(kind)
+            dummy = np.full((size, size, 3), 114, dtype=np.uint8)
+            started = time.perf_counter()
+            self.executor.run_on_each_worker(lambda: self._predict(kind, dummy))
+            timings[kind] = round(time.perf_counter() - started, 3)
+        return timings
+
+    def hot_swap(self, kind: str, weights_path: str, expected_version: Optional[str] = None) -> Dict:
+        """
+        Replace the `kind` model without a restart: load `weights_path`, warm up
+        one clone per inference thread, then swap it in with a single assignment.
+        Requests already running finish on the clone of the old model they
+        started with; each thread picks a warm clone of the new model on its
+        next call. Blocking, run it off the event loop.
+        """
+        if kind not in MODEL_TASKS:
+            raise ValueError(f"Unknown model kind '{kind}'")
+        backend, precision = settings.inference_backend, settings.inference_precision
+
+        # Mỗi lần chỉ một swap: hai admin kích hoạt cùng lúc không nạp chồng lên nhau
+        with self._swap_lock:
+            version = artifact_fingerprint(weights_path, backend, precision)
+            if version is None:
+                raise FileNotFoundError(f"No {backend} ({precision}) artifact for {weights_path}")
+            if expected_version is not None and version != expected_version:
+                raise ValueError(f"Model file changed since registration ({version} != {expected_version})")
+
+            started = time.perf_counter()
+            model = self._prepare_model(load_model(weights_path, backend, MODEL_TASKS[kind], precision))
+            load_seconds = time.perf_counter() - started
+
+            # Warm-up ngay trên thread này, không chiếm slot của executor đang phục vụ request
+            started = time.perf_counter()
+            size = self.input_size(kind, model)
+            dummy = np.full((size, size, 3), 114, dtype=np.uint8)
+            clones, latencies = [], []
+            for _ in range(self.executor.max_workers):
+                with self._setup_lock:
+                    clone = self._clone_model(model)
+                clone(dummy, verbose=False)
+                run_started = time.perf_counter()
+                clone(dummy, verbose=False)
+                latencies.append(time.perf_counter() - run_started)
+                clones.append(clone)
+            warmup_seconds = time.perf_counter() - started
+
+            previous = self._active.get(kind)
+            self._active = {**self._active, kind: _ActiveModel(model, version, weights_path, warm_clones=clones)}
+            self._swaps += 1
+
+        logger.info(
+            f"🔁 {kind.capitalize()} model swapped: {previous.version if previous else None} -> {version} "
+            f"(load {load_seconds:.2f}s, warm-up {warmup_seconds:.2f}s)"
+        )
+        return {
+            "version": version,
+            "previous_version": previous.version if previous else None,
+            "load_seconds": round(load_seconds, 3),
+            "warmup_seconds": round(warmup_seconds, 3),
+            "latency_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+            "warm_clones": len(clones),
+        }
+
+    def get_metrics(self) -> Dict:
+        active = self._active
+        return {
+            "backend": settings.inference_backend,
+            "precision": settings.inference_precision,
+            "model_versions": self.model_versions,
+            "models": {
+                kind: {
+                    "version": model.version,
+                    "weights_file": os.path.basename(model.weights_path),
+                    "loaded_at": model.loaded_at,
+                    "pending_warm_clones": len(model.warm_clones),
+                }
+                for kind, model in active.items()
+            },
+            "model_swaps": self._swaps,
+            "inference_executor": self.executor.metrics(),
+            "video_executor": self.video_executor.metrics(),
+            "detection_batching": self._detection_batcher.metrics()
+        }
+
     @staticmethod
     def _is_healthy_class(class_name: str) -> bool:
         """
@@ -75,202 +439,335 @@ class YOLOService:
 
         return "healthy" in normalized and "unhealthy" not in normalized
 
-    @staticmethod
-    def _extract_detection_candidates(result) -> List[Dict]:
-        candidates = []
-        for idx, box in enumerate(result.boxes):
-            class_id = int(box.cls)
-            candidates.append({
-                "source_index": idx,
-                "class_id": class_id,
-                "class_name": result.names[class_id],
-                "confidence": float(box.conf),
-                "bbox": [float(x) for x in box.xyxy[0].tolist()]
-            })
+    # Một hàng cho mỗi box của `result.boxes`, giữ nguyên thứ tự gốc (source_index)
+    CANDIDATE_DTYPE = np.dtype([
+        ("source_index", np.int64),
+        ("class_id", np.int64),
+        ("confidence", np.float64),
+        ("bbox", np.float64, (4,)),
+    ])
+
+    @classmethod
+    def _extract_detection_candidates(cls, result) -> np.ndarray:
+        """Boxes of one Ultralytics result as a structured array, without per-box tensor access"""
+        boxes = result.boxes
+        count = 0 if boxes is None else len(boxes)
+        candidates = np.zeros(count, dtype=cls.CANDIDATE_DTYPE)
+        if count:
+            boxes = boxes.cpu().numpy()
+            candidates["source_index"] = np.arange(count)
+            candidates["class_id"] = boxes.cls
+            candidates["confidence"] = boxes.conf
+            candidates["bbox"] = boxes.xyxy
         return candidates
 
     @staticmethod
-    def _bbox_overlap_metrics(bbox_a: List[float], bbox_b: List[float]) -> tuple[float, float, float]:
-        ax1, ay1, ax2, ay2 = bbox_a
-        bx1, by1, bx2, by2 = bbox_b
-
-        inter_x1 = max(ax1, bx1)
-        inter_y1 = max(ay1, by1)
-        inter_x2 = min(ax2, bx2)
-        inter_y2 = min(ay2, by2)
-
-        inter_w = max(0.0, inter_x2 - inter_x1)
-        inter_h = max(0.0, inter_y2 - inter_y1)
-        inter_area = inter_w * inter_h
-
-        area_a = max(0.0, ax2 - ax1) * max(0.0, ay2 - ay1)
-        area_b = max(0.0, bx2 - bx1) * max(0.0, by2 - by1)
-        union = area_a + area_b - inter_area
-        iou = inter_area / union if union > 0 else 0.0
-        overlap_min = inter_area / min(area_a, area_b) if min(area_a, area_b) > 0 else 0.0
-
-        return inter_area, iou, overlap_min
+    def _candidate_dicts(candidates: np.ndarray, names: Dict[int, str]) -> List[Dict]:
+        return [
+            {
+                "source_index": source_index,
+                "class_id": class_id,
+                "class_name": names[class_id],
+                "confidence": confidence,
+                "bbox": bbox
+            }
+            for source_index, class_id, confidence, bbox in zip(
+                candidates["source_index"].tolist(),
+                candidates["class_id"].tolist(),
+                candidates["confidence"].tolist(),
+                candidates["bbox"].tolist()
+            )
+        ]
 
     @classmethod
-    def _is_conflicting_same_chicken(cls, first: Dict, second: Dict) -> bool:
-        if first["class_name"] == second["class_name"]:
-            return False
+    def _filtered_detections(cls, result) -> List[Dict]:
+        """Candidates of one result after `_suppress_conflicting_candidates`, as dicts"""
+        candidates = cls._extract_detection_candidates(result)
+        return cls._candidate_dicts(cls._suppress_conflicting_candidates(candidates, result.names), result.names)
 
-        _, iou, overlap_min = cls._bbox_overlap_metrics(first["bbox"], second["bbox"])
-        if iou < 0.75 and overlap_min < 0.9:
-            return False
-
-        fx1, fy1, fx2, fy2 = first["bbox"]
-        sx1, sy1, sx2, sy2 = second["bbox"]
-        first_diag = np.hypot(fx2 - fx1, fy2 - fy1)
-        second_diag = np.hypot(sx2 - sx1, sy2 - sy1)
-        min_diag = max(1.0, min(first_diag, second_diag))
-
-        first_center = ((fx1 + fx2) / 2.0, (fy1 + fy2) / 2.0)
-        second_center = ((sx1 + sx2) / 2.0, (sy1 + sy2) / 2.0)
-        center_distance = np.hypot(first_center[0] - second_center[0], first_center[1] - second_center[1])
+    @staticmethod
+    def _pairwise_box_metrics(candidates: np.ndarray, names: Dict[int, str]) -> Dict[str, np.ndarray]:
+        """
+        All (n, n) matrices the suppression needs, in one vectorized pass: IoU,
+        overlap over the smaller box, whether the two boxes carry a different
+        class name and center distance / smaller diagonal. The last one is only
+        evaluated for different-class pairs that overlap enough to matter
+        (`inf` elsewhere), `np.hypot` over the full matrix dominates otherwise.
+        """
+        boxes = candidates["bbox"]
+        _, iou, overlap_min = pairwise_box_metrics(boxes, boxes)
+
+        # So sánh theo tên class như trước (hai class_id có thể trùng tên)
+        unique_ids, inverse = np.unique(candidates["class_id"], return_inverse=True)
+        name_codes: Dict[str, int] = {}
+        codes = np.array(
+            [name_codes.setdefault(names[class_id], len(name_codes)) for class_id in unique_ids.tolist()],
+            dtype=np.int64
+        )[inverse.reshape(-1)]
+        different_class = codes[:, None] != codes[None, :]
+
+        rows, cols = np.nonzero(different_class & ((iou >= 0.75) | (overlap_min >= 0.9)))
+        center_ratio = np.full(iou.shape, np.inf)
+        if len(rows):
+            diagonals = box_diagonals(boxes)
+            centers = box_centers(boxes)
+            min_diag = np.maximum(1.0, np.minimum(diagonals[rows], diagonals[cols]))
+            center_distance = np.hypot(
+                centers[rows, 0] - centers[cols, 0],
+                centers[rows, 1] - centers[cols, 1]
+            )
+            center_ratio[rows, cols] = center_distance / min_diag
 
-        return center_distance / min_diag <= 0.2
+        return {
+            "iou": iou,
+            "overlap_min": overlap_min,
+            "different_class": different_class,
+            "center_ratio": center_ratio,
+        }
 
     @classmethod
-    def _suppress_conflicting_candidates(cls, candidates: List[Dict]) -> List[Dict]:
+    def _suppress_conflicting_candidates(cls, candidates: np.ndarray, names: Dict[int, str]) -> np.ndarray:
         """
         Remove contradictory healthy/sick boxes only when they are almost surely
         the same chicken. This is narrower than agnostic NMS, so two chickens
         hiding behind each other are less likely to collapse into one box.
         """
-        kept: List[Dict] = []
+        if len(candidates) < 2:
+            return candidates
 
-        for candidate in sorted(candidates, key=lambda item: item["confidence"], reverse=True):
-            if any(cls._is_conflicting_same_chicken(candidate, existing) for existing in kept):
-                continue
-            kept.append(candidate)
+        metrics = cls._pairwise_box_metrics(candidates, names)
+        conflicts = (
+            metrics["different_class"]
+            & ((metrics["iou"] >= 0.75) | (metrics["overlap_min"] >= 0.9))
+            & (metrics["center_ratio"] <= 0.2)
+        )
+
+        # Box không xung đột với box nào luôn được giữ; chỉ các box còn lại cần duyệt
+        # tham lam theo confidence giảm dần (sort ổn định, giống `sorted(reverse=True)`)
+        keep = ~conflicts.any(axis=1)
+        order = np.argsort(-candidates["confidence"], kind="stable")
+        for index in order[~keep[order]]:
+            keep[index] = not conflicts[index, keep].any()
+
+        return candidates[keep]
+
+    @classmethod
+    def _merge_tile_candidates(cls, candidates: np.ndarray, clipped: np.ndarray, names: Dict[int, str]) -> np.ndarray:
+        """
+        Collapse the same-class duplicates that overlapping tiles produce at
+        their seams: one box per chicken, preferring boxes not cut by a seam,
+        then the most confident one. Healthy/sick conflicts are left to
+        `_suppress_conflicting_candidates`.
+        """
+        if len(candidates) < 2:
+            return candidates
+
+        metrics = cls._pairwise_box_metrics(candidates, names)
+        duplicates = ~metrics["different_class"] & ((metrics["iou"] >= 0.5) | (metrics["overlap_min"] >= 0.8))
+        np.fill_diagonal(duplicates, False)
+
+        # Key cuối của lexsort là key chính: box không bị cắt trước, rồi confidence giảm dần
+        order = np.lexsort((-candidates["confidence"], clipped))
+        keep = np.zeros(len(candidates), dtype=bool)
+        for index in order:
+            keep[index] = not duplicates[index, keep].any()
+        return candidates[keep]
+
+    def tile_plan(self, width: int, height: int):
+        """Tiles for a `width` x `height` image, None when one pass is enough"""
+        return plan_tiles(
+            width,
+            height,
+            self.input_size("detection"),
+            overlap_ratio=settings.detection_tile_overlap,
+            max_tiles=settings.detection_tile_max_tiles
+        )
+
+    def _detect_tiled_sync(self, image: np.ndarray, conf_threshold: float) -> Dict:
+        """
+        Run all tiles of `image` as one batched model call, shift the boxes back
+        to image coordinates and merge them across the seams.
+        """
+        height, width = image.shape[:2]
+        plan = self.tile_plan(width, height)
+        if plan is None:
+            summary = self._detect_batch_sync([image], conf_threshold)[0]
+            summary["tiling"] = {"tiles": 1, "reason": "image not larger than the model input"}
+            return summary
+
+        started = time.perf_counter()
+        results, version = self._predict_versioned("detection", crop_tiles(image, plan), conf=conf_threshold, iou=0.45)
+        batch_seconds = time.perf_counter() - started
+        names = results[0].names
+
+        parts, clipped, tiles = [], [], []
+        for (x0, y0), result in zip(plan.origins, results):
+            candidates = self._extract_detection_candidates(result)
+            clipped.append(seam_clipped(candidates["bbox"], (x0, y0), plan, width, height))
+            candidates["bbox"] += (x0, y0, x0, y0)
+            parts.append(candidates)
+            tiles.append({
+                "origin": [x0, y0],
+                "boxes": len(candidates),
+                "speed_ms": {key: round(value, 2) for key, value in result.speed.items()}
+            })
 
-        return sorted(kept, key=lambda item: item["source_index"])
+        candidates = np.concatenate(parts)
+        candidates["source_index"] = np.arange(len(candidates))
+        merged = self._merge_tile_candidates(candidates, np.concatenate(clipped), names)
+        merged = self._suppress_conflicting_candidates(merged, names)
+        merged = merged[np.argsort(-merged["confidence"], kind="stable")]
+
+        summary = self._summarize_filtered(self._candidate_dicts(merged, names))
+        summary["model_version"] = version
+        summary["tiling"] = {
+            "tiles": len(plan.origins),
+            "grid": list(plan.grid),
+            "tile_size": [plan.tile_width, plan.tile_height],
+            "overlap": plan.overlap,
+            "scale": round(plan.scale, 3),
+            "batch_ms": round(batch_seconds * 1000, 2),
+            "per_tile_ms": round(batch_seconds * 1000 / len(plan.origins), 2),
+            "raw_boxes": len(candidates),
+            "merged_boxes": len(merged),
+            "per_tile": tiles,
+        }
+        return summary
     
     async def process_video(
         self,
         input_path: str,
         output_path: str,
         conf_threshold: float = 0.3,
-        skip_frames: int = 3  # Số lượng khung hình sẽ ngủ/bỏ qua (để tối ưu CPU không phải chạy AI liên tục)
+        skip_frames: int = 3,  # Số lượng khung hình sẽ ngủ/bỏ qua (để tối ưu CPU không phải chạy AI liên tục)
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+        sampling_mode: Optional[str] = None,  # "fixed" | "adaptive", mặc định theo settings
+        analysis_only: bool = False  # Không xuất video, chỉ sidecar NDJSON detections + preview
+    ) -> Dict:
+        """Analyze a video on the video executor (see `_process_video_sync`)"""
+        if self.detection_model is None:
+            raise RuntimeError("Detection model not loaded")
+
+        return await self.video_executor.run(
+            self._process_video_sync,
+            input_path,
+            output_path,
+            conf_threshold,
+            skip_frames,
+            progress_callback,
+            sampling_mode,
+            analysis_only
+        )
+
+    def _process_video_sync(
+        self,
+        input_path: str,
+        output_path: str,
+        conf_threshold: float = 0.3,
+        skip_frames: int = 3,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+        sampling_mode: Optional[str] = None,
+        analysis_only: bool = False
     ) -> Dict:
         """
         Xử lý stream Video được gửi lên:
         - Tối ưu 1: Ép độ phân giải về tiêu chuẩn 640p chiều rộng giúp quét vật thể tăng tốc 3-4 lần.
-        - Tối ưu 2: Trích xuất frame bệnh xen kẽ để rèn thành ảnh GIF báo cáo nhanh nhẹ cho App Mobile,
-          tránh user phải tải lại video MP4 nặng.
+        - Tối ưu 2: Trích xuất frame rải đều cả clip để rèn thành preview (GIF / MP4 ngắn) báo cáo
+          nhanh nhẹ cho App Mobile, tránh user phải tải lại video MP4 nặng (xem `PreviewWriter`).
+        - Tối ưu 3: Decode / infer (theo batch) / encode chạy song song trên các thread
+          riêng (xem `VideoPipeline`), CPU và codec không phải chờ nhau.
+        - Tracking (xem `IoUTracker`): đếm số cá thể gà bệnh duy nhất thay vì chỉ lấy
+          max theo từng frame, và vẽ box nội suy cho các frame không infer.
+        - Tối ưu 4: Lấy mẫu thích ứng theo chuyển động (xem `MotionAdaptiveSampler`),
+          chuồng đứng yên thì không chạy lại model; `skip_frames` chỉ còn là mốc so sánh.
+        - Tối ưu 5 (`analysis_only`): không vẽ / encode video kết quả, frame không infer chỉ
+          được grab; detections trả về dạng sidecar NDJSON để app vẽ trên clip gốc.
         """
         if self.detection_model is None:
             raise RuntimeError("Detection model not loaded")
 
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
-            raise RuntimeError("Could not open video file")
+        pipeline = VideoPipeline(
+            detect_batch=lambda frames: self._detect_frames(frames, conf_threshold),
+            annotate=self._draw_detections,
+            is_healthy=self._is_healthy_class,
+            skip_frames=skip_frames,
+            sampler=create_frame_sampler(skip_frames, sampling_mode),
+            tracker=IoUTracker(
+                is_healthy=self._is_healthy_class,
+                iou_threshold=settings.video_track_iou_threshold,
+                max_age=settings.video_track_max_age,
+                min_hits=settings.video_track_min_hits,
+                max_tracks=settings.video_track_max_listed
+            ) if settings.video_tracking_enabled else None,
+            batch_size=settings.video_infer_batch_size,
+            queue_size=settings.video_pipeline_queue_size,
+            threaded=settings.video_pipeline_threaded,
+            preview_format=settings.video_preview_format,
+            preview_max_frames=settings.video_preview_max_frames,
+            preview_width=settings.video_preview_width,
+            preview_fps=settings.video_preview_fps,
+            analysis_only=analysis_only,
+            progress_callback=progress_callback
+        )
+        stats = pipeline.run(input_path, output_path)
+        max_sick = stats["max_sick_chickens"]
+        tracking = stats["tracking"]
 
-        # Get original properties
-        orig_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        orig_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
-        
-        # Target Resize (Standard YOLO size) -> Speed up 3x-4x
-        target_w = 640
-        scale = target_w / orig_width
-        target_h = int(orig_height * scale)
-        
-        # Define codec
-        fourcc = cv2.VideoWriter_fourcc(*'avc1') 
-        out = cv2.VideoWriter(output_path, fourcc, fps, (target_w, target_h))
-        
-        frame_count = 0
-        max_sick = 0
-        max_total = 0
-        total_sick_accum = 0
-        processed_frames_count = 0
-        
-        last_annotated_frame = None 
-        gif_frames = [] 
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Resize frame immediately
-            frame_resized = cv2.resize(frame, (target_w, target_h))
-            
-            # Process frame logic
-            if frame_count % (skip_frames + 1) == 0:
-                results = self.detection_model(frame_resized, conf=conf_threshold, iou=0.45, verbose=False)
-                processed_frames_count += 1
-                frame_detections = self._suppress_conflicting_candidates(
-                    self._extract_detection_candidates(results[0])
-                )
-                
-                # Count stats
-                current_sick = 0
-                current_total = len(frame_detections)
-                
-                annotated_frame = frame_resized.copy()
-                for detection in frame_detections:
-                    class_name = detection["class_name"]
-                    
-                    is_healthy = self._is_healthy_class(class_name)
-                    if not is_healthy:
-                        current_sick += 1
-                    
-                    x1, y1, x2, y2 = map(int, detection["bbox"])
-                    color = (0, 255, 0) if is_healthy else (0, 0, 255)
-                    cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
-                    label = f"{class_name} {detection['confidence']:.2f}"
-                    cv2.putText(annotated_frame, label, (x1, y1 - 10), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                
-                max_sick = max(max_sick, current_sick)
-                max_total = max(max_total, current_total)
-                total_sick_accum += current_sick
-                
-                last_annotated_frame = annotated_frame
-                
-                # Collect frames for GIF (Sampling)
-                if len(gif_frames) < 60: # Limit GIF size
-                    rgb_frame = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
-                    # Resize smaller for GIF
-                    gif_h, gif_w = rgb_frame.shape[:2]
-                    gif_scale = 320 / gif_w
-                    gif_frame = cv2.resize(rgb_frame, (320, int(gif_h * gif_scale)))
-                    gif_frames.append(gif_frame)
-                
-            else:
-                # Use last known frame for skipped ones to keep video smooth
-                annotated_frame = last_annotated_frame if last_annotated_frame is not None else frame_resized
-
-            out.write(annotated_frame)
-            frame_count += 1
-
-        cap.release()
-        out.release()
-        
-        # Save GIF
-        gif_path = output_path.replace('.mp4', '.gif')
-        if gif_frames:
-            imageio.mimsave(gif_path, gif_frames, fps=8, loop=0)
-        
         return {
-            "total_frames": frame_count,
-            "processed_frames": processed_frames_count,
-            "max_total_chickens": max_total,
+            "total_frames": stats["total_frames"],
+            "processed_frames": stats["processed_frames"],
+            "max_total_chickens": stats["max_total_chickens"],
             "max_sick_chickens": max_sick,
-            "avg_sick_chickens": round(total_sick_accum / max(1, processed_frames_count), 1),
+            "avg_sick_chickens": round(stats["total_sick_accum"] / max(1, stats["processed_frames"]), 1),
             "has_sick_chickens": max_sick > 0,
-            "gif_path": gif_path,
+            "unique_total_chickens": tracking["unique_chickens"] if tracking else None,
+            "unique_sick_chickens": tracking["unique_sick_chickens"] if tracking else None,
+            "tracking": tracking,
+            "sampling": stats["sampling"],
+            "preview": stats["preview"],
+            "analysis_only": stats["analysis_only"],
+            "detections": stats["detections"],
             "alert": f"Phát hiện tối đa {max_sick} gà bệnh trong video." if max_sick > 0 else None
         }
 
+    def _detect_frames(self, frames: List[np.ndarray], conf_threshold: float) -> List[List[Dict]]:
+        """Batched detection for video frames, returns the filtered candidates of each frame"""
+        results = self._predict("detection", frames, conf=conf_threshold, iou=0.45)
+        return [self._filtered_detections(result) for result in results]
+
+    @classmethod
+    def _draw_detections(cls, image: np.ndarray, detections: List[Dict]) -> np.ndarray:
+        """Return a copy of `image` with healthy (green) / sick (red) boxes drawn"""
+        annotated_image = image.copy()
+        for detection in detections:
+            class_name = detection["class_name"]
+            x1, y1, x2, y2 = map(int, detection["bbox"])
+            color = (0, 255, 0) if cls._is_healthy_class(class_name) else (0, 0, 255) # BGR
+
+            # Draw Box - use thickness 2 for clearer view when many boxes exist
+            cv2.rectangle(annotated_image, (x1, y1), (x2, y2), color, 2)
+
+            # Draw Label - smaller scale 0.5 for crowded scenes
+            label = f"{class_name} {detection['confidence']:.2f}"
+            if "track_id" in detection:
+                label = f"#{detection['track_id']} {label}"
+            cv2.putText(annotated_image, label, (x1, y1 - 10), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        return annotated_image
+
+    @classmethod
+    def annotate_detections(cls, image: np.ndarray, detections: List[Dict]) -> np.ndarray:
+        """Draw the `detections` of a `detect_sick_chickens` result (or a stored `raw_result`) on a copy of `image`"""
+        return cls._draw_detections(image, [
+            {"class_name": d["class"], "confidence": d["confidence"], "bbox": d["bbox"]} for d in detections
+        ])
+
     async def detect_sick_chickens(
         self, 
         image: np.ndarray, 
-        conf_threshold: float = 0.3
+        conf_threshold: float = 0.3,
+        annotate: bool = True,
+        tiled: bool = False
     ) -> Dict:
         """
         BƯỚC 1: Dò tìm và khoanh vùng (Detection) gà khỏe/bệnh trên tấm ảnh tĩnh.
@@ -278,6 +775,9 @@ class YOLOService:
         Args:
             image: Mảng numpy BGR (frame trích xuất).
             conf_threshold: Ngưỡng chấp nhận độ tự tin (tin cậy > 30% mới tính).
+            annotate: Vẽ box lên ảnh (`annotated_image`). False khi client chỉ cần toạ độ box.
+            tiled: Cắt ảnh độ phân giải cao thành các tile chồng lấn (gà ở cuối chuồng
+                chỉ còn vài pixel khi resize cả ảnh về 640).
         
         Returns:
             Dictionary containing:
@@ -285,76 +785,72 @@ class YOLOService:
             - healthy_count: Number of healthy chickens
             - sick_count: Number of sick chickens
             - detections: List of detection objects
-            - annotated_image: Image with bounding boxes drawn
+            - annotated_image: Image with bounding boxes drawn (only when `annotate`)
             - has_sick_chickens: Boolean flag
             - alert: Alert message if sick chickens detected
+            - tiling: Grid, tile size and latency per tile (only when `tiled`)
+            - model_version: Fingerprint of the detector that produced the boxes
         """
         if self.detection_model is None:
             raise RuntimeError("Detection model not loaded")
         
         try:
-            results = self.detection_model(image, conf=conf_threshold, iou=0.45, verbose=False)
-            filtered_detections = self._suppress_conflicting_candidates(
-                self._extract_detection_candidates(results[0])
-            )
-            
-            detections = []
-            healthy_count = 0
-            sick_count = 0
-            
-            # Process each detection and DRAW custom boxes
-            annotated_image = image.copy()
-            for idx, detection in enumerate(filtered_detections):
-                class_name = detection["class_name"]
-                confidence = detection["confidence"]
-                bbox = detection["bbox"]  # [x1, y1, x2, y2]
-                
-                # Coords for cv2
-                x1, y1, x2, y2 = map(int, bbox)
-                
-                # Determine color and count
-                is_healthy = self._is_healthy_class(class_name)
-                color = (0, 255, 0) if is_healthy else (0, 0, 255) # BGR
-                
-                if is_healthy:
-                    healthy_count += 1
-                else:
-                    sick_count += 1
-
-                # Draw Box - use thickness 2 for clearer view when many boxes exist
-                cv2.rectangle(annotated_image, (x1, y1), (x2, y2), color, 2)
-                
-                # Draw Label - smaller scale 0.5 for crowded scenes
-                label = f"{class_name} {confidence:.2f}"
-                cv2.putText(annotated_image, label, (x1, y1 - 10), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-
-                detection = {
-                    "id": idx + 1,
-                    "class": class_name,
-                    "confidence": round(confidence, 3),
-                    "bbox": [round(x, 2) for x in bbox]
-                }
-                detections.append(detection)
-            
-            # Generate alert message
-            alert = None
-            if sick_count > 0:
-                alert = f"⚠️ Phát hiện {sick_count} cá thể có dấu hiệu bất thường. Cần kiểm tra kỹ chuồng trại."
-            
-            return {
-                "total_chickens": len(detections),
-                "healthy_count": healthy_count,
-                "sick_count": sick_count,
-                "detections": detections,
-                "annotated_image": annotated_image,
-                "has_sick_chickens": sick_count > 0,
-                "alert": alert
-            }
-            
+            if tiled:
+                # Các tile đã là một batch: chạy thẳng trên executor, không qua micro-batcher
+                results = await self.executor.run(self._detect_tiled_sync, image, conf_threshold)
+            else:
+                results = await self._detection_batcher.submit(image, conf_threshold)
+            if annotate:
+                results["annotated_image"] = await self.executor.run(
+                    self.annotate_detections, image, results["detections"]
+                )
+            return results
         except Exception as e:
             logger.error(f"Error in detect_sick_chickens: {e}")
             raise
+
+    def _summarize_detections(self, result) -> Dict:
+        """Filter one Ultralytics result and count healthy/sick chickens"""
+        return self._summarize_filtered(self._filtered_detections(result))
+
+    def _summarize_filtered(self, filtered_detections: List[Dict]) -> Dict:
+        """Count healthy/sick chickens in already filtered candidates and build the response dict"""
+        detections = []
+        healthy_count = 0
+        sick_count = 0
+        
+        # Process each detection
+        for idx, detection in enumerate(filtered_detections):
+            class_name = detection["class_name"]
+            confidence = detection["confidence"]
+            bbox = detection["bbox"]  # [x1, y1, x2, y2]
+            
+            if self._is_healthy_class(class_name):
+                healthy_count += 1
+            else:
+                sick_count += 1
+
+            detection = {
+                "id": idx + 1,
+                "class": class_name,
+                "confidence": round(confidence, 3),
+                "bbox": [round(x, 2) for x in bbox]
+            }
+            detections.append(detection)
+        
+        # Generate alert message
+        alert = None
+        if sick_count > 0:
+            alert = f"⚠️ Phát hiện {sick_count} cá thể có dấu hiệu bất thường. Cần kiểm tra kỹ chuồng trại."
+        
+        return {
+            "total_chickens": len(detections),
+            "healthy_count": healthy_count,
+            "sick_count": sick_count,
+            "detections": detections,
+            "has_sick_chickens": sick_count > 0,
+            "alert": alert
+        }
     
     async def classify_disease(self, image: np.ndarray) -> Dict:
         """
@@ -369,42 +865,47 @@ class YOLOService:
             - confidence: Confidence score (0-1)
             - all_probabilities: Dictionary of all class probabilities
             - is_healthy: Boolean flag
+            - model_version: Fingerprint of the classifier that produced the result
         """
         if self.classification_model is None:
             raise RuntimeError("Classification model not loaded")
         
         try:
-            # Run inference
-            results = self.classification_model(image, verbose=False)
-            
-            # Get probabilities
-            probs = results[0].probs
-            top1_idx = int(probs.top1)
-            top1_conf = float(probs.top1conf)
-            
-            # Get class name
-            disease = results[0].names[top1_idx]
-            
-            # Get all probabilities
-            all_probs = {}
-            for idx, prob in enumerate(probs.data.tolist()):
-                class_name = results[0].names[idx]
-                all_probs[class_name] = round(prob, 4)
-            
-            return {
-                "disease": disease,
-                "confidence": round(top1_conf, 4),
-                "all_probabilities": all_probs,
-                "is_healthy": disease.lower() == "healthy"
-            }
-            
+            return await self.executor.run(self._classify_sync, image)
         except Exception as e:
             logger.error(f"Error in classify_disease: {e}")
             raise
 
+    def _classify_sync(self, image: np.ndarray) -> Dict:
+        # Run inference
+        results, version = self._predict_versioned("classification", image)
+        
+        # Get probabilities
+        probs = results[0].probs
+        top1_idx = int(probs.top1)
+        top1_conf = float(probs.top1conf)
+        
+        # Get class name
+        disease = results[0].names[top1_idx]
+        
+        # Get all probabilities
+        all_probs = {}
+        for idx, prob in enumerate(probs.data.tolist()):
+            class_name = results[0].names[idx]
+            all_probs[class_name] = round(prob, 4)
+        
+        return {
+            "disease": disease,
+            "confidence": round(top1_conf, 4),
+            "all_probabilities": all_probs,
+            "is_healthy": disease.lower() == "healthy",
+            "model_version": version
+        }
+
 
 # Khai báo một thể hiện (Instance) duy nhất (Singleton Pattern) của bộ AI Computer Vision
 _yolo_service: Optional[YOLOService] = None
+_yolo_service_lock = threading.Lock()
 
 
 def get_yolo_service() -> YOLOService:
@@ -416,5 +917,8 @@ def get_yolo_service() -> YOLOService:
     """
     global _yolo_service
     if _yolo_service is None:
-        _yolo_service = YOLOService()
+        # Request đến sớm trong lúc lifecycle đang nạp model sẽ chờ, không nạp thêm bản thứ hai
+        with _yolo_service_lock:
+            if _yolo_service is None:
+                _yolo_service = YOLOService()
     return _yolo_service
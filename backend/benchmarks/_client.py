@@ -0,0 +1,91 @@
+"""Tiny stdlib HTTP client shared by the load benchmarks (no extra dependencies)"""
+
+import json
+import mimetypes
+import os
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+
+class ApiClient:
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 600.0):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _headers(self, extra: Optional[Dict] = None) -> Dict:
+        headers = dict(extra or {})
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def login(self, username: str, password: str) -> str:
+        body = urllib.parse.urlencode({"username": username, "password": password}).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/api/v1/auth/login",
+            data=body,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            self.token = json.loads(response.read())["access_token"]
+        return self.token
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict] = None) -> Tuple[int, bytes, float]:
+        """Return (status, body, latency_seconds); HTTP errors are returned, not raised"""
+        request = urllib.request.Request(
+            f"{self.base_url}{path}", data=body, headers=self._headers(headers), method=method
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status = e.code
+        return status, payload, time.perf_counter() - started
+
+    def get(self, path: str) -> Tuple[int, bytes, float]:
+        return self.request("GET", path)
+
+    def post_json(self, path: str, data: Dict) -> Tuple[int, bytes, float]:
+        return self.request("POST", path, json.dumps(data).encode(), {"Content-Type": "application/json"})
+
+    def post_file(self, path: str, file_path: str, field: str = "file") -> Tuple[int, bytes, float]:
+        with open(file_path, "rb") as f:
+            content = f.read()
+        return self.post_bytes(path, os.path.basename(file_path), content, field)
+
+    def post_bytes(self, path: str, filename: str, content: bytes, field: str = "file") -> Tuple[int, bytes, float]:
+        boundary = uuid.uuid4().hex
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        return self.request("POST", path, body, {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    """p50/p95/p99/max in milliseconds"""
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else 0.0,
+    }
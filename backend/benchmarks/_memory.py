@@ -0,0 +1,45 @@
+"""Process memory readings for benchmarks (Linux /proc, getrusage elsewhere)"""
+
+import os
+import resource
+import sys
+from typing import Dict
+
+
+def _proc_status_kb(pid: int, field: str) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def memory_mb(pid: int = 0) -> Dict[str, float]:
+    """Current and peak RSS of a process in MB"""
+    pid = pid or os.getpid()
+    try:
+        return {
+            "rss_mb": round(_proc_status_kb(pid, "VmRSS") / 1024, 1),
+            "peak_rss_mb": round(_proc_status_kb(pid, "VmHWM") / 1024, 1),
+        }
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+        return {"rss_mb": None, "peak_rss_mb": round(peak_mb, 1)}
+
+
+def smaps_mb(pid: int) -> Dict[str, float]:
+    """
+    RSS / PSS / shared / private memory of a process in MB (Linux only).
+    PSS splits each shared page between the processes mapping it, so the PSS
+    of a master and its forked workers adds up to what they really use.
+    """
+    fields = {"Rss": "rss_mb", "Pss": "pss_mb", "Shared_Clean": "shared_mb", "Shared_Dirty": "shared_mb",
+              "Private_Clean": "private_mb", "Private_Dirty": "private_mb"}
+    result = {name: 0.0 for name in set(fields.values())}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key = line.split(":")[0]
+            if key in fields:
+                result[fields[key]] += int(line.split()[1]) / 1024
+    return {name: round(value, 1) for name, value in result.items()}
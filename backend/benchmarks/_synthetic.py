@@ -0,0 +1,50 @@
+"""Synthetic media generators so benchmarks are reproducible without farm footage"""
+
+import cv2
+import numpy as np
+
+
+def make_barn_frame(index: int, width: int = 1280, height: int = 720, birds: int = 24, seed: int = 0) -> np.ndarray:
+    """A litter-coloured background with moving, chicken-sized ellipses"""
+    rng = np.random.default_rng(seed)
+    phases = rng.uniform(0, 2 * np.pi, size=(birds, 2))
+    frame = np.full((height, width, 3), (52, 96, 128), dtype=np.uint8)
+    noise = rng.integers(0, 24, size=(height // 8, width // 8, 1), dtype=np.uint8)
+    frame += cv2.resize(noise, (width, height), interpolation=cv2.INTER_NEAREST)[..., None]
+
+    cols = int(np.ceil(np.sqrt(birds * width / height)))
+    rows = int(np.ceil(birds / cols))
+    axes = (max(8, width // (cols * 4)), max(6, height // (rows * 5)))
+    for bird in range(birds):
+        cx = (bird % cols + 0.5) * width / cols + axes[0] * np.sin(index / 15.0 + phases[bird, 0])
+        cy = (bird // cols + 0.5) * height / rows + axes[1] * np.cos(index / 11.0 + phases[bird, 1])
+        color = (235, 235, 240) if bird % 5 else (170, 180, 200)
+        cv2.ellipse(frame, (int(cx), int(cy)), axes, (index + bird * 20) % 180, 0, 360, color, -1)
+        cv2.circle(frame, (int(cx + axes[0] * 0.8), int(cy - axes[1] * 0.6)), max(3, axes[1] // 2), (40, 40, 200), -1)
+    return frame
+
+
+def write_synthetic_clip(path: str, frames: int = 300, width: int = 1280, height: int = 720,
+                         fps: int = 25, static_ratio: float = 0.0) -> str:
+    """
+    Write an mp4v clip of moving birds. `static_ratio` of the clip (in the middle)
+    is frozen, mimicking CCTV footage where nothing moves for long stretches.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open VideoWriter for {path}")
+
+    static_start = int(frames * (1 - static_ratio) / 2)
+    static_end = static_start + int(frames * static_ratio)
+    for index in range(frames):
+        motion_index = static_start if static_start <= index < static_end else index
+        writer.write(make_barn_frame(motion_index, width, height))
+    writer.release()
+    return path
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 90) -> bytes:
+    ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return buffer.tobytes()
@@ -0,0 +1,202 @@
+"""
+Admin dashboard queries: full scans of the log tables vs the daily rollups.
+
+Seeds a throwaway SQLite database with `--rows` diagnosis, detection and usage
+logs each, spread over `--days` days, backfills `daily_rollups` with
+`rebuild_rollups` (what the migration / reconcile script do) and times
+`/admin/stats` + `/admin/usage-stats` as they were (COUNT / SUM / GROUP BY
+cast(created_at, Date) over the logs) and as they are now. Both answers are
+compared, then `--extra` logs are written through the incremental path and
+checked again. Point `DATABASE_URL` at a Postgres database to measure there.
+
+Usage:
+    python benchmarks/bench_admin_stats.py --rows 10000,100000,1000000 --days 365
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_admin_stats_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/bench.db")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import Date, case, cast, func  # noqa: E402
+
+from app.api.v1.endpoints.admin import get_dashboard_stats, get_usage_stats  # noqa: E402
+from app.core import models  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.services.stats_rollup import _day, rebuild_rollups, record_detection, record_diagnosis, record_usage  # noqa: E402
+
+DISEASES = ["Healthy", "Healthy", "Coccidiosis", "Salmonella", "Newcastle"]
+FEATURES = ["detection", "classification", "chat", "camera_detection"]
+
+
+def legacy_stats(db) -> dict:
+    """The two endpoints before the rollups (same queries, day made portable with `_day`)"""
+    dialect = db.get_bind().dialect.name
+    diag_day = _day(models.DiagnosisLog.created_at, dialect)
+    usage_day = _day(models.UsageLog.created_at, dialect)
+    start_date = date.today() - timedelta(days=6)
+
+    total_diagnosis = db.query(models.DiagnosisLog).count()
+    total_detections = db.query(models.DetectionLog).count()
+    sick_cases = db.query(models.DiagnosisLog).filter(models.DiagnosisLog.predicted_disease != 'Healthy').count()
+    daily = db.query(
+        diag_day, func.count(models.DiagnosisLog.id),
+        func.sum(case((models.DiagnosisLog.predicted_disease != 'Healthy', 1), else_=0))
+    ).filter(diag_day >= start_date).group_by(diag_day).all()
+    dist = db.query(models.DiagnosisLog.predicted_disease, func.count(models.DiagnosisLog.id)).filter(
+        models.DiagnosisLog.predicted_disease != 'Healthy'
+    ).group_by(models.DiagnosisLog.predicted_disease).order_by(func.count(models.DiagnosisLog.id).desc()).limit(5).all()
+
+    total_logs = db.query(models.UsageLog).count()
+    total_tokens = db.query(func.sum(models.UsageLog.total_tokens)).scalar() or 0
+    daily_usage = db.query(usage_day, func.count(models.UsageLog.id), func.sum(models.UsageLog.total_tokens)).filter(
+        usage_day >= start_date
+    ).group_by(usage_day).all()
+    features = db.query(models.UsageLog.feature, func.count(models.UsageLog.id)).group_by(models.UsageLog.feature).all()
+    return {
+        "totals": [total_diagnosis + total_detections, sick_cases, total_detections, total_logs, total_tokens],
+        "daily": sorted((day, total, sick) for day, total, sick in daily),
+        "daily_usage": sorted((day, count, tokens) for day, count, tokens in daily_usage),
+        "diseases": sorted(dist),
+        "features": sorted((feature.capitalize(), count) for feature, count in features),
+    }
+
+
+def rollup_stats(db) -> dict:
+    dashboard = asyncio.run(get_dashboard_stats(db=db, current_user=None))
+    usage = asyncio.run(get_usage_stats(db=db, current_user=None))
+    days = [date.today() - timedelta(days=6 - offset) for offset in range(7)]
+    return {
+        "totals": [
+            dashboard["total_diagnosis"], dashboard["sick_cases"], dashboard["total_detections"],
+            usage["total_requests"], usage["total_tokens"],
+        ],
+        "daily": [(day, point["visits"], point["sick"]) for day, point in zip(days, dashboard["chart_data"]) if point["visits"]],
+        "daily_usage": [
+            (day, point["requests"], point["tokens"]) for day, point in zip(days, usage["daily_usage"]) if point["requests"]
+        ],
+        "diseases": sorted((entry["name"], entry["value"]) for entry in dashboard["pie_data"][1:]),
+        "features": sorted((entry["name"], entry["value"]) for entry in usage["feature_distribution"]),
+    }
+
+
+def seed(rows: int, days: int, rng: random.Random):
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        for start in range(0, rows, 10000):
+            size = min(10000, rows - start)
+            stamps = [now - timedelta(seconds=rng.uniform(0, days * 86400)) for _ in range(size)]
+            conn.execute(models.DiagnosisLog.__table__.insert(), [
+                {"image_path": "x.jpg", "predicted_disease": rng.choice(DISEASES), "confidence": 0.9, "created_at": stamp}
+                for stamp in stamps
+            ])
+            conn.execute(models.DetectionLog.__table__.insert(), [
+                {"image_path": "x.jpg", "total_chickens": 10, "healthy_count": 10 - sick, "sick_count": sick,
+                 "created_at": stamp}
+                for stamp, sick in zip(stamps, (rng.choice([0, 0, 0, 1, 2]) for _ in stamps))
+            ])
+            conn.execute(models.UsageLog.__table__.insert(), [
+                {"feature": rng.choice(FEATURES), "provider": "yolo", "model": "m", "tokens_prompt": 0,
+                 "tokens_completion": 0, "total_tokens": rng.randint(0, 500), "cost_est": 0.0, "created_at": stamp}
+                for stamp in stamps
+            ])
+
+
+def timed(func, db, repeat: int) -> tuple:
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(db)
+        samples.append(time.perf_counter() - started)
+    return result, round(statistics.median(samples) * 1000, 2)
+
+
+def write_incremental(db, count: int, rng: random.Random):
+    """Logs written the way the endpoints / usage writer do: log + rollup in one transaction"""
+    for _ in range(count):
+        diagnosis = models.DiagnosisLog(image_path="x.jpg", predicted_disease=rng.choice(DISEASES), confidence=0.9)
+        detection = models.DetectionLog(image_path="x.jpg", total_chickens=5, healthy_count=4, sick_count=1)
+        db.add_all([diagnosis, detection])
+        record_diagnosis(db, diagnosis)
+        record_detection(db, detection)
+        db.commit()
+    events = [
+        {"feature": rng.choice(FEATURES), "provider": "yolo", "model": "m", "tokens_prompt": 0, "tokens_completion": 0,
+         "total_tokens": 7, "cost_est": 0.0, "created_at": datetime.now(timezone.utc), "user_id": None}
+        for _ in range(count)
+    ]
+    db.execute(models.UsageLog.__table__.insert(), events)
+    record_usage(db, events)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000,1000000", help="Comma-separated log counts per table")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--extra", type=int, default=50, help="Logs written incrementally before the last check")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    report = []
+    try:
+        Base.metadata.create_all(bind=engine)
+        seeded = 0
+        for rows in (int(value) for value in args.rows.split(",")):
+            seed(rows - seeded, args.days, rng)
+            seeded = rows
+
+            db = SessionLocal()
+            try:
+                started = time.perf_counter()
+                rebuild_rollups(db)
+                db.commit()
+                backfill_seconds = round(time.perf_counter() - started, 2)
+
+                legacy, legacy_ms = timed(legacy_stats, db, args.repeat)
+                rollup, rollup_ms = timed(rollup_stats, db, args.repeat)
+                report.append({
+                    "rows_per_table": rows,
+                    "rollup_rows": db.query(models.DailyRollup).count(),
+                    "backfill_seconds": backfill_seconds,
+                    "full_scan_ms": legacy_ms,
+                    "rollup_ms": rollup_ms,
+                    "same_result": legacy == rollup,
+                })
+            finally:
+                db.close()
+
+        db = SessionLocal()
+        try:
+            write_incremental(db, args.extra, rng)
+            report.append({
+                "incremental_logs": args.extra,
+                "same_result": legacy_stats(db) == rollup_stats(db),
+                "reconcile_mismatches": {
+                    source: result["mismatched_days"]
+                    for source, result in rebuild_rollups(db, dry_run=True).items()
+                },
+            })
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
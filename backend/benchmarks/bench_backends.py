@@ -0,0 +1,103 @@
+"""
+Latency and memory of the detector per inference backend (torch / onnxruntime / openvino),
+optionally per precision (`onnxruntime:int8`, see scripts/quantize_models.py).
+
+Every backend runs in a fresh subprocess with `INFERENCE_BACKEND` /
+`INFERENCE_PRECISION` set, so the RSS numbers only contain what that backend loads. For each one the script
+reports the RSS after importing/loading the models, single-image and batched
+latency percentiles, and whether torch ended up imported.
+
+Export the artifacts first:
+    python scripts/export_models.py --backend onnxruntime openvino
+
+Usage:
+    python benchmarks/bench_backends.py --backends torch onnxruntime onnxruntime:int8 openvino --runs 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import latency_summary  # noqa: E402
+from _memory import memory_mb  # noqa: E402
+
+
+def worker(runs: int, batch_size: int, width: int, height: int):
+    from _synthetic import make_barn_frame
+
+    baseline = memory_mb()
+    started = time.perf_counter()
+    from app.services.yolo_service import YOLOService
+    service = YOLOService()
+    load_seconds = time.perf_counter() - started
+    if service.detection_model is None:
+        print(json.dumps({"error": "detection model / artifact not found"}))
+        return
+    loaded = memory_mb()
+
+    frames = [make_barn_frame(index, width, height, seed=index) for index in range(batch_size)]
+    service._detect_batch_sync(frames[:1], 0.3)  # warm-up
+    service._detect_batch_sync(frames, 0.3)
+
+    single, batched = [], []
+    for _ in range(runs):
+        t = time.perf_counter()
+        service._detect_batch_sync(frames[:1], 0.3)
+        single.append(time.perf_counter() - t)
+    for _ in range(max(1, runs // batch_size)):
+        t = time.perf_counter()
+        service._detect_batch_sync(frames, 0.3)
+        batched.append((time.perf_counter() - t) / batch_size)
+
+    print(json.dumps({
+        "load_seconds": round(load_seconds, 2),
+        "rss_before_load_mb": baseline["rss_mb"],
+        "rss_after_load_mb": loaded["rss_mb"],
+        "memory_after_inference": memory_mb(),
+        "single_image": latency_summary(single),
+        f"per_image_in_batch_of_{batch_size}": latency_summary(batched),
+        "torch_imported": "torch" in sys.modules,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnxruntime", "openvino"])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.runs, args.batch_size, args.width, args.height)
+        return
+
+    report = {"cpu_count": os.cpu_count(), "backends": {}}
+    for spec in args.backends:
+        backend, _, precision = spec.partition(":")
+        command = [
+            sys.executable, __file__, "--worker", "--runs", str(args.runs),
+            "--batch-size", str(args.batch_size), "--width", str(args.width), "--height", str(args.height)
+        ]
+        env = dict(os.environ, INFERENCE_BACKEND=backend, INFERENCE_PRECISION=precision or "fp32")
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+        if completed.returncode != 0 or not lines:
+            report["backends"][spec] = {"error": (completed.stderr or completed.stdout).strip()[-500:]}
+        else:
+            report["backends"][spec] = json.loads(lines[-1])
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
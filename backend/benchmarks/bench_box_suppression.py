@@ -0,0 +1,159 @@
+"""
+Microbenchmark of healthy/sick conflicting-box suppression: the previous
+per-box Python implementation (kept below as the reference) vs the vectorized
+`YOLOService._filtered_detections`.
+
+Each case builds an Ultralytics `Boxes` object with `n` boxes where roughly a
+third are near-duplicates of another box with the opposite class, and checks
+that both implementations return exactly the same detections.
+
+Usage:
+    python benchmarks/bench_box_suppression.py --sizes 50 200 500 --repeat 20
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.yolo_service import YOLOService  # noqa: E402
+
+NAMES = {0: "healthyChicken", 1: "sickChicken"}
+
+
+# --- Reference implementation (before vectorization) ---
+
+def legacy_extract_detection_candidates(result) -> List[Dict]:
+    candidates = []
+    for idx, box in enumerate(result.boxes):
+        class_id = int(box.cls)
+        candidates.append({
+            "source_index": idx,
+            "class_id": class_id,
+            "class_name": result.names[class_id],
+            "confidence": float(box.conf),
+            "bbox": [float(x) for x in box.xyxy[0].tolist()]
+        })
+    return candidates
+
+
+def legacy_bbox_overlap_metrics(bbox_a: List[float], bbox_b: List[float]) -> tuple:
+    ax1, ay1, ax2, ay2 = bbox_a
+    bx1, by1, bx2, by2 = bbox_b
+
+    inter_w = max(0.0, min(ax2, bx2) - max(ax1, bx1))
+    inter_h = max(0.0, min(ay2, by2) - max(ay1, by1))
+    inter_area = inter_w * inter_h
+
+    area_a = max(0.0, ax2 - ax1) * max(0.0, ay2 - ay1)
+    area_b = max(0.0, bx2 - bx1) * max(0.0, by2 - by1)
+    union = area_a + area_b - inter_area
+    iou = inter_area / union if union > 0 else 0.0
+    overlap_min = inter_area / min(area_a, area_b) if min(area_a, area_b) > 0 else 0.0
+
+    return inter_area, iou, overlap_min
+
+
+def legacy_is_conflicting_same_chicken(first: Dict, second: Dict) -> bool:
+    if first["class_name"] == second["class_name"]:
+        return False
+
+    _, iou, overlap_min = legacy_bbox_overlap_metrics(first["bbox"], second["bbox"])
+    if iou < 0.75 and overlap_min < 0.9:
+        return False
+
+    fx1, fy1, fx2, fy2 = first["bbox"]
+    sx1, sy1, sx2, sy2 = second["bbox"]
+    first_diag = np.hypot(fx2 - fx1, fy2 - fy1)
+    second_diag = np.hypot(sx2 - sx1, sy2 - sy1)
+    min_diag = max(1.0, min(first_diag, second_diag))
+
+    first_center = ((fx1 + fx2) / 2.0, (fy1 + fy2) / 2.0)
+    second_center = ((sx1 + sx2) / 2.0, (sy1 + sy2) / 2.0)
+    center_distance = np.hypot(first_center[0] - second_center[0], first_center[1] - second_center[1])
+
+    return center_distance / min_diag <= 0.2
+
+
+def legacy_suppress_conflicting_candidates(candidates: List[Dict]) -> List[Dict]:
+    kept: List[Dict] = []
+    for candidate in sorted(candidates, key=lambda item: item["confidence"], reverse=True):
+        if any(legacy_is_conflicting_same_chicken(candidate, existing) for existing in kept):
+            continue
+        kept.append(candidate)
+    return sorted(kept, key=lambda item: item["source_index"])
+
+
+def legacy_filtered_detections(result) -> List[Dict]:
+    return legacy_suppress_conflicting_candidates(legacy_extract_detection_candidates(result))
+
+
+# --- Benchmark ---
+
+def make_result(count: int, seed: int = 0, width: int = 1920, height: int = 1080):
+    rng = np.random.default_rng(seed)
+    originals = count - count // 3
+    xy = rng.uniform(0, [width - 80, height - 80], size=(originals, 2))
+    wh = rng.uniform(30, 80, size=(originals, 2))
+    boxes = np.concatenate([xy, xy + wh], axis=1)
+    classes = rng.integers(0, 2, size=originals)
+
+    # Box trùng gần như hoàn toàn nhưng khác class -> phải bị loại
+    twins = rng.choice(originals, size=count - originals, replace=False)
+    jitter = rng.normal(0, 1.5, size=(len(twins), 4))
+    boxes = np.concatenate([boxes, boxes[twins] + jitter])
+    classes = np.concatenate([classes, 1 - classes[twins]])
+    confidences = rng.uniform(0.25, 0.95, size=count).round(3)  # có cả confidence bằng nhau
+
+    data = np.concatenate([boxes, confidences[:, None], classes[:, None]], axis=1).astype(np.float32)
+    return SimpleNamespace(boxes=Boxes(torch.from_numpy(data), (height, width)), names=NAMES)
+
+
+def best_time(func, result, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(result)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    report = []
+    for size in args.sizes:
+        result = make_result(size, seed=size)
+        legacy = legacy_filtered_detections(result)
+        vectorized = YOLOService._filtered_detections(result)
+
+        legacy_seconds = best_time(legacy_filtered_detections, result, args.repeat)
+        vectorized_seconds = best_time(YOLOService._filtered_detections, result, args.repeat)
+        report.append({
+            "boxes": size,
+            "kept": len(vectorized),
+            "legacy_ms": round(legacy_seconds * 1000, 3),
+            "vectorized_ms": round(vectorized_seconds * 1000, 3),
+            "speedup": round(legacy_seconds / vectorized_seconds, 1),
+            "identical": legacy == vectorized,
+        })
+
+    print(json.dumps(report, indent=2))
+    if not all(row["identical"] for row in report):
+        sys.exit("Vectorized suppression differs from the reference implementation")
+
+
+if __name__ == "__main__":
+    main()
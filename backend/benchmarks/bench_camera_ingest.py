@@ -0,0 +1,147 @@
+"""
+Scheduled camera ingestion at scale, in-process on a throwaway SQLite database.
+
+Registers `--cameras` file cameras (stand-in for RTSP: a synthetic barn clip
+played in real time from check to check) plus `--broken` RTSP cameras on a
+closed port, all on short intervals, and runs `CameraIngestService` for
+`--seconds`. Reported: checks and DetectionLog rows written, the interval each
+camera actually got vs the one requested, decode + inference CPU seconds per
+wall second vs `CAMERA_INGEST_CPU_BUDGET`, peak thread count (independent of
+the number of cameras) and the reconnect backoff reached by the broken ones.
+
+Usage:
+    python benchmarks/bench_camera_ingest.py --cameras 200 --broken 20 --interval 5 --seconds 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_cameras_")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DIR}/bench.db"
+os.environ["UPLOAD_DIR"] = os.path.join(WORK_DIR, "uploads")
+os.environ["CAMERA_INGEST_LOCAL_DIR"] = os.path.join(WORK_DIR, "feeds")
+os.environ.setdefault("CAMERA_INGEST_MIN_INTERVAL_SECONDS", "1")
+os.environ.setdefault("CAMERA_INGEST_CONNECT_TIMEOUT_SECONDS", "2")
+os.environ.setdefault("CAMERA_INGEST_BACKOFF_BASE_SECONDS", "2")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _synthetic import write_synthetic_clip  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.core import models  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.services.camera_ingest import get_camera_ingest_service, resolve_camera_source  # noqa: E402
+from app.services.yolo_service import get_yolo_service  # noqa: E402
+
+
+def register_cameras(cameras: int, broken: int, interval: int, frames: int) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = models.User(full_name="Bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        flock = models.Flock(user_id=user.id, name="Chuồng benchmark", type="Gà thịt", total_quantity=500)
+        db.add(flock)
+        db.flush()
+        sources = [("barn.mp4", f"cam-{index}") for index in range(cameras)]
+        sources += [("rtsp://127.0.0.1:9/stream", f"broken-{index}") for index in range(broken)]
+        for source, name in sources:
+            kind, stored = resolve_camera_source(source)
+            db.add(models.CameraSource(
+                flock_id=flock.id, name=name, kind=kind, source=stored, interval_seconds=interval,
+                frames_per_check=frames, is_active=True, consecutive_failures=0
+            ))
+        db.commit()
+        return flock.id
+    finally:
+        db.close()
+
+
+def summarize(flock_id: int, interval: int, seconds: float) -> dict:
+    db = SessionLocal()
+    try:
+        cameras = db.query(models.CameraSource).all()
+        logs = db.query(models.DetectionLog).filter(models.DetectionLog.flock_id == flock_id).count()
+        healthy = [camera for camera in cameras if camera.kind == "file"]
+        broken = [camera for camera in cameras if camera.kind == "stream"]
+        checks_per_camera = sorted(
+            db.query(models.DetectionLog).filter(models.DetectionLog.image_path.like(f"cameras/{camera.id}/%")).count()
+            for camera in healthy
+        )
+        return {
+            "detection_logs": logs,
+            "logs_per_camera": {
+                "min": checks_per_camera[0] if checks_per_camera else 0,
+                "median": checks_per_camera[len(checks_per_camera) // 2] if checks_per_camera else 0,
+                "max": checks_per_camera[-1] if checks_per_camera else 0,
+                "requested": round(seconds / interval, 1),
+            },
+            "broken_max_failures": max((camera.consecutive_failures or 0 for camera in broken), default=0),
+            "broken_last_error": broken[0].last_error if broken else None,
+        }
+    finally:
+        db.close()
+
+
+async def run(seconds: float) -> dict:
+    service = get_camera_ingest_service()
+    peak_threads = threading.active_count()
+    cpu, wall = time.process_time(), time.perf_counter()
+    await service.start()
+    while time.perf_counter() - wall < seconds:
+        await asyncio.sleep(0.5)
+        peak_threads = max(peak_threads, threading.active_count())
+    await service.stop()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return {
+        "wall_seconds": round(wall, 1),
+        "process_cpu_per_second": round(cpu / wall, 3),
+        "peak_threads": peak_threads,
+        "ingest": service.metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cameras", type=int, default=200)
+    parser.add_argument("--broken", type=int, default=20, help="RTSP cameras on a closed port")
+    parser.add_argument("--interval", type=int, default=5, help="Requested seconds between two checks")
+    parser.add_argument("--frames", type=int, default=2, help="Frames per check")
+    parser.add_argument("--seconds", type=float, default=60)
+    args = parser.parse_args()
+
+    try:
+        os.makedirs(os.environ["CAMERA_INGEST_LOCAL_DIR"])
+        write_synthetic_clip(os.path.join(os.environ["CAMERA_INGEST_LOCAL_DIR"], "barn.mp4"), frames=750)
+        flock_id = register_cameras(args.cameras, args.broken, args.interval, args.frames)
+        if get_yolo_service().detection_model is None:
+            sys.exit("Detection model not found, set DETECTION_MODEL_PATH")
+        get_yolo_service().warmup()
+
+        result = asyncio.run(run(args.seconds))
+        report = {
+            "cameras": args.cameras,
+            "broken": args.broken,
+            "interval_seconds": args.interval,
+            "cpu_budget": get_settings().camera_ingest_cpu_budget,
+            **result,
+            **summarize(flock_id, args.interval, result["wall_seconds"]),
+        }
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Load benchmark of `/ws/camera-stream` with N simulated cameras.
+
+Every camera sends synthetic barn JPEG frames at `--fps` for `--seconds` and
+reads results concurrently. Reported per camera count: aggregate and
+per-camera result fps, end-to-end latency (frame sent -> result received),
+the share of frames dropped by the newest-frame-wins mailbox, and Jain's
+fairness index of the per-camera fps (1.0 = capacity shared evenly).
+
+Usage (backend running on :8000):
+    python benchmarks/bench_camera_stream.py --username admin@gmail.com --password admin123 \\
+        --cameras 1,2,4,8 --fps 15 --seconds 20
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import websockets
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import ApiClient, latency_summary  # noqa: E402
+from _synthetic import encode_jpeg, make_barn_frame  # noqa: E402
+
+
+async def run_camera(url: str, frames: List[bytes], fps: float, seconds: float) -> Dict:
+    sent_at: Dict[int, float] = {}
+    latencies, server_latencies, errors = [], [], 0
+    results = 0
+
+    async with websockets.connect(url, max_size=None) as ws:
+        ready = json.loads(await ws.recv())
+        if ready.get("type") != "ready":
+            raise RuntimeError(f"Unexpected first message: {ready}")
+
+        async def sender():
+            seq, started = 0, time.perf_counter()
+            while time.perf_counter() - started < seconds:
+                seq += 1
+                sent_at[seq] = time.perf_counter()
+                await ws.send(frames[seq % len(frames)])
+                await asyncio.sleep(max(0.0, started + seq / fps - time.perf_counter()))
+            return seq
+
+        async def receiver():
+            nonlocal results, errors
+            async for raw in ws:
+                message = json.loads(raw)
+                if message["type"] == "detections":
+                    results += 1
+                    latencies.append(time.perf_counter() - sent_at[message["seq"]])
+                    server_latencies.append(message["latency_ms"] / 1000)
+                elif message["type"] == "error":
+                    errors += 1
+
+        reader = asyncio.create_task(receiver())
+        sent = await sender()
+        await asyncio.sleep(1.0)  # Chờ kết quả của frame cuối
+        reader.cancel()
+
+    return {
+        "sent": sent,
+        "results": results,
+        "errors": errors,
+        "fps": round(results / seconds, 2),
+        "dropped_ratio": round(1 - results / sent, 3) if sent else 0.0,
+        "latency": latency_summary(latencies),
+        "server_latency": latency_summary(server_latencies),
+    }
+
+
+def jain_index(values: List[float]) -> float:
+    if not values or not any(values):
+        return 0.0
+    return round(sum(values) ** 2 / (len(values) * sum(value * value for value in values)), 3)
+
+
+async def run_load(url: str, frames: List[bytes], cameras: int, fps: float, seconds: float) -> Dict:
+    per_camera = await asyncio.gather(*(run_camera(url, frames, fps, seconds) for _ in range(cameras)))
+    camera_fps = [camera["fps"] for camera in per_camera]
+    return {
+        "cameras": cameras,
+        "offered_fps_per_camera": fps,
+        "total_result_fps": round(sum(camera_fps), 2),
+        "min_camera_fps": min(camera_fps),
+        "max_camera_fps": max(camera_fps),
+        "fairness": jain_index(camera_fps),
+        "worst_latency_p50_ms": max(camera["latency"]["p50_ms"] for camera in per_camera),
+        "worst_latency_p95_ms": max(camera["latency"]["p95_ms"] for camera in per_camera),
+        "per_camera": per_camera,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--cameras", default="1,2,4,8", help="Comma-separated camera counts")
+    parser.add_argument("--fps", type=float, default=15, help="Frames sent per second by each camera")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    token = ApiClient(args.base_url).login(args.username, args.password)
+    url = f"{args.base_url.replace('http', 'ws', 1)}/ws/camera-stream?token={token}"
+    frames = [encode_jpeg(make_barn_frame(index, args.width, args.height), quality=80) for index in range(30)]
+
+    report = [
+        asyncio.run(run_load(url, frames, int(cameras), args.fps, args.seconds))
+        for cameras in args.cameras.split(",")
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Load benchmark: latency of a light endpoint (chat / health) while video jobs run.
+
+Phase 1 measures the probe endpoint alone, phase 2 repeats it while
+`--video-jobs` concurrent uploads hit `/api/v1/detect/video_analyze`.
+Before the inference executor, every probe issued during phase 2 waited for
+the whole video to finish; now p99 should stay close to phase 1.
+
+Usage (backend running on :8000):
+    python benchmarks/bench_chat_latency_under_video.py \\
+        --username admin@example.com --password secret --video demo_videos/chicken_farm.mp4
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import ApiClient, latency_summary  # noqa: E402
+
+
+def run_probes(client: ApiClient, args, stop: threading.Event, latencies: list, errors: list):
+    while not stop.is_set():
+        if args.probe == "chat":
+            status, _, latency = client.post_json("/api/v1/chat/ask", {"message": args.question, "history": []})
+        else:
+            status, _, latency = client.get("/health")
+        if status == 200:
+            latencies.append(latency)
+        else:
+            errors.append(status)
+        time.sleep(args.probe_interval)
+
+
+def measure_phase(client: ApiClient, args, duration: float, video_jobs: int) -> dict:
+    stop = threading.Event()
+    latencies, errors, video_latencies = [], [], []
+
+    probe_threads = [
+        threading.Thread(target=run_probes, args=(client, args, stop, latencies, errors), daemon=True)
+        for _ in range(args.probe_concurrency)
+    ]
+    for thread in probe_threads:
+        thread.start()
+
+    started = time.perf_counter()
+    if video_jobs:
+        with ThreadPoolExecutor(max_workers=video_jobs) as pool:
+            futures = [
+                pool.submit(client.post_file, "/api/v1/detect/video_analyze", args.video)
+                for _ in range(video_jobs)
+            ]
+            for future in futures:
+                status, _, latency = future.result()
+                video_latencies.append(latency)
+                if status != 200:
+                    errors.append(status)
+    remaining = duration - (time.perf_counter() - started)
+    if remaining > 0:
+        time.sleep(remaining)
+
+    stop.set()
+    for thread in probe_threads:
+        thread.join()
+
+    result = {"probe": latency_summary(latencies), "errors": errors}
+    if video_latencies:
+        result["video"] = latency_summary(video_latencies)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--video", required=True, help="Clip uploaded by each video job")
+    parser.add_argument("--video-jobs", type=int, default=2)
+    parser.add_argument("--probe", choices=["chat", "health"], default="chat")
+    parser.add_argument("--question", default="Triệu chứng của bệnh cầu trùng là gì?")
+    parser.add_argument("--probe-concurrency", type=int, default=4)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--baseline-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    client = ApiClient(args.base_url)
+    client.login(args.username, args.password)
+
+    report = {
+        "baseline": measure_phase(client, args, args.baseline_seconds, video_jobs=0),
+        "under_video_load": measure_phase(client, args, 0.0, video_jobs=args.video_jobs),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
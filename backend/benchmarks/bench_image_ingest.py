@@ -0,0 +1,118 @@
+"""
+Decode time and peak RSS of one upload: the previous full `cv2.imdecode`
+vs the ingest stage (header probe + caps + reduced DCT decode sized to the
+model input, `app/services/image_ingest.py`).
+
+Each (resolution, mode) case runs in a fresh subprocess so the peak RSS
+(VmHWM) only contains that decode; the increase over the RSS with the JPEG
+bytes already in memory is what one request costs.
+
+Usage:
+    python benchmarks/bench_image_ingest.py --megapixels 12 24 48 --runs 10
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import latency_summary  # noqa: E402
+from _memory import memory_mb  # noqa: E402
+
+MODES = ("full", "detection", "classification")
+
+
+def make_upload(path: str, megapixels: float):
+    from _synthetic import encode_jpeg, make_barn_frame
+
+    # Ảnh 4:3 như camera điện thoại
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5) // 16 * 16
+    height = width * 3 // 4
+    with open(path, "wb") as f:
+        f.write(encode_jpeg(make_barn_frame(0, width, height, birds=24), quality=92))
+
+
+def worker(path: str, mode: str, runs: int, detection_size: int, classification_size: int):
+    import cv2
+    import numpy as np
+
+    from app.services.image_ingest import check_image_limits, decode_image, probe_image
+
+    # Ảnh được tạo ở process cha: peak RSS của worker chỉ gồm phần decode
+    with open(path, "rb") as f:
+        data = f.read()
+    baseline = memory_mb()
+
+    timings, shape = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        if mode == "full":
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        else:
+            header = probe_image(data)
+            check_image_limits(header, 10 ** 9)
+            target, fit = (detection_size, "long") if mode == "detection" else (classification_size, "short")
+            image = decode_image(data, header, target, fit).image
+        timings.append(time.perf_counter() - started)
+        shape = image.shape
+        del image
+
+    peak = memory_mb()
+    print(json.dumps({
+        "upload_mb": round(len(data) / 1024 / 1024, 2),
+        "decoded_shape": list(shape),
+        "decoded_array_mb": round(np.prod(shape) / 1024 / 1024, 1),
+        "decode": latency_summary(timings),
+        "rss_before_decode_mb": baseline["rss_mb"],
+        "peak_rss_mb": peak["peak_rss_mb"],
+        "peak_rss_increase_mb": round(peak["peak_rss_mb"] - baseline["rss_mb"], 1)
+        if baseline["rss_mb"] is not None else None,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 24, 48])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--detection-size", type=int, default=640)
+    parser.add_argument("--classification-size", type=int, default=224)
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], args.worker[1], args.runs, args.detection_size, args.classification_size)
+        return
+
+    report = {"cpu_count": os.cpu_count(), "cases": {}}
+    workdir = tempfile.mkdtemp(prefix="bench_image_ingest_")
+    for megapixels in args.megapixels:
+        path = os.path.join(workdir, f"{megapixels:g}mp.jpg")
+        make_upload(path, megapixels)
+        for mode in args.modes:
+            command = [
+                sys.executable, __file__, "--worker", path, mode, "--runs", str(args.runs),
+                "--detection-size", str(args.detection_size), "--classification-size", str(args.classification_size)
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+            key = f"{megapixels:g}MP/{mode}"
+            if completed.returncode != 0 or not lines:
+                report["cases"][key] = {"error": (completed.stderr or completed.stdout).strip()[-500:]}
+            else:
+                report["cases"][key] = json.loads(lines[-1])
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
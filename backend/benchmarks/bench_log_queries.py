@@ -0,0 +1,183 @@
+"""
+Per-user and recent-log queries on large log tables, without and with the
+access-path indexes of migration f2a7d4c9b816.
+
+Seeds a throwaway SQLite database with `--rows` diagnosis, detection and
+usage logs each, spread over `--users` users and `--days` days, then runs the
+queries of `/users/me/history`, `/users/me/stats` (for one user) and
+`/admin/recent-logs`, plus the usage range scan of the rollup reconcile.
+They run first with only the primary-key indexes, then after creating the
+indexes declared on the models. Reported per query: median time and the `EXPLAIN`
+plan before / after. Point `DATABASE_URL` at a Postgres database to measure
+there (`EXPLAIN` instead of `EXPLAIN QUERY PLAN`).
+
+Usage:
+    python benchmarks/bench_log_queries.py --rows 1000000 --users 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_log_queries_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/bench.db")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import func, select, text  # noqa: E402
+
+from app.core import models  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+
+LOG_TABLES = [models.DiagnosisLog.__table__, models.DetectionLog.__table__, models.UsageLog.__table__]
+DISEASES = ["Healthy", "Healthy", "Healthy", "Coccidiosis", "Salmonella", "Newcastle"]
+
+
+def access_path_indexes():
+    """Indexes declared on the log models beyond the primary key ones"""
+    return [index for table in LOG_TABLES for index in table.indexes if index.name != f"ix_{table.name}_id"]
+
+
+def seed(rows: int, users: int, days: int, rng: random.Random):
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        for start in range(0, rows, 10000):
+            size = min(10000, rows - start)
+            owners = [rng.randint(1, users) for _ in range(size)]
+            stamps = [now - timedelta(seconds=rng.uniform(0, days * 86400)) for _ in range(size)]
+            conn.execute(models.DiagnosisLog.__table__.insert(), [
+                {"user_id": user, "image_path": "x.jpg", "predicted_disease": rng.choice(DISEASES),
+                 "confidence": rng.uniform(0.5, 1.0), "created_at": stamp}
+                for user, stamp in zip(owners, stamps)
+            ])
+            conn.execute(models.DetectionLog.__table__.insert(), [
+                {"user_id": user, "image_path": "x.jpg", "annotated_image_path": "detections/x_annotated.jpg",
+                 "total_chickens": 10, "healthy_count": 10, "sick_count": rng.choice([0, 0, 0, 1]), "created_at": stamp}
+                for user, stamp in zip(owners, stamps)
+            ])
+            conn.execute(models.UsageLog.__table__.insert(), [
+                {"user_id": user, "feature": "detection", "provider": "yolo", "model": "yolov8n",
+                 "total_tokens": 0, "created_at": stamp}
+                for user, stamp in zip(owners, stamps)
+            ])
+
+
+def endpoint_queries(db, user_id: int) -> dict:
+    """The statements the endpoints issue (`Query.count()` = count over a subquery)"""
+    diagnosis, detection = models.DiagnosisLog, models.DetectionLog
+
+    def count(query):
+        return select(func.count()).select_from(query.subquery())
+
+    user_diagnosis = db.query(diagnosis).filter(diagnosis.user_id == user_id)
+    user_detection = db.query(detection).filter(detection.user_id == user_id)
+    return {
+        "history_diagnosis": user_diagnosis.order_by(diagnosis.created_at.desc()).limit(50).statement,
+        "history_detection": user_detection.order_by(detection.created_at.desc()).limit(50).statement,
+        "stats_diagnosis_count": count(user_diagnosis),
+        "stats_diagnosis_sick": count(user_diagnosis.filter(diagnosis.predicted_disease != 'Healthy')),
+        "stats_avg_confidence": select(func.avg(diagnosis.confidence)).where(diagnosis.user_id == user_id),
+        "stats_detection_count": count(user_detection),
+        "stats_detection_sick": count(user_detection.filter(detection.sick_count > 0)),
+        "recent_diagnosis": db.query(diagnosis).order_by(diagnosis.created_at.desc()).limit(20).statement,
+        "recent_detection": db.query(detection).order_by(detection.created_at.desc()).limit(20).statement,
+        "usage_last_7_days": select(func.count(models.UsageLog.id)).where(
+            models.UsageLog.created_at >= datetime.now(timezone.utc) - timedelta(days=7)
+        ),
+    }
+
+
+def explain(db, statement) -> list:
+    conn = db.connection()
+    compiled = statement.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {compiled}", params)]
+
+
+def measure(db, user_id: int, repeat: int) -> dict:
+    result = {}
+    for name, statement in endpoint_queries(db, user_id).items():
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db.execute(statement).fetchall()
+            samples.append(time.perf_counter() - started)
+        result[name] = {"ms": round(statistics.median(samples) * 1000, 2), "plan": explain(db, statement)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Logs per table")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    try:
+        Base.metadata.create_all(bind=engine)
+        indexes = access_path_indexes()
+        for index in indexes:
+            index.drop(bind=engine)
+
+        started = time.perf_counter()
+        seed(args.rows, args.users, args.days, rng)
+        seed_seconds = round(time.perf_counter() - started, 1)
+
+        user_id = args.users // 2
+        db = SessionLocal()
+        try:
+            before = measure(db, user_id, args.repeat)
+        finally:
+            db.close()
+
+        started = time.perf_counter()
+        for index in indexes:
+            index.create(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        index_seconds = round(time.perf_counter() - started, 1)
+
+        db = SessionLocal()
+        try:
+            after = measure(db, user_id, args.repeat)
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    report = {
+        "rows_per_table": args.rows,
+        "users": args.users,
+        "seed_seconds": seed_seconds,
+        "create_indexes_seconds": index_seconds,
+        "indexes": [index.name for index in indexes],
+        "queries": {
+            name: {
+                "before_ms": before[name]["ms"],
+                "after_ms": after[name]["ms"],
+                "speedup": round(before[name]["ms"] / after[name]["ms"], 1) if after[name]["ms"] else None,
+                "plan_before": before[name]["plan"],
+                "plan_after": after[name]["plan"],
+            }
+            for name in before
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Per-worker memory and throughput of the multi-worker serving modes:
+
+- uvicorn: `uvicorn --workers N` (today): every worker imports the app and
+  loads its own YOLO / embedding models
+- gunicorn_per_worker: `gunicorn -c gunicorn.conf.py` with
+  PREFORK_PRELOAD_MODELS=false: imports shared by fork, models per worker
+- gunicorn_preload: models loaded once in the master, workers share the
+  weights copy-on-write (`app/services/preload.py`)
+
+Each mode starts a fresh server, waits for /ready, then reports RSS / PSS /
+private memory of every worker process (idle and after the load phase), the
+total PSS of the process tree and the `/detect` throughput of `--concurrency`
+clients during `--duration` seconds (result cache off, boxes mode).
+
+Linux only (reads /proc/<pid>/smaps_rollup). Usage (from backend/):
+    python benchmarks/bench_prefork_memory.py --workers 4 --concurrency 8 --duration 30
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import ApiClient, latency_summary  # noqa: E402
+from _memory import smaps_mb  # noqa: E402
+from _synthetic import encode_jpeg, make_barn_frame  # noqa: E402
+
+MODES = ("uvicorn", "gunicorn_per_worker", "gunicorn_preload")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode: str, port: int, workers: int):
+    if mode == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                "--port", str(port), "--workers", str(workers)]
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+
+
+def children(pid: int):
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            pids += [int(child) for child in f.read().split()]
+    return pids
+
+
+def worker_pids(master: int):
+    pids = []
+    for pid in children(master):
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        # multiprocessing resource tracker của uvicorn không phải worker
+        if "resource_tracker" not in cmdline:
+            pids.append(pid)
+    return pids
+
+
+def memory_report(master: int) -> dict:
+    workers = {pid: smaps_mb(pid) for pid in worker_pids(master)}
+    master_memory = smaps_mb(master)
+    count = max(1, len(workers))
+    return {
+        "master": master_memory,
+        "workers": len(workers),
+        "per_worker_avg": {
+            key: round(sum(memory[key] for memory in workers.values()) / count, 1)
+            for key in ("rss_mb", "pss_mb", "private_mb", "shared_mb")
+        },
+        "total_pss_mb": round(master_memory["pss_mb"] + sum(memory["pss_mb"] for memory in workers.values()), 1),
+    }
+
+
+def wait_ready(client: ApiClient, workers: int, timeout: float):
+    # /ready trả lời từ một worker bất kỳ: đợi liên tiếp đủ nhiều lần 200
+    deadline = time.time() + timeout
+    streak = 0
+    while time.time() < deadline:
+        try:
+            status, _, _ = client.get("/ready")
+        except OSError:
+            status = None
+        streak = streak + 1 if status == 200 else 0
+        if streak >= workers * 3:
+            return
+        time.sleep(0.1)
+    raise TimeoutError(f"not ready after {timeout}s")
+
+
+def load_phase(base_url: str, token: str, images, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def run(index: int):
+        client = ApiClient(base_url, token=token, timeout=120)
+        position = index
+        while time.perf_counter() < stop_at:
+            image = images[position % len(images)]
+            position += concurrency
+            status, _, latency = client.post_bytes("/api/v1/detect/detect?response_mode=boxes", "frame.jpg", image)
+            with lock:
+                (latencies if status == 200 else errors).append(latency if status == 200 else status)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency": latency_summary(latencies),
+    }
+
+
+def run_mode(mode: str, args, images) -> dict:
+    port = free_port()
+    env = dict(
+        os.environ,
+        WEB_WORKERS=str(args.workers),
+        PREFORK_PRELOAD_MODELS="true" if mode == "gunicorn_preload" else "false",
+        RESULT_CACHE_ENABLED="false",
+    )
+    server = subprocess.Popen(
+        server_command(mode, port, args.workers), cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        client = ApiClient(base_url, timeout=30)
+        started = time.perf_counter()
+        wait_ready(client, args.workers, args.timeout)
+        result = {"ready_seconds": round(time.perf_counter() - started, 2), "idle": memory_report(server.pid)}
+        token = client.login(args.username, args.password)
+        result["load"] = load_phase(base_url, token, images, args.concurrency, args.duration)
+        result["after_load"] = memory_report(server.pid)
+        return result
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--username", default="admin@gmail.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    images = [encode_jpeg(make_barn_frame(index, 960, 540, seed=index)) for index in range(32)]
+    report = {"cpu_count": os.cpu_count(), "workers": args.workers, "modes": {}}
+    for mode in args.modes:
+        try:
+            report["modes"][mode] = run_mode(mode, args, images)
+        except Exception as e:
+            report["modes"][mode] = {"error": str(e)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
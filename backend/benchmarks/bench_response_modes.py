@@ -0,0 +1,146 @@
+"""
+Server CPU and bytes on the wire of `/detect` per response mode:
+
+- full:  draw boxes -> JPEG encode -> write annotated file -> base64 -> JSON
+- boxes: JSON with the boxes and `annotated_image_url` only
+
+Inference, decoding and saving the original are the same in both modes and are
+left out, so the numbers are the per-request work the mode itself adds. The
+cost of the lazy render (`GET /detect/annotated/{id}.jpg`, first hit only) is
+reported separately: it is only paid for the images a client actually opens.
+
+Usage:
+    python benchmarks/bench_response_modes.py --images 50 --width 1920 --height 1080 --boxes 24
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Ảnh của benchmark ghi vào thư mục tạm, không đụng uploads/ thật
+os.environ["UPLOAD_DIR"] = tempfile.mkdtemp(prefix="bench_response_modes_")
+os.makedirs(os.path.join(os.environ["UPLOAD_DIR"], "detections"), exist_ok=True)
+
+import numpy as np  # noqa: E402
+
+from _client import latency_summary  # noqa: E402
+from _synthetic import encode_jpeg, make_barn_frame  # noqa: E402
+from app.schema.detection import DetectionBox, DetectionResponse  # noqa: E402
+from app.services.annotated_images import annotated_image_url, annotated_rel_path, load_or_render  # noqa: E402
+
+
+def synthetic_detections(count: int, width: int, height: int, seed: int) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    detections = []
+    for index in range(count):
+        x1, y1 = rng.uniform(0, width - 120), rng.uniform(0, height - 100)
+        detections.append({
+            "id": index + 1,
+            "class": "sickChicken" if index % 5 == 0 else "healthyChicken",
+            "confidence": round(float(rng.uniform(0.3, 0.99)), 3),
+            "bbox": [round(float(v), 2) for v in (x1, y1, x1 + rng.uniform(60, 120), y1 + rng.uniform(50, 100))],
+        })
+    return detections
+
+
+def response_body(detections: List[Dict], image_base64, url: str) -> bytes:
+    sick = sum(1 for d in detections if d["class"] == "sickChicken")
+    return DetectionResponse(
+        total_chickens=len(detections),
+        healthy_count=len(detections) - sick,
+        sick_count=sick,
+        detections=[DetectionBox(id=d["id"], class_name=d["class"], confidence=d["confidence"], bbox=d["bbox"])
+                    for d in detections],
+        has_sick_chickens=sick > 0,
+        alert=None,
+        image_base64=image_base64,
+        annotated_image_url=url,
+    ).model_dump_json().encode()
+
+
+def measure(step: Callable[[int], bytes], count: int) -> Dict:
+    """CPU seconds (process_time, all threads) and wall time of `step` per request"""
+    cpu, wall, sizes = [], [], []
+    for index in range(count):
+        c, t = time.process_time(), time.perf_counter()
+        body = step(index)
+        cpu.append(time.process_time() - c)
+        wall.append(time.perf_counter() - t)
+        sizes.append(len(body))
+    return {
+        "cpu_ms_per_request": round(sum(cpu) / count * 1000, 2),
+        "wall": latency_summary(wall),
+        "response_bytes_mean": int(sum(sizes) / count),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--boxes", type=int, default=24)
+    args = parser.parse_args()
+
+    import base64
+    import cv2
+
+    frames, uploads, detections = [], [], []
+    for index in range(args.images):
+        frame = make_barn_frame(index, args.width, args.height, birds=args.boxes, seed=index)
+        upload = encode_jpeg(frame)
+        # Ảnh gốc đã lưu sẵn (cả hai mode đều ghi), cần cho lần render lười
+        file_id = str(uuid.uuid4())
+        orig_rel_path = os.path.join("detections", f"{file_id}_orig.jpg")
+        with open(os.path.join(os.environ["UPLOAD_DIR"], orig_rel_path), "wb") as f:
+            f.write(upload)
+        frames.append((cv2.imdecode(np.frombuffer(upload, np.uint8), cv2.IMREAD_COLOR), file_id, orig_rel_path))
+        uploads.append(len(upload))
+        detections.append(synthetic_detections(args.boxes, args.width, args.height, seed=index))
+
+    def full(index: int) -> bytes:
+        image, file_id, orig_rel_path = frames[index]
+        annot_rel_path = annotated_rel_path(file_id)
+        buffer = load_or_render(orig_rel_path, annot_rel_path, detections[index], image)
+        return response_body(detections[index], base64.b64encode(buffer).decode("utf-8"),
+                             annotated_image_url(annot_rel_path))
+
+    def boxes(index: int) -> bytes:
+        _, file_id, _ = frames[index]
+        return response_body(detections[index], None, annotated_image_url(annotated_rel_path(file_id)))
+
+    def lazy_first_get(index: int) -> bytes:
+        _, file_id, orig_rel_path = frames[index]
+        annot_path = annotated_rel_path(file_id)
+        os.remove(os.path.join(os.environ["UPLOAD_DIR"], annot_path))  # do mode full ở trên đã ghi
+        return load_or_render(orig_rel_path, annot_path, detections[index])
+
+    report = {
+        "images": args.images,
+        "resolution": f"{args.width}x{args.height}",
+        "boxes_per_image": args.boxes,
+        "upload_bytes_mean": int(sum(uploads) / len(uploads)),
+        "full": measure(full, args.images),
+        "boxes": measure(boxes, args.images),
+        "lazy_annotated_first_get": measure(lazy_first_get, args.images),
+    }
+    report["bytes_saved_per_request"] = report["full"]["response_bytes_mean"] - report["boxes"]["response_bytes_mean"]
+    report["cpu_ms_saved_per_request"] = round(
+        report["full"]["cpu_ms_per_request"] - report["boxes"]["cpu_ms_per_request"], 2
+    )
+    print(json.dumps(report, indent=2))
+    shutil.rmtree(os.environ["UPLOAD_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
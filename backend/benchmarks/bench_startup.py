@@ -0,0 +1,113 @@
+"""
+Backend startup time: serial blocking initialization (the previous behaviour,
+STARTUP_PARALLEL=false, no warm-up) vs background parallel initialization with
+warm-up (STARTUP_PARALLEL=true, STARTUP_WARMUP=true).
+
+For each mode a fresh `uvicorn app.main:app` is started and the script reports:
+- seconds until the port accepts connections and `/health` answers (liveness)
+- seconds until `/ready` returns 200 (readiness) and the per-component timings
+- latency of the first and of the following `/api/v1/detect/detect` requests
+  (warm-up should make the first one as fast as the rest)
+
+Uses the environment of the current shell (DATABASE_URL, model paths...);
+the seeded admin account logs in for the detect requests.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py --modes serial parallel --requests 5
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import ApiClient, latency_summary  # noqa: E402
+from _synthetic import encode_jpeg, make_barn_frame  # noqa: E402
+
+MODES = {
+    "serial": {"STARTUP_PARALLEL": "false", "STARTUP_WARMUP": "false"},
+    "parallel": {"STARTUP_PARALLEL": "true", "STARTUP_WARMUP": "true"},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client: ApiClient, path: str, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            status, _, _ = client.get(path)
+            if status == 200:
+                return round(time.perf_counter() - started, 2)
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{path} not 200 after {timeout}s")
+
+
+def run_mode(mode: str, args) -> dict:
+    port = free_port()
+    env = dict(os.environ, **MODES[mode])
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        client = ApiClient(f"http://127.0.0.1:{port}", timeout=60)
+        result = {
+            "health_seconds": wait_for(client, "/health", started, args.timeout),
+            "ready_seconds": wait_for(client, "/ready", started, args.timeout),
+        }
+        _, body, _ = client.get("/ready")
+        result["components"] = {
+            name: component["seconds"] for name, component in json.loads(body)["components"].items()
+        }
+
+        client.login(args.username, args.password)
+        latencies = []
+        for index in range(args.requests):
+            # Ảnh khác nhau mỗi lần để result cache không trả lời thay model
+            image = encode_jpeg(make_barn_frame(index, 1280, 720, seed=index))
+            status, _, latency = client.post_bytes("/api/v1/detect/detect?response_mode=boxes", f"{index}.jpg", image)
+            if status != 200:
+                raise RuntimeError(f"/detect returned {status}")
+            latencies.append(latency)
+        result["first_detect_ms"] = round(latencies[0] * 1000, 1)
+        result["following_detects"] = latency_summary(latencies[1:])
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--username", default="admin@gmail.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    report = {}
+    for mode in args.modes:
+        try:
+            report[mode] = run_mode(mode, args)
+        except Exception as e:
+            report[mode] = {"error": str(e)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
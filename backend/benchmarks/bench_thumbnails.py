@@ -0,0 +1,85 @@
+"""
+Bytes a history screen downloads and what the derivatives cost to render.
+
+Builds `--rows` synthetic phone photos (4:3 JPEG, `--megapixels`) with boxes,
+renders their thumbnail and preview with `render_derivatives` (the background
+worker / backfill code path) and reports, per screen of `--rows` entries:
+total bytes of the full-size originals vs the thumbnails vs the previews,
+plus render latency per image.
+
+Usage:
+    python benchmarks/bench_thumbnails.py --rows 20 --megapixels 12
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_thumbs_")
+os.environ["UPLOAD_DIR"] = WORK_DIR
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import latency_summary  # noqa: E402
+from _synthetic import encode_jpeg, make_barn_frame  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.services.derivatives import render_derivatives  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20, help="Entries on one history screen")
+    parser.add_argument("--megapixels", type=float, default=12)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    width = int((args.megapixels * 1e6 * 4 / 3) ** 0.5) // 16 * 16
+    height = width * 3 // 4
+    detections = [
+        {"id": index, "class": "sickChicken" if index % 5 == 0 else "healthyChicken", "confidence": 0.8,
+         "bbox": [width * 0.04 * index, height * 0.3, width * 0.04 * index + width * 0.05, height * 0.4]}
+        for index in range(20)
+    ]
+
+    try:
+        os.makedirs(os.path.join(WORK_DIR, "detections"))
+        full_bytes, thumb_bytes, preview_bytes, timings = 0, 0, 0, []
+        for row in range(args.rows):
+            rel_path = os.path.join("detections", f"{row}.jpg")
+            data = encode_jpeg(make_barn_frame(row, width, height, birds=24, seed=row), quality=92)
+            with open(os.path.join(WORK_DIR, rel_path), "wb") as f:
+                f.write(data)
+            full_bytes += len(data)
+
+            started = time.perf_counter()
+            paths = render_derivatives(rel_path, rel_path, detections)
+            timings.append(time.perf_counter() - started)
+            thumb_bytes += os.path.getsize(os.path.join(WORK_DIR, paths["thumb"]))
+            preview_bytes += os.path.getsize(os.path.join(WORK_DIR, paths["preview"]))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    mb = 1024 * 1024
+    print(json.dumps({
+        "rows": args.rows,
+        "image": f"{width}x{height}",
+        "format": settings.derivative_format,
+        "sizes": {"thumb": settings.thumbnail_max_side, "preview": settings.preview_max_side},
+        "screen_mb": {
+            "full_size": round(full_bytes / mb, 2),
+            "thumbnails": round(thumb_bytes / mb, 3),
+            "previews": round(preview_bytes / mb, 2),
+        },
+        "render_ms": latency_summary(timings),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Speed / recall tradeoff of tiled detection on dense, high-resolution frames.
+
+A synthetic wide-angle barn frame with many small birds (the generator knows
+how many) goes through a single 640-px pass and through tiled inference
+(`YOLOService._detect_tiled_sync`) for each `--max-tiles` / `--overlap`
+combination. Reported per case: wall time, tiles, latency per tile and the
+number of chickens found against the number drawn. Use `--image` to run on a
+real photo instead (no expected count then).
+
+Usage:
+    python benchmarks/bench_tiled_detection.py --width 3840 --height 2160 --birds 300 \\
+        --max-tiles 4 9 16 --overlap 0.1 0.2 --runs 3
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _client import latency_summary  # noqa: E402
+from _synthetic import make_barn_frame  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.services.yolo_service import YOLOService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="Real photo to use instead of the synthetic frame")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--birds", type=int, default=300)
+    parser.add_argument("--max-tiles", type=int, nargs="+", default=[4, 9, 16])
+    parser.add_argument("--overlap", type=float, nargs="+", default=[0.1, 0.2])
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.image:
+        image, expected = cv2.imread(args.image), None
+        if image is None:
+            parser.error(f"Could not read {args.image}")
+    else:
+        image, expected = make_barn_frame(0, args.width, args.height, birds=args.birds), args.birds
+
+    settings = get_settings()
+    service = YOLOService()
+    if service.detection_model is None:
+        print(json.dumps({"error": "detection model not found"}))
+        return
+    service._detect_batch_sync([image], args.conf)  # warm-up
+
+    def run(step):
+        timings, summary = [], None
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            summary = step()
+            timings.append(time.perf_counter() - started)
+        return timings, summary
+
+    timings, summary = run(lambda: service._detect_batch_sync([image], args.conf)[0])
+    report = {
+        "image": f"{image.shape[1]}x{image.shape[0]}",
+        "expected_chickens": expected,
+        "single_pass": {"latency": latency_summary(timings), "chickens": summary["total_chickens"]},
+        "tiled": {},
+    }
+
+    for max_tiles in args.max_tiles:
+        for overlap in args.overlap:
+            settings.detection_tile_max_tiles = max_tiles
+            settings.detection_tile_overlap = overlap
+            timings, summary = run(lambda: service._detect_tiled_sync(image, args.conf))
+            tiling = {key: value for key, value in summary["tiling"].items() if key != "per_tile"}
+            report["tiled"][f"max_tiles={max_tiles},overlap={overlap:g}"] = {
+                "latency": latency_summary(timings),
+                "chickens": summary["total_chickens"],
+                "recall_vs_drawn": round(summary["total_chickens"] / expected, 3) if expected else None,
+                **tiling,
+            }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
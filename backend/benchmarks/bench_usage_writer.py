@@ -0,0 +1,120 @@
+"""
+Usage-log metering: one session + commit per call vs the batched background writer.
+
+Fires `--events` `usage_service.log_usage` calls from `--threads` threads (the
+request path: endpoints, `asyncio.to_thread` workers) against a throwaway
+SQLite database, first with the writer stopped (every call writes its row,
+the old behaviour), then started. Reported: caller-side latency of
+`log_usage`, database transactions and INSERT statements, rows written and
+the writer counters (flushes, dropped). Point `DATABASE_URL` at a Postgres
+database to measure there instead.
+
+Usage:
+    python benchmarks/bench_usage_writer.py --events 5000 --threads 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_usage_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/bench.db")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sqlalchemy import event  # noqa: E402
+
+from _client import latency_summary  # noqa: E402
+
+from app.core import models  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.services.usage_service import usage_service  # noqa: E402
+
+statements = {"transactions": 0, "inserts": 0}
+
+
+@event.listens_for(engine, "commit")
+def _count_commit(conn):
+    statements["transactions"] += 1
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_insert(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("INSERT INTO USAGE_LOGS"):
+        statements["inserts"] += 1
+
+
+def fire(events: int, threads: int):
+    latencies = []
+
+    def call(index: int):
+        started = time.perf_counter()
+        usage_service.log_usage(
+            feature="detection", provider="yolo", model="yolov8n", user_id=None,
+            tokens_prompt=index % 7, tokens_completion=index % 3
+        )
+        latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(events)))
+    return latencies
+
+
+async def run_mode(buffered: bool, events: int, threads: int) -> dict:
+    db = SessionLocal()
+    rows_before = db.query(models.UsageLog).count()
+    db.close()
+    statements.update(transactions=0, inserts=0)
+
+    if buffered:
+        await usage_service.start()
+    started = time.perf_counter()
+    latencies = await asyncio.to_thread(fire, events, threads)
+    calls_seconds = time.perf_counter() - started
+    if buffered:
+        await usage_service.stop()
+    total_seconds = time.perf_counter() - started
+
+    db = SessionLocal()
+    rows = db.query(models.UsageLog).count() - rows_before
+    db.close()
+    return {
+        "mode": "buffered" if buffered else "per_call_commit",
+        "events": events,
+        "rows_written": rows,
+        "calls_seconds": round(calls_seconds, 3),
+        "until_persisted_seconds": round(total_seconds, 3),
+        "log_usage_latency": latency_summary(latencies),
+        "transactions": statements["transactions"],
+        "insert_statements": statements["inserts"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent callers")
+    args = parser.parse_args()
+
+    try:
+        Base.metadata.create_all(bind=engine)
+        report = [
+            asyncio.run(run_mode(buffered, args.events, args.threads))
+            for buffered in (False, True)
+        ]
+        report[1]["writer"] = usage_service.metrics()
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
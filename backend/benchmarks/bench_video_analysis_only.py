@@ -0,0 +1,118 @@
+"""
+CPU cost of `process_video` with the annotated output video vs
+`analysis_only` (skipped frames only grabbed, no resize / drawing / encoding,
+detections written to an NDJSON sidecar).
+
+A synthetic 1080p clip is generated unless `--video` is given. Reported per
+mode: wall time, process CPU time (all pipeline threads), the part of it
+spent in the detector, the rest (video I/O), output bytes and whether the
+statistics match.
+
+Usage:
+    DATABASE_URL=sqlite:///./bench.db python benchmarks/bench_video_analysis_only.py --frames 600
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _synthetic import write_synthetic_clip  # noqa: E402
+from app.services.video_preview import preview_path  # noqa: E402
+from app.services.video_sidecar import sidecar_path  # noqa: E402
+from app.services.yolo_service import YOLOService  # noqa: E402
+
+STAT_KEYS = ("total_frames", "processed_frames", "max_total_chickens", "max_sick_chickens", "avg_sick_chickens")
+
+
+class DetectorClock:
+    """Wrap `_detect_frames` to add up the CPU time spent in the detector"""
+
+    def __init__(self, service: YOLOService):
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        detect = service._detect_frames
+
+        def timed(frames, conf_threshold):
+            started = time.thread_time()
+            try:
+                return detect(frames, conf_threshold)
+            finally:
+                with self._lock:
+                    self.seconds += time.thread_time() - started
+
+        service._detect_frames = timed
+
+
+def run_mode(service: YOLOService, clock: DetectorClock, video: str, workdir: str, analysis_only: bool) -> dict:
+    output = os.path.join(workdir, f"{'analysis' if analysis_only else 'full'}_output.mp4")
+    clock.seconds = 0.0
+    wall, cpu = time.perf_counter(), time.process_time()
+    stats = service._process_video_sync(
+        video, output, conf_threshold=0.3, skip_frames=3, sampling_mode="fixed", analysis_only=analysis_only
+    )
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    files = [sidecar_path(output) if analysis_only else output]
+    if stats["preview"]:
+        files.append(preview_path(output, stats["preview"]["format"]))
+    result = {
+        "wall_seconds": round(wall, 2),
+        "cpu_seconds": round(cpu, 2),
+        "detector_cpu_seconds": round(clock.seconds, 2),
+        "video_io_cpu_seconds": round(cpu - clock.seconds, 2),
+        "output_bytes": sum(os.path.getsize(path) for path in files if os.path.exists(path)),
+        "stats": {key: stats[key] for key in STAT_KEYS},
+    }
+    if not analysis_only and not os.path.exists(output):
+        # Bản OpenCV không có encoder H.264: frame vẫn được vẽ nhưng không encode -> chi phí thật còn cao hơn
+        result["note"] = "no avc1 encoder in this OpenCV build, encode cost not included"
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="Existing clip (default: generate a synthetic one)")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    service = YOLOService()
+    if service.detection_model is None:
+        sys.exit("Detection model not found, set DETECTION_MODEL_PATH")
+    clock = DetectorClock(service)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        video = args.video or write_synthetic_clip(
+            os.path.join(workdir, "synthetic.mp4"), args.frames, args.width, args.height
+        )
+        # Warm up model / codecs so the first timed run is not penalized
+        run_mode(service, clock, video, workdir, analysis_only=True)
+
+        full = run_mode(service, clock, video, workdir, analysis_only=False)
+        analysis = run_mode(service, clock, video, workdir, analysis_only=True)
+
+    report = {
+        "cpu_count": os.cpu_count(),
+        "clip": args.video or f"synthetic {args.width}x{args.height}, {args.frames} frames",
+        "full": full,
+        "analysis_only": analysis,
+        "cpu_speedup": round(full["cpu_seconds"] / max(analysis["cpu_seconds"], 1e-9), 2),
+        "video_io_cpu_speedup": round(
+            full["video_io_cpu_seconds"] / max(analysis["video_io_cpu_seconds"], 1e-9), 2
+        ),
+        "stats_identical": full["stats"] == analysis["stats"],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
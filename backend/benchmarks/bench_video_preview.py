@@ -0,0 +1,127 @@
+"""
+Animated preview of a video report: the previous GIF (first 60 processed
+frames kept in a list, `imageio.mimsave` at the end on the calling thread)
+vs `PreviewWriter` (frames spread over the whole clip, encoded one by one on
+its own thread) as GIF and as a short MP4 clip.
+
+Frames come from a synthetic 640-px clip, as the pipeline's encode stage sees
+them. Reported per mode: peak Python heap while collecting + encoding
+(tracemalloc), wall time to a finished file, encode time, preview bytes
+and the share of the clip the preview covers.
+
+Usage:
+    python benchmarks/bench_video_preview.py --frames 1800
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import imageio
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from _synthetic import write_synthetic_clip  # noqa: E402
+
+from app.services.video_preview import PreviewWriter, preview_stride  # noqa: E402
+
+MAX_FRAMES = 60
+WIDTH = 320
+FPS = 8
+SKIP_FRAMES = 3
+
+
+def read_frames(path: str) -> List[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, (640, frame.shape[0] * 640 // frame.shape[1])))
+    cap.release()
+    return frames
+
+
+def legacy(frames: List[np.ndarray], out_path: str) -> Dict:
+    # Như bản cũ: frame được infer (1/(skip_frames+1)) cho tới khi đủ 60, mimsave ở cuối
+    gif_frames, last_index = [], 0
+    started = time.perf_counter()
+    for index, frame in enumerate(frames):
+        if index % (SKIP_FRAMES + 1) == 0 and len(gif_frames) < MAX_FRAMES:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            height, width = rgb.shape[:2]
+            gif_frames.append(cv2.resize(rgb, (WIDTH, int(height * WIDTH / width))))
+            last_index = index
+    collect_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    imageio.mimsave(out_path, gif_frames, fps=FPS, loop=0)
+    encode_seconds = time.perf_counter() - started
+    return {
+        "wall_ms": round((collect_seconds + encode_seconds) * 1000, 1),
+        "encode_ms": round(encode_seconds * 1000, 1),
+        "bytes": os.path.getsize(out_path),
+        "coverage": round((last_index + 1) / len(frames), 3),
+    }
+
+
+def streamed(frames: List[np.ndarray], out_path: str, preview_format: str) -> Dict:
+    stride = preview_stride(len(frames), 30, MAX_FRAMES, FPS)
+    writer = PreviewWriter(out_path, preview_format, width=WIDTH, fps=FPS, max_frames=MAX_FRAMES)
+    next_index, last_index = 0, 0
+    started = time.perf_counter()
+    for index, frame in enumerate(frames):
+        if index >= next_index and not writer.full:
+            writer.add(frame)
+            next_index, last_index = index + stride, index
+    report = writer.close()
+    elapsed = time.perf_counter() - started
+    return {
+        "wall_ms": round(elapsed * 1000, 1),
+        "encode_ms": report["encode_ms"],
+        "codec": report["codec"],
+        "bytes": report["bytes"],
+        "coverage": round((last_index + 1) / len(frames), 3),
+    }
+
+
+def measure(run) -> Dict:
+    tracemalloc.start()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {**result, "peak_heap_mb": round(peak / (1024 * 1024), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=1800, help="Clip length in frames (30 fps)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_preview_")
+    try:
+        clip = os.path.join(work_dir, "clip.mp4")
+        write_synthetic_clip(clip, frames=args.frames)
+        frames = read_frames(clip)
+        results = {
+            "legacy_gif": measure(lambda: legacy(frames, os.path.join(work_dir, "legacy.gif"))),
+            "streamed_gif": measure(lambda: streamed(frames, os.path.join(work_dir, "streamed.gif"), "gif")),
+            "streamed_mp4": measure(lambda: streamed(frames, os.path.join(work_dir, "streamed.mp4"), "mp4")),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(json.dumps({"frames": len(frames), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Multi-worker serving mode:
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app and the models are loaded once in the master (`preload_app`,
+`app/services/preload.py`), then the uvicorn workers fork and share the
+weights, the torch runtime and the imported modules copy-on-write instead of
+each loading its own copy. WEB_WORKERS / PREFORK_PRELOAD_MODELS /
+WORKER_TORCH_THREADS are read from the app settings.
+"""
+
+import multiprocessing
+import os
+
+from app.config import get_settings
+
+settings = get_settings()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = settings.web_workers or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Chạy trong master sau khi import app, trước khi fork worker đầu tiên
+    from app.services.preload import freeze_heap, preload_models
+
+    if settings.prefork_preload_models:
+        preload_models()
+    freeze_heap()
+
+
+def post_fork(server, worker):
+    from app.services.preload import configure_worker
+    configure_worker(workers)
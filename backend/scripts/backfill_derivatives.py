@@ -0,0 +1,89 @@
+"""
+Render the thumbnail / preview of detection and diagnosis logs saved before
+the derivative pipeline existed, or skipped while its queue was full.
+
+Rows are processed newest first (what the history screens show), in batches,
+with `--workers` threads; each row is rendered and committed on its own
+session so the script can be stopped and resumed at any time. `--force`
+re-renders rows that already have derivatives, e.g. after changing
+THUMBNAIL_MAX_SIDE / PREVIEW_MAX_SIDE / DERIVATIVE_FORMAT (new sizes get new
+file names, old files are left in place).
+
+Usage (from backend/):
+    python scripts/backfill_derivatives.py --kind all --workers 2
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.services.derivatives import LOG_MODELS, generate_for_log  # noqa: E402
+
+
+def pending_ids(kind: str, force: bool, limit: int, after_id: int) -> List[int]:
+    model = LOG_MODELS[kind]
+    db = SessionLocal()
+    try:
+        query = db.query(model.id)
+        if not force:
+            query = query.filter(model.thumbnail_path.is_(None))
+        if after_id:
+            query = query.filter(model.id < after_id)
+        return [row.id for row in query.order_by(model.id.desc()).limit(limit)]
+    finally:
+        db.close()
+
+
+def render(kind: str, log_id: int) -> str:
+    try:
+        return "rendered" if generate_for_log(kind, log_id) is not None else "missing"
+    except Exception as e:
+        print(f"{kind} log {log_id}: {e}", file=sys.stderr)
+        return "failed"
+
+
+def backfill(kind: str, force: bool, workers: int, batch_size: int, limit: int) -> Dict:
+    counts = {"rendered": 0, "missing": 0, "failed": 0}
+    started = time.perf_counter()
+    # Đi theo id giảm dần thay vì lọc lại "chưa có thumbnail": dòng lỗi / mất ảnh gốc không bị lấy lại mãi
+    after_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            size = batch_size if not limit else min(batch_size, limit - sum(counts.values()))
+            if size <= 0:
+                break
+            ids = pending_ids(kind, force, size, after_id)
+            if not ids:
+                break
+            for outcome in pool.map(lambda log_id: render(kind, log_id), ids):
+                counts[outcome] += 1
+            after_id = ids[-1]
+            print(f"{kind}: {sum(counts.values())} rows, last id {after_id}", file=sys.stderr)
+    return {**counts, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", choices=["detection", "diagnosis", "all"], default="all")
+    parser.add_argument("--workers", type=int, default=2, help="Render threads")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=0, help="Max rows per kind (0 = all)")
+    parser.add_argument("--force", action="store_true", help="Re-render rows that already have derivatives")
+    args = parser.parse_args()
+
+    kinds = list(LOG_MODELS) if args.kind == "all" else [args.kind]
+    report = {kind: backfill(kind, args.force, args.workers, args.batch_size, args.limit) for kind in kinds}
+    print(json.dumps(report, indent=2))
+    if any(result["failed"] for result in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Accuracy parity of an exported backend against the PyTorch weights.
+
+Runs the same images through the torch model and the ONNX Runtime / OpenVINO
+artifact and compares the filtered detections the API would return:
+- detection: same-class boxes matched by IoU, recall / precision of the backend
+  against torch, mean IoU of the matches and the largest confidence gap
+- classification: top-1 agreement and the largest probability gap
+
+Exits non-zero when a gate is not met, so it can run in CI after an export.
+
+Usage (from backend/):
+    python scripts/check_backend_parity.py --backend onnxruntime --images path/to/val/images
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from app.config import get_settings  # noqa: E402
+from app.services.box_geometry import pairwise_box_metrics  # noqa: E402
+from app.services.model_backends import EXPORT_FORMATS, load_model  # noqa: E402
+from app.services.tracker import greedy_match  # noqa: E402
+from app.services.yolo_service import YOLOService  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def load_images(folder: str, limit: int) -> List[np.ndarray]:
+    if folder:
+        paths = sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)[:limit]
+        images = [cv2.imread(str(p)) for p in paths]
+        return [image for image in images if image is not None]
+
+    # Không có ảnh thật -> dùng frame tổng hợp (chỉ kiểm tra được tính nhất quán số học)
+    from _synthetic import make_barn_frame
+    return [make_barn_frame(index * 7, seed=index) for index in range(limit)]
+
+
+def compare_detections(reference: List[Dict], candidate: List[Dict], match_iou: float) -> Dict:
+    matched = 0
+    ious, conf_gaps = [], []
+    for class_name in {d["class_name"] for d in reference + candidate}:
+        ref = [d for d in reference if d["class_name"] == class_name]
+        cand = [d for d in candidate if d["class_name"] == class_name]
+        if not ref or not cand:
+            continue
+        _, iou, _ = pairwise_box_metrics(
+            np.array([d["bbox"] for d in ref]), np.array([d["bbox"] for d in cand])
+        )
+        for row, col in greedy_match(iou, match_iou):
+            matched += 1
+            ious.append(float(iou[row, col]))
+            conf_gaps.append(abs(ref[row]["confidence"] - cand[col]["confidence"]))
+    return {"reference": len(reference), "candidate": len(candidate), "matched": matched,
+            "ious": ious, "conf_gaps": conf_gaps}
+
+
+def check_detection(backend: str, images: List[np.ndarray], conf: float, match_iou: float) -> Dict:
+    settings = get_settings()
+    reference_model = load_model(settings.detection_model_path, "torch", task="detect")
+    backend_model = load_model(settings.detection_model_path, backend, task="detect")
+    if reference_model is None or backend_model is None:
+        return {"skipped": "model or exported artifact not found"}
+
+    totals = {"reference": 0, "candidate": 0, "matched": 0, "ious": [], "conf_gaps": []}
+    for image in images:
+        reference = YOLOService._filtered_detections(reference_model(image, conf=conf, iou=0.45, verbose=False)[0])
+        candidate = YOLOService._filtered_detections(backend_model(image, conf=conf, iou=0.45, verbose=False)[0])
+        stats = compare_detections(reference, candidate, match_iou)
+        for key in totals:
+            totals[key] += stats[key]
+
+    return {
+        "images": len(images),
+        "torch_boxes": totals["reference"],
+        "backend_boxes": totals["candidate"],
+        "recall": round(totals["matched"] / totals["reference"], 4) if totals["reference"] else 1.0,
+        "precision": round(totals["matched"] / totals["candidate"], 4) if totals["candidate"] else 1.0,
+        "mean_iou": round(float(np.mean(totals["ious"])), 4) if totals["ious"] else None,
+        "max_conf_gap": round(float(np.max(totals["conf_gaps"])), 4) if totals["conf_gaps"] else 0.0,
+    }
+
+
+def check_classification(backend: str, images: List[np.ndarray]) -> Dict:
+    settings = get_settings()
+    reference_model = load_model(settings.classification_model_path, "torch", task="classify")
+    backend_model = load_model(settings.classification_model_path, backend, task="classify")
+    if reference_model is None or backend_model is None:
+        return {"skipped": "model or exported artifact not found"}
+
+    agree, prob_gaps = 0, []
+    for image in images:
+        reference = reference_model(image, verbose=False)[0].probs
+        candidate = backend_model(image, verbose=False)[0].probs
+        agree += int(reference.top1 == candidate.top1)
+        prob_gaps.append(float(np.max(np.abs(
+            reference.data.cpu().numpy() - np.asarray(candidate.data.cpu().numpy())
+        ))))
+
+    return {
+        "images": len(images),
+        "top1_agreement": round(agree / len(images), 4) if images else 1.0,
+        "max_prob_gap": round(max(prob_gaps), 4) if prob_gaps else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=sorted(EXPORT_FORMATS), required=True)
+    parser.add_argument("--images", help="Folder of validation images (default: synthetic frames)")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--match-iou", type=float, default=0.9)
+    parser.add_argument("--min-recall", type=float, default=0.98)
+    parser.add_argument("--min-precision", type=float, default=0.98)
+    parser.add_argument("--max-conf-gap", type=float, default=0.02)
+    parser.add_argument("--min-top1-agreement", type=float, default=0.99)
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    report = {
+        "backend": args.backend,
+        "detection": check_detection(args.backend, images, args.conf, args.match_iou),
+        "classification": check_classification(args.backend, images),
+    }
+
+    failures = []
+    detection, classification = report["detection"], report["classification"]
+    if "skipped" not in detection:
+        if detection["recall"] < args.min_recall:
+            failures.append(f"detection recall {detection['recall']} < {args.min_recall}")
+        if detection["precision"] < args.min_precision:
+            failures.append(f"detection precision {detection['precision']} < {args.min_precision}")
+        if detection["max_conf_gap"] > args.max_conf_gap:
+            failures.append(f"detection confidence gap {detection['max_conf_gap']} > {args.max_conf_gap}")
+    if "skipped" not in classification and classification["top1_agreement"] < args.min_top1_agreement:
+        failures.append(f"classification top-1 agreement {classification['top1_agreement']} < {args.min_top1_agreement}")
+
+    report["passed"] = not failures
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
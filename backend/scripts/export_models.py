@@ -0,0 +1,54 @@
+"""
+Export the detection / classification `.pt` weights for the CPU inference backends.
+
+Artifacts are written next to the weights, where `INFERENCE_BACKEND` looks for them:
+    model_store/detection_best.onnx
+    model_store/detection_best_openvino_model/
+
+Usage (from backend/):
+    python scripts/export_models.py --backend onnxruntime openvino
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import get_settings  # noqa: E402
+from app.services.model_backends import EXPORT_FORMATS, export_model  # noqa: E402
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", nargs="+", choices=sorted(EXPORT_FORMATS), default=sorted(EXPORT_FORMATS))
+    parser.add_argument("--detection", default=settings.detection_model_path)
+    parser.add_argument("--classification", default=settings.classification_model_path)
+    parser.add_argument("--detection-imgsz", type=int, help="Default: the size the model was trained with")
+    parser.add_argument("--classification-imgsz", type=int)
+    args = parser.parse_args()
+
+    jobs = [
+        (args.detection, args.detection_imgsz),
+        (args.classification, args.classification_imgsz),
+    ]
+    failed = False
+    for backend in args.backend:
+        for weights, imgsz in jobs:
+            if not Path(weights).exists():
+                print(f"⚠️ Skipping {weights}: file not found")
+                continue
+            try:
+                artifact = export_model(weights, backend, imgsz=imgsz)
+                print(f"✅ {weights} -> {artifact} ({backend})")
+            except Exception as e:
+                failed = True
+                print(f"❌ Export of {weights} for {backend} failed: {e}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
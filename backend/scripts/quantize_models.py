@@ -0,0 +1,269 @@
+"""
+INT8 post-training quantization of the detection / classification models.
+
+- onnxruntime: static QDQ quantization (`onnxruntime.quantization.quantize_static`)
+  of the FP32 ONNX export, calibrated on a sample of the training images. The
+  convolutions / matmuls are quantized; the detection head (last `/model.N/`
+  block: DFL + box/class concat) stays in FP32, quantizing it costs far more
+  mAP than it saves time.
+- openvino: Ultralytics `export(format="openvino", int8=True)`, which runs NNCF
+  on the dataset given with `--detection-data` / `--classification-data`.
+
+Each INT8 model is validated against its FP32 counterpart with Ultralytics
+`.val()` (mAP50-95 for detection, top-1 for classification). When the drop is
+above the threshold the INT8 artifact is deleted so it can never be served,
+and the script exits non-zero. Serve the result with INFERENCE_PRECISION=int8.
+
+Usage (from backend/):
+    python scripts/quantize_models.py --backend onnxruntime \\
+        --detection-data /data/chicken_detection/data.yaml \\
+        --classification-data /data/chicken_disease_cls
+"""
+
+import argparse
+import ast
+import json
+import random
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config import get_settings  # noqa: E402
+from app.services.model_backends import export_model, load_model, resolve_model_artifact  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+HEAD_BLOCK = re.compile(r"/model\.(\d+)/")
+
+
+def image_files(roots) -> List[Path]:
+    roots = roots if isinstance(roots, (list, tuple)) else [roots]
+    files = []
+    for root in roots:
+        root = Path(root)
+        if root.is_file() and root.suffix == ".txt":
+            files += [Path(line.strip()) for line in root.read_text().splitlines() if line.strip()]
+        elif root.is_dir():
+            files += [p for p in root.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES]
+    return sorted(files)
+
+
+def calibration_images(task: str, data: str, limit: int, seed: int = 0) -> List[Path]:
+    """A reproducible random sample of the training split"""
+    if task == "detect":
+        from ultralytics.data.utils import check_det_dataset
+        files = image_files(check_det_dataset(data)["train"])
+    else:
+        from ultralytics.data.utils import check_cls_dataset
+        files = image_files(check_cls_dataset(data)["train"])
+    if not files:
+        raise RuntimeError(f"No calibration images found for {data}")
+    random.Random(seed).shuffle(files)
+    return files[:limit]
+
+
+def letterbox(image: np.ndarray, size: int) -> np.ndarray:
+    """Same padding as the Ultralytics predictor for static-shape backends (gray 114, centered)"""
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    resized = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top = (size - resized.shape[0]) // 2
+    left = (size - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas
+
+
+def center_crop(image: np.ndarray, size: int) -> np.ndarray:
+    """Shortest side to `size` then center crop, like `classify_transforms`"""
+    height, width = image.shape[:2]
+    scale = size / min(height, width)
+    resized = cv2.resize(image, (max(size, round(width * scale)), max(size, round(height * scale))))
+    top = (resized.shape[0] - size) // 2
+    left = (resized.shape[1] - size) // 2
+    return resized[top:top + size, left:left + size]
+
+
+def preprocess(path: Path, task: str, size: int) -> Optional[np.ndarray]:
+    image = cv2.imread(str(path))
+    if image is None:
+        return None
+    image = letterbox(image, size) if task == "detect" else center_crop(image, size)
+    tensor = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).transpose(2, 0, 1).astype(np.float32) / 255.0
+    return tensor[None]
+
+
+def detection_head_nodes(model) -> List[str]:
+    """Nodes of the last `/model.N/` block (the Detect head) in a TorchScript-exported graph"""
+    blocks = {}
+    for node in model.graph.node:
+        match = HEAD_BLOCK.search(node.name)
+        if match:
+            blocks.setdefault(int(match.group(1)), []).append(node.name)
+    return blocks[max(blocks)] if blocks else []
+
+
+def onnx_metadata(model) -> Dict[str, str]:
+    return {prop.key: prop.value for prop in model.metadata_props}
+
+
+def quantize_onnx(weights: str, task: str, data: str, calib_images: int, imgsz: Optional[int]) -> Path:
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+
+    fp32_path = resolve_model_artifact(weights, "onnxruntime")
+    if not fp32_path.exists():
+        export_model(weights, "onnxruntime", imgsz=imgsz)
+    int8_path = resolve_model_artifact(weights, "onnxruntime", "int8")
+
+    fp32_model = onnx.load(str(fp32_path))
+    metadata = onnx_metadata(fp32_model)
+    size = imgsz or ast.literal_eval(metadata.get("imgsz", "[640, 640]"))[0]
+    input_name = fp32_model.graph.input[0].name
+
+    head_exclude = []
+    if task == "detect":
+        head_exclude = detection_head_nodes(fp32_model)
+        if not head_exclude:
+            print("⚠️ Detection head not found by node name, quantizing every Conv (the mAP gate still applies)")
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, paths: List[Path]):
+            self.paths = iter(paths)
+
+        def get_next(self):
+            for path in self.paths:
+                tensor = preprocess(path, task, size)
+                if tensor is not None:
+                    return {input_name: tensor}
+            return None
+
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        Reader(calibration_images(task, data, calib_images)),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+        calibrate_method=CalibrationMethod.MinMax,
+        op_types_to_quantize=["Conv", "MatMul", "Gemm"],
+        nodes_to_exclude=head_exclude,
+    )
+
+    # Ultralytics AutoBackend đọc stride / names / imgsz từ metadata của file ONNX
+    int8_model = onnx.load(str(int8_path))
+    if not onnx_metadata(int8_model):
+        for key, value in metadata.items():
+            int8_model.metadata_props.add(key=key, value=value)
+        onnx.save(int8_model, str(int8_path))
+    return int8_path
+
+
+def quantize_openvino(weights: str, task: str, data: str, imgsz: Optional[int]) -> Path:
+    export_model(weights, "openvino", imgsz=imgsz, int8=True, data=data)
+    return resolve_model_artifact(weights, "openvino", "int8")
+
+
+def evaluate(weights: str, backend: str, precision: str, task: str, data: str, imgsz: Optional[int]) -> Dict:
+    model = load_model(weights, backend, task, precision)
+    options = {"data": data, "batch": 1, "verbose": False, "plots": False}
+    if imgsz:
+        options["imgsz"] = imgsz
+
+    started = time.perf_counter()
+    metrics = model.val(**options)
+    elapsed = time.perf_counter() - started
+
+    result = {"val_seconds": round(elapsed, 1), "speed_ms": {k: round(v, 2) for k, v in metrics.speed.items()}}
+    if task == "detect":
+        result.update({"map50": round(float(metrics.box.map50), 4), "map50_95": round(float(metrics.box.map), 4)})
+    else:
+        result.update({"top1": round(float(metrics.top1), 4), "top5": round(float(metrics.top5), 4)})
+    return result
+
+
+def artifact_size_mb(path: Path) -> float:
+    files = [path] if path.is_file() else [p for p in path.rglob("*") if p.is_file()]
+    siblings = [Path(str(path) + ".data")] if path.is_file() else []
+    return round(sum(p.stat().st_size for p in files + siblings if p.exists()) / 1024 / 1024, 2)
+
+
+def remove_artifact(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["onnxruntime", "openvino"], default="onnxruntime")
+    parser.add_argument("--detection", default=settings.detection_model_path)
+    parser.add_argument("--classification", default=settings.classification_model_path)
+    parser.add_argument("--detection-data", help="Ultralytics data.yaml of the detection dataset")
+    parser.add_argument("--classification-data", help="Image-folder dataset (train/val/<class>/...)")
+    parser.add_argument("--calib-images", type=int, default=300, help="Training images used for calibration")
+    parser.add_argument("--detection-imgsz", type=int)
+    parser.add_argument("--classification-imgsz", type=int)
+    parser.add_argument("--max-map-drop", type=float, default=0.01, help="Allowed mAP50-95 drop (absolute)")
+    parser.add_argument("--max-top1-drop", type=float, default=0.01, help="Allowed top-1 drop (absolute)")
+    parser.add_argument("--keep-failed", action="store_true", help="Keep INT8 artifacts that fail the gate")
+    args = parser.parse_args()
+
+    jobs = []
+    if args.detection_data:
+        jobs.append(("detect", args.detection, args.detection_data, args.detection_imgsz, "map50_95", args.max_map_drop))
+    if args.classification_data:
+        jobs.append(("classify", args.classification, args.classification_data, args.classification_imgsz,
+                     "top1", args.max_top1_drop))
+    if not jobs:
+        parser.error("Give --detection-data and/or --classification-data")
+
+    report, failed = {"backend": args.backend, "models": {}}, False
+    for task, weights, data, imgsz, metric, max_drop in jobs:
+        if args.backend == "onnxruntime":
+            int8_path = quantize_onnx(weights, task, data, args.calib_images, imgsz)
+        else:
+            int8_path = quantize_openvino(weights, task, data, imgsz)
+        fp32_path = resolve_model_artifact(weights, args.backend)
+
+        fp32 = evaluate(weights, args.backend, "fp32", task, data, imgsz)
+        int8 = evaluate(weights, args.backend, "int8", task, data, imgsz)
+        drop = round(fp32[metric] - int8[metric], 4)
+        passed = drop <= max_drop
+
+        report["models"][task] = {
+            "weights": weights,
+            "int8_artifact": str(int8_path),
+            "size_mb": {"fp32": artifact_size_mb(fp32_path), "int8": artifact_size_mb(int8_path)},
+            "fp32": fp32,
+            "int8": int8,
+            f"{metric}_drop": drop,
+            "max_drop": max_drop,
+            "inference_speedup": round(fp32["speed_ms"]["inference"] / max(int8["speed_ms"]["inference"], 1e-6), 2),
+            "passed": passed,
+        }
+        if not passed:
+            failed = True
+            if not args.keep_failed:
+                remove_artifact(int8_path)
+                report["models"][task]["int8_artifact"] = None
+
+    print(json.dumps(report, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
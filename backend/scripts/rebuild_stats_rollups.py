@@ -0,0 +1,52 @@
+"""
+Backfill / reconcile the `daily_rollups` table read by /admin/stats and
+/admin/usage-stats against the diagnosis, detection and usage log tables.
+
+The rollups are kept up to date as logs are written; run this after bulk
+imports, manual deletes in the log tables, or to check for drift. With
+`--check` nothing is written and the exit code is 1 when a day differs.
+Each source is recomputed with one GROUP BY per day and replaced in a single
+transaction; logs written meanwhile can make today's row differ, so run it
+again with `--since` today if the check reports it.
+
+Usage (from backend/):
+    python scripts/rebuild_stats_rollups.py --check
+    python scripts/rebuild_stats_rollups.py --since 2026-10-01
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.services.stats_rollup import rebuild_rollups  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="First day (YYYY-MM-DD), default all history")
+    parser.add_argument("--check", action="store_true", help="Only report the days that differ")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        report = rebuild_rollups(db, since=args.since, dry_run=args.check)
+        if not args.check:
+            db.commit()
+    finally:
+        db.close()
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(report, indent=2))
+    if args.check and any(result["mismatched_days"] for result in report.values() if isinstance(result, dict)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()